@@ -0,0 +1,226 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import EventIndex, FEATURE_WINDOWS_DAYS
+from risk_engine import EarthquakeRiskEngine, RISK_FEATURE_COLUMNS, haversine
+from model_training import DEFAULT_PARAMS, fold_metrics
+
+try:
+    from catboost import CatBoostClassifier
+except ImportError:
+    CatBoostClassifier = None
+
+# Geçmiş büyük depremlerin bölgeleri (Düzce 1999, Gölcük 1999, Van 2011, Elazığ 2020,
+# İzmir 2020, Kahramanmaraş/Hatay 2023) ve karşılaştırma için İstanbul/Ankara
+DEFAULT_LOCATIONS = [
+    ("Düzce", 40.8438, 31.1565),
+    ("Kocaeli", 40.7654, 29.9408),
+    ("İstanbul", 41.0082, 28.9784),
+    ("İzmir", 38.4237, 27.1428),
+    ("Van", 38.4891, 43.4089),
+    ("Elazığ", 38.6810, 39.2264),
+    ("Kahramanmaraş", 37.5858, 36.9371),
+    ("Hatay", 36.2021, 36.1600),
+    ("Ankara", 39.9334, 32.8597),
+]
+
+
+class WalkForwardBacktest:
+    """
+    Katalogu düzenli kesim tarihlerinde yeniden oynatır.
+
+    Ayıklama (declustering), kayan özellikler ve fay mesafesi yalnızca geçmişe bakar;
+    bu yüzden tüm katalog için bir kez hesaplanır ve her kesimde zamana göre sıralı
+    çerçevelerin öneki (prefix) kullanılır. Sorgu dizileri de bir kez hazırlanıp kesimde
+    dilimlenir; kesim başına yalnızca son pencere (max(FEATURE_WINDOWS_DAYS) gün) ana
+    şoklarının küçük EventIndex'i kurulur (_cutoff_arrays). Etiketler geleceğe baktığı için
+    eğitimde sadece ufku (horizon) kesimden önce kapanan satırlar kullanılır (sızıntı yok).
+
+    Motor bu sınıfa özeldir: kesim yayınları katalog dinleyicilerini tetiklemez.
+    """
+
+    def __init__(self, csv_path=os.path.join("assets", "query.csv"), horizon_days=30,
+                 thr_mag=4.0, radius_km=100.0, retrain_every=12, params=None):
+        self.engine = EarthquakeRiskEngine(csv_path=csv_path, cache_dir=None)
+        self.horizon = pd.Timedelta(days=horizon_days)
+        self.thr_mag = thr_mag
+        self.radius_km = radius_km
+        self.retrain_every = retrain_every
+        self.params = dict(DEFAULT_PARAMS, iterations=200, thread_count=-1)
+        self.params.update(params or {})
+
+        t0 = time.perf_counter()
+        self.engine._prepare_frames()
+        self.prepare_seconds = time.perf_counter() - t0
+        self.df_full = self.engine.df_full.sort_values("time").reset_index(drop=True)
+        self.df_main = self.engine.df_main.sort_values("time").reset_index(drop=True)
+        self.full_times = self.df_full["time"].to_numpy()
+        self.main_times = self.df_main["time"].to_numpy()
+        self.x_main = self.df_main[RISK_FEATURE_COLUMNS]
+        self.y_main = self.df_main["label_30d"].astype(int).to_numpy()
+
+        # Sorgu dizileri (motorun _build_query_arrays'i ile aynı), kesimlerde görünüm olarak dilimlenir
+        self.query_full = {
+            "full_lat": self.df_full["latitude"].to_numpy(dtype=float),
+            "full_lon": self.df_full["longitude"].to_numpy(dtype=float),
+            "full_mag": self.df_full["mag"].to_numpy(dtype=float),
+            "full_time": self.df_full["time"].dt.tz_convert(None).to_numpy(),
+        }
+        self.main_lat = self.df_main["latitude"].to_numpy(dtype=float)
+        self.main_lon = self.df_main["longitude"].to_numpy(dtype=float)
+        self.main_mag = self.df_main["mag"].to_numpy(dtype=float)
+        self.main_depth_sum = np.cumsum(self.df_main["depth"].to_numpy(dtype=np.float64))
+        self.feature_window = pd.Timedelta(days=max(FEATURE_WINDOWS_DAYS))
+
+        # Gerçekleşen sonuçlar için büyük depremler: label_30d gibi (build_label_30d) yalnızca
+        # ayıklanmış ana şoklar; dropna öncesi küme için df_main değil df_full'un ana şokları
+        mains = self.df_full[~self.df_full["is_aftershock"]]
+        big = mains[mains["mag"] >= thr_mag]
+        self.big_times = big["time"].to_numpy()
+        self.big_lat = big["latitude"].to_numpy(dtype=float)
+        self.big_lon = big["longitude"].to_numpy(dtype=float)
+
+    def _to_np(self, ts):
+        # Katalog zamanları ile aynı zaman dilimi/çözünürlükte karşılaştırma değeri
+        return np.asarray([pd.Timestamp(ts)], dtype=self.full_times.dtype)[0]
+
+    def realized(self, lat, lon, cutoff):
+        """Kesimden sonraki horizon içinde radius_km yarıçapında M>=thr ana şok oldu mu (label_30d ile aynı hedef)?"""
+        lo = np.searchsorted(self.big_times, self._to_np(cutoff), side="right")
+        hi = np.searchsorted(self.big_times, self._to_np(cutoff + self.horizon), side="right")
+        if hi <= lo:
+            return 0
+        d = haversine(lat, lon, self.big_lat[lo:hi], self.big_lon[lo:hi])
+        return int((d <= self.radius_km).any())
+
+    def _cutoff_arrays(self, n_full, n_main):
+        """
+        Kesimdeki katalog için motorun sorgu dizileri. Tam katalog dizileri önek görünümüdür;
+        sorgu özellikleri yalnızca son olay anından geriye max(FEATURE_WINDOWS_DAYS) güne
+        baktığından pencere indeksi yalnızca o aralıktaki ana şoklarla kurulur.
+        """
+        t_ref = self.df_main["time"].iloc[n_main - 1]
+        lo = int(np.searchsorted(self.main_times, self._to_np(t_ref - self.feature_window), side="left"))
+        recent = slice(lo, n_main)
+        arrays = {name: values[:n_full] for name, values in self.query_full.items()}
+        arrays.update({
+            "window_index": EventIndex(
+                self.main_times[recent], self.main_lat[recent], self.main_lon[recent], self.main_mag[recent],
+            ),
+            "t_ref": t_ref,
+            "days_since_start": (t_ref - self.df_main["time"].iloc[0]).days,
+            "depth_mean": self.main_depth_sum[n_main - 1] / n_main,
+        })
+        return arrays
+
+    def _train(self, cutoff):
+        # Ufku kesimden önce kapanan satırlar: etiketleri kesim anında biliniyor
+        n = np.searchsorted(self.main_times, self._to_np(cutoff - self.horizon), side="right")
+        y = self.y_main[:n]
+        if n < 20 or len(np.unique(y)) < 2:
+            return None, n
+        model = CatBoostClassifier(**self.params)
+        model.fit(self.x_main.iloc[:n], y)
+        return model, n
+
+    def run(self, locations, start, end=None, freq="MS", progress=True):
+        if CatBoostClassifier is None:
+            raise RuntimeError("catboost paketi yüklü olmalı.")
+        last_time = pd.Timestamp(self.full_times[-1])
+        end = pd.Timestamp(end, tz=last_time.tz) if end else last_time - self.horizon
+        cutoffs = pd.date_range(pd.Timestamp(start, tz=last_time.tz), end, freq=freq)
+
+        engine = self.engine
+        model = None
+        rows = []
+        trainings = 0
+        t0 = time.perf_counter()
+        for k, cutoff in enumerate(cutoffs):
+            if model is None or k % self.retrain_every == 0:
+                new_model, n_train = self._train(cutoff)
+                if new_model is not None:
+                    model = new_model
+                    trainings += 1
+            if model is None:
+                continue
+
+            # Kesim anındaki katalog: zaman sıralı çerçevelerin öneki (kopya yok)
+            n_full = np.searchsorted(self.full_times, self._to_np(cutoff), side="right")
+            n_main = np.searchsorted(self.main_times, self._to_np(cutoff), side="right")
+            if n_main < 7:
+                continue
+            engine.model = model
+            engine.publish_catalog(self.df_full.iloc[:n_full], self.df_main.iloc[:n_main],
+                                   arrays=self._cutoff_arrays(n_full, n_main), notify=False)
+
+            scores = engine.score_many([(lat, lon) for _, lat, lon in locations])
+            for (name, lat, lon), s in zip(locations, scores):
+                rows.append({
+                    "cutoff": cutoff,
+                    "name": name,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "short_risk": s["short_risk"],
+                    "long_hazard": s["long_hazard"],
+                    "final_score": s["final_score"],
+                    "realized_30d": self.realized(lat, lon, cutoff),
+                })
+            if progress and (k + 1) % 50 == 0:
+                print(f"  {k + 1}/{len(cutoffs)} kesim, {time.perf_counter() - t0:.1f} sn")
+
+        self.run_seconds = time.perf_counter() - t0
+        self.trainings = trainings
+        return pd.DataFrame(rows)
+
+
+def summarize(results):
+    """Genel ve konum bazında kısa vadeli skorun gerçekleşen sonuçlarla uyumu."""
+    overall = fold_metrics(results["realized_30d"], results["short_risk"])
+    per_location = []
+    for name, g in results.groupby("name", sort=False):
+        m = fold_metrics(g["realized_30d"], g["short_risk"])
+        m.update({"name": name, "cutoffs": len(g), "mean_short_risk": float(g["short_risk"].mean())})
+        per_location.append(m)
+    return overall, pd.DataFrame(per_location)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk skorunun ileri yürüyen tarihsel geri testi")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--start", default="1995-01-01")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--freq", default="MS", help="Kesim sıklığı (pandas offset, ör. MS, W, 14D)")
+    parser.add_argument("--retrain-every", type=int, default=12, help="Kaç kesimde bir yeniden eğitilsin")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--locations", default=None,
+                        help="name,latitude,longitude CSV'si (varsayılan: geçmiş büyük deprem bölgeleri)")
+    parser.add_argument("--output", default="backtest_results.csv")
+    args = parser.parse_args()
+
+    if args.locations:
+        loc_df = pd.read_csv(args.locations)
+        locations = list(loc_df[["name", "latitude", "longitude"]].itertuples(index=False, name=None))
+    else:
+        locations = DEFAULT_LOCATIONS
+
+    bt = WalkForwardBacktest(csv_path=args.csv, retrain_every=args.retrain_every,
+                             params={"iterations": args.iterations})
+    print(f"Çerçeveler hazırlandı: {bt.prepare_seconds:.1f} sn ({len(bt.df_main)} ana şok)")
+    results = bt.run(locations, args.start, args.end, freq=args.freq)
+    results.to_csv(args.output, index=False)
+    print(f"{results['cutoff'].nunique()} kesim x {len(locations)} konum, {bt.trainings} eğitim, "
+          f"{bt.run_seconds:.1f} sn -> {args.output}")
+
+    overall, per_location = summarize(results)
+    print(f"Genel: AUC={overall['auc']:.3f} Brier={overall['brier']:.4f} "
+          f"gerçekleşme oranı={overall['positive_rate']:.3f}")
+    print(per_location[["name", "cutoffs", "mean_short_risk", "positive_rate", "auc", "brier"]]
+          .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from model_training import _pool_context
+from risk_engine import SCORERS, EarthquakeRiskEngine
+from synthetic_catalog import synthetic_locations
+
+PROVINCES_CSV = os.path.join("assets", "provinces.csv")
+RESULT_COLUMNS = [
+    "name", "latitude", "longitude", "short_risk", "long_hazard",
+    "dist_fault", "fault_score", "final_score", "category",
+]
+
+# Süreç havuzu işçisinin motoru (seri çalışmada ebeveynin motoru). Isınmış motor
+# CatBoost/OpenMP iş parçacıkları çalışırken fork edilmez: işçiler forkserver/spawn ile
+# başlar ve motoru disk önbelleğinden açar.
+_ENGINE = None
+# İşçilere aktarılan motor ayarları: skorlar ebeveyndeki yapılandırmayla aynı olmalı
+ENGINE_SETTINGS = (
+    "scorer", "compact_params", "ensemble_size", "ensemble_params",
+    "training_params", "hot_days", "cold_dir",
+)
+
+
+def load_locations(path, engine=None, country_hint="Turkey"):
+    """
+    Konum listesini okur. CSV'de name,latitude,longitude sütunları beklenir;
+    koordinatı olmayan satırlar (veya düz metin dosyasında sadece isimler) geocode edilir.
+    """
+    if path.lower().endswith(".csv"):
+        df = pd.read_csv(path)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            names = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        df = pd.DataFrame({"name": names})
+
+    if "latitude" not in df.columns:
+        df["latitude"] = np.nan
+        df["longitude"] = np.nan
+    missing = df["latitude"].isna() | df["longitude"].isna()
+    if missing.any():
+        if engine is None:
+            raise RuntimeError("Koordinatı olmayan konumlar için geocode gerekli.")
+        print(f"{int(missing.sum())} konum geocode ediliyor (Nominatim ~1 istek/sn)...")
+        for idx in df.index[missing]:
+            lat, lon = engine.locate_city(df.at[idx, "name"], country_hint)
+            df.at[idx, "latitude"] = lat
+            df.at[idx, "longitude"] = lon
+            time.sleep(1.0)
+    return df[["name", "latitude", "longitude"]].reset_index(drop=True)
+
+
+def engine_settings(engine):
+    """İşçi motorlarının ebeveynle aynı skorlayıcıyı kurması için ENGINE_SETTINGS değerleri."""
+    return {name: getattr(engine, name) for name in ENGINE_SETTINGS}
+
+
+def _init_worker(csv_path, cache_dir, settings):
+    # Her işçi motoru ebeveynin ayarlarıyla disk önbelleğinden açar (cache_dir yoksa yeniden hazırlar)
+    global _ENGINE
+    _ENGINE = EarthquakeRiskEngine(csv_path=csv_path, cache_dir=cache_dir)
+    for name, value in settings.items():
+        setattr(_ENGINE, name, value)
+    # Süreç başına tek iş parçacığı: çekirdekleri süreçler paylaşır
+    _ENGINE.predict_thread_count = 1
+    _ENGINE.training_workers = 1
+    _ENGINE.ensemble_workers = 1
+    _ENGINE.warm_up()
+
+
+def _score_chunk(rows):
+    # Parça tek score_many çağrısıyla skorlanır: tek özellik tablosu, tek predict
+    scores = _ENGINE.score_many([(lat, lon) for _, lat, lon in rows])
+    return [
+        {
+            "name": name,
+            "latitude": lat,
+            "longitude": lon,
+            "short_risk": s["short_risk"],
+            "long_hazard": s["long_hazard"],
+            "dist_fault": s["dist_fault"],
+            "fault_score": s["fault_score"],
+            "final_score": s["final_score"],
+            "category": _ENGINE._risk_category(s["final_score"]),
+        }
+        for (name, lat, lon), s in zip(rows, scores)
+    ]
+
+
+def score_locations(engine, locations, workers=1, chunk_size=None):
+    """
+    Konumları workers süreç arasında skorlar, sonuçları DataFrame olarak döner.
+    chunk_size verilmezse seri çalışmada tek parça, süreçlerde işçi başına ~4 parça kullanılır.
+    """
+    global _ENGINE
+    _ENGINE = engine
+    rows = list(locations[["name", "latitude", "longitude"]].itertuples(index=False, name=None))
+    if chunk_size is None:
+        chunk_size = -(-len(rows) // (workers * 4)) if workers > 1 else len(rows)
+    chunk_size = max(chunk_size, 1)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    if workers <= 1:
+        results = [r for chunk in chunks for r in _score_chunk(chunk)]
+    else:
+        with _pool_context().Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(engine.csv_path, engine.cache_dir, engine_settings(engine)),
+        ) as pool:
+            results = [r for part in pool.imap(_score_chunk, chunks) for r in part]
+    return pd.DataFrame(results, columns=RESULT_COLUMNS)
+
+
+def write_results(df, path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(df.to_dict(orient="records"), f, ensure_ascii=False, indent=1)
+    elif ext == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekransız toplu il/ilçe risk skorlama")
+    parser.add_argument("--input", default=PROVINCES_CSV,
+                        help="name,latitude,longitude CSV'si veya satır başına bir şehir adı içeren dosya")
+    parser.add_argument("--synthetic-points", type=int, default=0,
+                        help="Girdi yerine N rastgele nokta skorla (ör. 973 ilçe ölçeği)")
+    parser.add_argument("--output", default="risk_scores.csv", help=".csv, .json veya .parquet")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--bench-workers", default=None,
+                        help="Virgülle ayrılmış işçi sayıları için süre ölç (ör. 1,4,8)")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--scorer", choices=SCORERS, default="full",
+                        help="Kısa vadeli skorlayıcı: full (CatBoost) veya compact (NumPy ağaçları)")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    engine = EarthquakeRiskEngine(csv_path=args.csv, cache_dir=args.cache_dir)
+    engine.scorer = args.scorer
+    from_cache = engine.warm_up()
+    print(f"Motor hazır: {time.perf_counter() - t0:.2f} sn ({'önbellek' if from_cache else 'yeniden hesaplandı'})")
+
+    if args.synthetic_points:
+        locations = synthetic_locations(args.synthetic_points)
+    else:
+        locations = load_locations(args.input, engine=engine)
+    print(f"{len(locations)} konum skorlanacak.")
+
+    if args.bench_workers:
+        for n in [int(x) for x in args.bench_workers.split(",") if x.strip()]:
+            # Her turda önbelleği boşalt ki gerçek hesaplama ölçülsün
+            engine._bump_catalog_version()
+            t = time.perf_counter()
+            score_locations(engine, locations, workers=n)
+            elapsed = time.perf_counter() - t
+            print(f"  {n:>3} işçi: {elapsed:.2f} sn ({len(locations) / elapsed:.1f} konum/sn)")
+        engine._bump_catalog_version()
+
+    t = time.perf_counter()
+    results = score_locations(engine, locations, workers=args.workers)
+    elapsed = time.perf_counter() - t
+    write_results(results, args.output)
+    print(f"{len(results)} sonuç yazıldı: {args.output} ({elapsed:.2f} sn, {args.workers} işçi)")
+
+
+if __name__ == "__main__":
+    main()
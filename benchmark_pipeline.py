@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import (
+    EarthquakeRiskEngine,
+    simple_declustering,
+    build_label_30d,
+    add_fault_distance,
+)
+from synthetic_catalog import generate_catalog, write_catalog_csv
+
+DEFAULT_SIZES = [10_000, 100_000]
+# Sorgu aşamasında kullanılan sabit konumlar (İstanbul, İzmir, Kahramanmaraş, Van, Ankara)
+BENCH_LOCATIONS = [(41.01, 28.98), (38.42, 27.14), (37.58, 36.94), (38.50, 43.38), (39.93, 32.86)]
+
+
+def git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return out.stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def measure(fn, memory=True):
+    """
+    fn'i çalıştırıp (sonuç, saniye, tepe bellek MB) döner.
+    Süre tracemalloc kapalıyken ölçülür; bellek için ikinci bir tur tracemalloc ile koşulur.
+    Not: tracemalloc yalnızca Python/NumPy ayırmalarını görür (CatBoost'un C++ belleği hariç).
+    """
+    t0 = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - t0
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / 1e6
+    return result, seconds, peak_mb
+
+
+def run_size(n_events, seed=42, memory=True, max_serial_events=None, workdir=None):
+    """Tek bir katalog boyutu için tüm aşamaları ölçer ve kayıt listesi döner."""
+    records = []
+
+    def record(stage, n, seconds, peak_mb, **extra):
+        rec = {"stage": stage, "n_events": n, "seconds": round(seconds, 6), "peak_mb": peak_mb}
+        rec.update(extra)
+        records.append(rec)
+        mem = f", tepe {peak_mb:.1f} MB" if peak_mb is not None else ""
+        print(f"  {stage:<22} n={n:<9} {seconds:9.3f} sn{mem}")
+
+    df, secs, _ = measure(lambda: generate_catalog(n_events, seed=seed), memory=False)
+    record("generate_catalog", len(df), secs, None)
+
+    if max_serial_events and len(df) > max_serial_events:
+        print(f"  (n={len(df)} > {max_serial_events}: seri aşamalar atlandı)")
+        return records
+
+    df_full, secs, peak = measure(lambda: simple_declustering(df), memory)
+    record("simple_declustering", len(df), secs, peak)
+
+    df_main = df_full[~df_full["is_aftershock"]].reset_index(drop=True)
+    df_main, secs, peak = measure(lambda: build_label_30d(df_main), memory)
+    record("build_label_30d", len(df_main), secs, peak, positive_rate=float(df_main["label_30d"].mean()))
+
+    _, secs, peak = measure(lambda: add_fault_distance(df_main.copy()), memory)
+    record("add_fault_distance", len(df_main), secs, peak)
+
+    # Motor aşamaları: CSV'den uçtan uca
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        csv_path = write_catalog_csv(df, os.path.join(tmp, "synthetic.csv"))
+
+        def prepare():
+            engine = EarthquakeRiskEngine(csv_path=csv_path)
+            engine._prepare_frames()
+            return engine
+
+        engine, secs, peak = measure(prepare, memory)
+        record("prepare_frames", len(df), secs, peak)
+
+        def train():
+            engine.model = None
+            engine._train_short_model()
+
+        _, secs, peak = measure(train, memory=False)
+        record("train_short_model", len(engine.df_main), secs, None)
+
+        def predict():
+            for lat, lon in BENCH_LOCATIONS:
+                engine.predict_city_risk("Bench", manual_coords=(lat, lon))
+
+        _, secs, peak = measure(predict, memory)
+        record("predict_city_risk", len(df), secs / len(BENCH_LOCATIONS), peak, queries=len(BENCH_LOCATIONS))
+
+    return records
+
+
+def load_results(path):
+    rows = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                rows.append(json.loads(line))
+    return rows
+
+
+def compare(current, baseline, tolerance=1.25):
+    """
+    Her (aşama, boyut) için son taban ölçümle karşılaştırır.
+    tolerance katından yavaş olan aşamaların listesini döner.
+    """
+    base = {}
+    for rec in baseline:
+        base[(rec["stage"], rec["size"])] = rec
+    regressions = []
+    for rec in current:
+        ref = base.get((rec["stage"], rec["size"]))
+        if ref is None or ref["seconds"] <= 0:
+            continue
+        ratio = rec["seconds"] / ref["seconds"]
+        flag = "  <-- GERİLEME" if ratio > tolerance else ""
+        print(
+            f"  {rec['stage']:<22} size={rec['size']:<9} "
+            f"{ref['seconds']:.3f} -> {rec['seconds']:.3f} sn (x{ratio:.2f}){flag}"
+        )
+        if ratio > tolerance:
+            regressions.append(rec)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Risk hattı için sentetik katalog benchmark'ı")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Virgülle ayrılmış olay sayıları (ör. 10000,100000,1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_results.jsonl", help="Sonuçların eklendiği JSON lines dosyası")
+    parser.add_argument("--no-memory", action="store_true", help="Tepe bellek ölçümünü atla")
+    parser.add_argument("--max-serial-events", type=int, default=None,
+                        help="Bu boyuttan büyük kataloglarda seri aşamaları atla")
+    parser.add_argument("--baseline", default=None, help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="Gerileme sayılacak yavaşlama katsayısı")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    meta = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+    current = []
+    for size in sizes:
+        print(f"Katalog boyutu: {size}")
+        for rec in run_size(size, seed=args.seed, memory=not args.no_memory,
+                            max_serial_events=args.max_serial_events):
+            rec["size"] = size
+            rec.update(meta)
+            current.append(rec)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        for rec in current:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    print(f"{len(current)} ölçüm yazıldı: {args.output}")
+
+    if args.baseline:
+        print(f"Taban karşılaştırması: {args.baseline}")
+        regressions = compare(current, load_results(args.baseline), tolerance=args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} aşamada gerileme var.")
+            sys.exit(1)
+        print("Gerileme yok.")
+
+
+if __name__ == "__main__":
+    main()
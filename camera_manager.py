@@ -3,6 +3,9 @@ import cv2
 import threading
 import os
 
+from tracing import span
+from tiled_inference import tiled_predict, DEFAULT_TILE_SIZE, DEFAULT_OVERLAP, DEFAULT_BATCH_SIZE
+
 class VideoCaptureThread:
     def __init__(self, source=0):
         self.cap = cv2.VideoCapture(source)
@@ -30,20 +33,35 @@ class VideoCaptureThread:
         self.running = False
         self.cap.release()
 
-def draw_results(frame, results, class_names, window_name):
-    if results is None:
-        cv2.imshow(window_name, frame)
-        return
-    for box in results.boxes.data.cpu().numpy():
-        x1, y1, x2, y2, conf, cls = box
+def draw_detections(frame, detections, class_names):
+    for box in detections:
+        x1, y1, x2, y2, conf, cls = box[:6]
         x1, y1, x2, y2 = map(int, [x1, y1, x2, y2])
         label = f'{class_names[int(cls)]} {conf:.2f}'
         color = (255, 0, 102)
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
         cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+def draw_results(frame, results, class_names, window_name):
+    if results is None:
+        cv2.imshow(window_name, frame)
+        return
+    # Karolu tespit numpy dizisi döner, normal tespit ultralytics Results nesnesi
+    if hasattr(results, "boxes"):
+        detections = results.boxes.data.cpu().numpy()
+    else:
+        detections = results
+    draw_detections(frame, detections, class_names)
     cv2.imshow(window_name, frame)
 
-def main():
+def main(
+    source=0,
+    tiled_crack=False,
+    tile_size=DEFAULT_TILE_SIZE,
+    tile_overlap=DEFAULT_OVERLAP,
+    tile_batch=DEFAULT_BATCH_SIZE,
+    should_stop=None,
+):
     # Model yolları (models klasörüne taşındı)
     model1_path = os.path.join("models", "catlak.pt")
     model2_path = os.path.join("models", "bina.pt")
@@ -57,7 +75,7 @@ def main():
     class_names2 = model2.names
 
     # Video yakalama başlat
-    video_thread = VideoCaptureThread(0)
+    video_thread = VideoCaptureThread(source)
     video_thread.start()
 
     window1 = "catlak Tespiti"
@@ -70,6 +88,9 @@ def main():
 
     try:
         while True:
+            # Arayüzden iptal edildiyse döngüden çık
+            if should_stop is not None and should_stop():
+                break
             frame = video_thread.get_frame()
             if frame is None:
                 continue
@@ -80,10 +101,20 @@ def main():
 
             # Model tahmin fonksiyonları
             def run_model1():
-                results1[0] = model1.predict(source=frame, conf=0.6, verbose=False)[0]
+                # İnce çatlaklar küçültmede kaybolmasın diye yüksek çözünürlükte karolu tespit
+                h, w = frame.shape[:2]
+                with span("camera.predict_crack", tiled=tiled_crack):
+                    if tiled_crack and max(h, w) > tile_size:
+                        results1[0] = tiled_predict(
+                            model1, frame, tile_size=tile_size, overlap=tile_overlap,
+                            batch_size=tile_batch, conf=0.6
+                        )
+                    else:
+                        results1[0] = model1.predict(source=frame, conf=0.6, verbose=False)[0]
 
             def run_model2():
-                results2[0] = model2.predict(source=frame, conf=0.4, verbose=False)[0]
+                with span("camera.predict_building"):
+                    results2[0] = model2.predict(source=frame, conf=0.4, verbose=False)[0]
 
             # Thread'leri başlat
             t1 = threading.Thread(target=run_model1)
@@ -94,8 +125,9 @@ def main():
             t2.join()
 
             # Sonuçları çiz
-            draw_results(frame.copy(), results1[0], class_names1, window1)
-            draw_results(frame.copy(), results2[0], class_names2, window2)
+            with span("camera.draw"):
+                draw_results(frame.copy(), results1[0], class_names1, window1)
+                draw_results(frame.copy(), results2[0], class_names2, window2)
 
             # Çıkmak için 'q' tuşuna bas
             if cv2.waitKey(1) & 0xFF == ord('q'):
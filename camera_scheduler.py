@@ -0,0 +1,266 @@
+import argparse
+import collections
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from camera_manager import VideoCaptureThread, draw_detections
+
+# Model tanımları: isim -> (yol, güven eşiği)
+DEFAULT_MODELS = {
+    "catlak": (os.path.join("models", "catlak.pt"), 0.6),
+    "bina": (os.path.join("models", "bina.pt"), 0.4),
+}
+
+# Art arda bu kadar okuma başarısız olursa dosya kaynağı bitmiş sayılır (açılamayan/boş dosya)
+MAX_READ_FAILURES = 5
+
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+
+def load_model(path):
+    """Her YOLO modelini süreç başına bir kez yükler; sonraki çağrılar aynı nesneyi döner."""
+    with _MODEL_LOCK:
+        model = _MODEL_CACHE.get(path)
+        if model is None:
+            from ultralytics import YOLO
+            model = YOLO(path)
+            _MODEL_CACHE[path] = model
+        return model
+
+
+class StreamGrabber(VideoCaptureThread):
+    """
+    Tek bir kaynaktan (kamera indeksi, RTSP adresi veya video dosyası) kare okur.
+    Her kare sıra numarası ve yakalanma zamanıyla saklanır. Video dosyaları
+    canlı yayın gibi kendi FPS'lerinde oynatılır ve istenirse başa sarılır. Başa sarınca
+    da kare gelmiyorsa (açılamayan veya boş dosya) kaynak bitmiş sayılır.
+    """
+
+    def __init__(self, source=0, loop=True):
+        super().__init__(source)
+        self.source = source
+        self.seq = 0
+        self.captured_at = 0.0
+        self.finished = False
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.loop = loop
+        fps = self.cap.get(cv2.CAP_PROP_FPS) if self.is_file else 0
+        self.file_interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Okuyucu cap.read() içindeyken release edilmesin: önce thread'in çıkması beklenir
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.cap.release()
+
+    def update(self):
+        next_time = time.perf_counter()
+        failures = 0
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                failures += 1
+                if self.is_file:
+                    if self.loop and failures <= MAX_READ_FAILURES:
+                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    self.finished = True
+                    break
+                # Kamera/akış kopuksa çekirdeği meşgul etmeden artan aralıkla yeniden dene
+                time.sleep(min(0.01 * failures, 0.5))
+                continue
+            failures = 0
+            if self.file_interval:
+                # Dosyayı gerçek zamanlı yayın hızında besle
+                next_time += self.file_interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            with self.lock:
+                self.frame = frame
+                self.seq += 1
+                self.captured_at = time.perf_counter()
+
+    def latest(self):
+        """(kare, sıra no, yakalanma zamanı) döner; kopya yapmaz, kare değiştirilmemeli."""
+        with self.lock:
+            return self.frame, self.seq, self.captured_at
+
+
+class SourceStats:
+    def __init__(self, max_samples=1000):
+        self.frames = 0
+        self.dropped = 0
+        self.latencies = collections.deque(maxlen=max_samples)
+        self.started_at = time.perf_counter()
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.started_at, 1e-9)
+        lat = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "fps": self.frames / elapsed,
+            "latency_ms_mean": float(lat.mean()),
+            "latency_ms_p50": float(np.percentile(lat, 50)),
+            "latency_ms_p95": float(np.percentile(lat, 95)),
+        }
+
+
+class MultiCameraScheduler:
+    """
+    Birden fazla kaynağı tek inceleme istasyonunda işler.
+    - Her kaynak için bir okuyucu thread (StreamGrabber)
+    - Her YOLO modeli bir kez yüklenir ve tüm kaynaklar arasında paylaşılır
+    - Kaynaklardan gelen kareler tek predict çağrısında toplu işlenir
+    - Adil round-robin sırası ve kaynak başına FPS sınırı
+    """
+
+    def __init__(self, sources, models=None, max_batch=8, fps_caps=None, loop_files=True, on_result=None):
+        self.sources = list(sources)
+        self.models = {
+            name: (load_model(path), conf)
+            for name, (path, conf) in (models or DEFAULT_MODELS).items()
+        }
+        self.max_batch = max_batch
+        fps_caps = fps_caps or {}
+        self.min_interval = {
+            i: (1.0 / fps_caps[src] if fps_caps.get(src) else 0.0)
+            for i, src in enumerate(self.sources)
+        }
+        self.grabbers = [StreamGrabber(src, loop=loop_files) for src in self.sources]
+        self.stats = [SourceStats() for _ in self.sources]
+        self.last_seq = [0] * len(self.sources)
+        self.last_run = [0.0] * len(self.sources)
+        self.rr_offset = 0
+        self.on_result = on_result
+        self.running = False
+
+    def start(self):
+        for g in self.grabbers:
+            g.start()
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        for g in self.grabbers:
+            g.stop()
+
+    def _select_batch(self):
+        """Round-robin sırasıyla yeni karesi olan ve FPS sınırını aşmayan kaynakları seçer."""
+        now = time.perf_counter()
+        n = len(self.grabbers)
+        batch = []
+        for k in range(n):
+            i = (self.rr_offset + k) % n
+            if now - self.last_run[i] < self.min_interval[i]:
+                continue
+            frame, seq, captured_at = self.grabbers[i].latest()
+            if frame is None or seq == self.last_seq[i]:
+                continue
+            if self.last_seq[i] and seq > self.last_seq[i] + 1:
+                self.stats[i].dropped += seq - self.last_seq[i] - 1
+            self.last_seq[i] = seq
+            self.last_run[i] = now
+            batch.append((i, frame, captured_at))
+            if len(batch) >= self.max_batch:
+                break
+        # Bir sonraki turda sıradaki kaynaktan başla ki hep aynı kaynaklar öne geçmesin
+        self.rr_offset = (self.rr_offset + 1) % max(n, 1)
+        return batch
+
+    def step(self):
+        """Tek bir toplu çıkarım turu. İşlenen kare sayısını döner."""
+        batch = self._select_batch()
+        if not batch:
+            return 0
+
+        frames = [frame for _, frame, _ in batch]
+        outputs = {}
+        for name, (model, conf) in self.models.items():
+            results = model.predict(source=frames, conf=conf, verbose=False)
+            outputs[name] = [r.boxes.data.cpu().numpy() for r in results]
+
+        done = time.perf_counter()
+        for k, (i, frame, captured_at) in enumerate(batch):
+            self.stats[i].frames += 1
+            self.stats[i].latencies.append(done - captured_at)
+            if self.on_result:
+                self.on_result(i, frame, {name: dets[k] for name, dets in outputs.items()})
+        return len(batch)
+
+    def run(self, duration=None):
+        self.start()
+        t_end = time.perf_counter() + duration if duration else None
+        try:
+            while self.running:
+                if t_end and time.perf_counter() >= t_end:
+                    break
+                if all(g.finished for g in self.grabbers):
+                    break
+                if self.step() == 0:
+                    time.sleep(0.002)
+        finally:
+            self.stop()
+
+    def report(self):
+        return {str(src): self.stats[i].summary() for i, src in enumerate(self.sources)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çoklu kamera/RTSP kaynağı için paylaşımlı model zamanlayıcı")
+    parser.add_argument("sources", nargs="+", help="Kamera indeksi, RTSP adresi veya video dosyası")
+    parser.add_argument("--batch", type=int, default=8, help="Predict çağrısı başına en fazla kare")
+    parser.add_argument("--fps", type=float, default=None, help="Kaynak başına FPS sınırı")
+    parser.add_argument("--duration", type=float, default=None, help="Saniye cinsinden çalışma süresi")
+    parser.add_argument("--no-display", action="store_true", help="Pencere açmadan çalış")
+    parser.add_argument("--no-loop", action="store_true", help="Video dosyalarını başa sarma (bitince dur)")
+    args = parser.parse_args()
+
+    sources = [int(s) if s.isdigit() else s for s in args.sources]
+    fps_caps = {src: args.fps for src in sources} if args.fps else None
+
+    def show(i, frame, dets):
+        canvas = frame.copy()
+        for name, boxes in dets.items():
+            draw_detections(canvas, boxes, scheduler.models[name][0].names)
+        cv2.imshow(f"Kaynak {i}: {sources[i]}", canvas)
+        cv2.waitKey(1)
+
+    scheduler = MultiCameraScheduler(
+        sources,
+        max_batch=args.batch,
+        fps_caps=fps_caps,
+        loop_files=not args.no_loop,
+        on_result=None if args.no_display else show,
+    )
+    try:
+        scheduler.run(duration=args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        if not args.no_display:
+            cv2.destroyAllWindows()
+
+    print("Kaynak bazlı gecikme raporu:")
+    for src, s in scheduler.report().items():
+        print(
+            f"  {src}: {s['frames']} kare, {s['fps']:.1f} fps, atlanan {s['dropped']}, "
+            f"gecikme ort {s['latency_ms_mean']:.1f} ms / p50 {s['latency_ms_p50']:.1f} / p95 {s['latency_ms_p95']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+
+CSV_ENGINE = "pyarrow" if pa is not None else "c"
+# pyarrow akış okuyucusunun blok boyutu: ham metin için tepe bellek bu kadarla sınırlı kalır
+BLOCK_SIZE = 8 << 20
+STREAM_BLOCK_SIZE = 1 << 20
+
+# Motorun ve haritanın kullandığı sütunlar; place/nst/gap/dmin/rms vb. hiç okunmaz
+CATALOG_DTYPES = {
+    "latitude": "float32",
+    "longitude": "float32",
+    "depth": "float32",
+    "mag": "float32",
+    "magType": "category",
+    "net": "category",
+    "status": "category",
+}
+CATALOG_COLUMNS = ["time", *CATALOG_DTYPES]
+
+
+def _arrow_type(dtype):
+    if dtype == "category":
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.float32()
+
+
+def _open_arrow(path, usecols, dtypes, block_size=BLOCK_SIZE, use_threads=True):
+    # Blok blok ayrıştırır; sütunlar doğrudan float32/sözlük/UTC zaman tipinde oluşur
+    column_types = {c: _arrow_type(t) for c, t in dtypes.items()}
+    if "time" in usecols:
+        column_types["time"] = pa.timestamp("ms", tz="UTC")
+    return pa_csv.open_csv(
+        path,
+        read_options=pa_csv.ReadOptions(block_size=block_size, use_threads=use_threads),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols, column_types=column_types, strings_can_be_null=True,
+        ),
+    )
+
+
+def _read_arrow(path, usecols, dtypes):
+    table = _open_arrow(path, usecols, dtypes).read_all()
+    # self_destruct: dönüştürülen sütunların Arrow belleği hemen bırakılır
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def _catalog_columns(path, columns):
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in (columns or CATALOG_COLUMNS) if c in header]
+    dtypes = {c: t for c, t in CATALOG_DTYPES.items() if c in usecols}
+    return usecols, dtypes
+
+
+def iter_catalog_chunks(path, chunk_rows=500_000, columns=None):
+    """
+    Katalogu dosyadaki sırasıyla, en fazla chunk_rows satırlık DataFrame parçaları olarak okur.
+    Bellekte aynı anda yalnızca bir parça (ve bir ayrıştırma bloğu) bulunur; ileri okuma
+    yapan iş parçacıkları kapalıdır.
+    """
+    usecols, dtypes = _catalog_columns(path, columns)
+    if pa is None:
+        for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunk_rows):
+            if "time" in chunk:
+                chunk["time"] = pd.to_datetime(chunk["time"], utc=True, format="ISO8601")
+            yield chunk[usecols]
+        return
+    batches = []
+    rows = 0
+    for batch in _open_arrow(path, usecols, dtypes, block_size=STREAM_BLOCK_SIZE, use_threads=False):
+        batches.append(batch)
+        rows += batch.num_rows
+        if rows >= chunk_rows:
+            table = pa.Table.from_batches(batches)
+            batches = []
+            rows = 0
+            for start in range(0, table.num_rows, chunk_rows):
+                yield table.slice(start, chunk_rows).to_pandas()[usecols]
+    if batches:
+        yield pa.Table.from_batches(batches).to_pandas()[usecols]
+
+
+def load_catalog(path, columns=None):
+    """
+    Katalogu yalnızca gerekli sütunlarla ve küçük veri tipleriyle okur.
+    Zaman UTC (tz'li) olarak döner, satırlar zamana göre artan sıradadır.
+    """
+    usecols, dtypes = _catalog_columns(path, columns)
+    df = None
+    if pa is not None:
+        try:
+            df = _read_arrow(path, usecols, dtypes)
+        except pa.ArrowInvalid:
+            # Beklenmeyen zaman biçimi vb.: pandas ayrıştırıcısına düş
+            df = None
+    if df is None:
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes)
+        if "time" in df:
+            df["time"] = pd.to_datetime(df["time"], utc=True, format="ISO8601")
+    df = df[usecols]
+    if "time" in df and not df["time"].is_monotonic_increasing:
+        df = df.sort_values("time", kind="stable", ignore_index=True)
+    return df
+
+
+def load_catalog_since(path, since, columns=None, chunk_rows=100_000):
+    """
+    Yalnızca since (UTC) anından sonraki olayları load_catalog ile aynı tip ve sırada döner.
+    Dosya parça parça taranır: tepe bellek bir parça + seçilen satırlar kadardır.
+    """
+    since = pd.Timestamp(since)
+    parts = []
+    for chunk in iter_catalog_chunks(path, chunk_rows=chunk_rows, columns=columns):
+        chunk = chunk[chunk["time"] > since]
+        if len(chunk) or not parts:
+            parts.append(chunk)
+    if not parts:
+        return load_catalog(path, columns=columns)
+    df = pd.concat(parts, ignore_index=True)
+    # Parçaların sözlükleri farklı olabilir; birleşince object olan sütunlar yeniden kategorik
+    for col, dtype in CATALOG_DTYPES.items():
+        if dtype == "category" and col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    if not df["time"].is_monotonic_increasing:
+        df = df.sort_values("time", kind="stable", ignore_index=True)
+    return df
+
+
+def read_latest_time(path):
+    """Dosyadaki en yeni olay zamanını (UTC) yalnızca time sütununu okuyarak bulur."""
+    times = pd.read_csv(path, usecols=["time"], engine=CSV_ENGINE)["time"]
+    times = pd.to_datetime(times, utc=True, format="ISO8601", errors="coerce").dropna()
+    return times.max() if len(times) else None
+
+
+def _legacy_load(path):
+    # Önceki yol: tüm sütunlar, varsayılan tipler
+    df = pd.read_csv(path)
+    df["time"] = pd.to_datetime(df["time"])
+    return df.sort_values("time").reset_index(drop=True)
+
+
+def peak_rss_mb():
+    """Sürecin tepe RSS'i (MB). resource modülü yalnızca Unix'te var; diğerlerinde None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss Linux'ta KB, macOS'ta bayt cinsinden
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+
+
+def _measure(mode, path):
+    rss_before = peak_rss_mb()
+    t0 = time.perf_counter()
+    df = _legacy_load(path) if mode == "legacy" else load_catalog(path)
+    seconds = time.perf_counter() - t0
+    peak = peak_rss_mb()
+    if peak is None:
+        peak = rss_before = float("nan")
+    return {
+        "mode": mode,
+        "rows": len(df),
+        "columns": len(df.columns),
+        "seconds": round(seconds, 3),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 1e6, 1),
+        "peak_rss_mb": round(peak, 1),
+        "peak_rss_delta_mb": round(peak - rss_before, 1),
+    }
+
+
+def compare(path):
+    """Eski ve yeni yükleyiciyi ayrı süreçlerde çalıştırır (tepe RSS birbirini etkilemesin)."""
+    results = []
+    for mode in ("legacy", "lean"):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), path, "--measure", mode],
+            check=True, capture_output=True, text=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Katalog yükleme süresi ve bellek karşılaştırması")
+    parser.add_argument("csv", nargs="?", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--measure", choices=["legacy", "lean"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.csv)))
+        return
+    print(f"Motor: {CSV_ENGINE}")
+    for r in compare(args.csv):
+        print(
+            f"  {r['mode']:<7} {r['rows']} satır x {r['columns']} sütun: {r['seconds']:.3f} sn, "
+            f"çerçeve {r['frame_mb']} MB, tepe RSS {r['peak_rss_mb']} MB (+{r['peak_rss_delta_mb']} MB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
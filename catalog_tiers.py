@@ -0,0 +1,478 @@
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from engine_snapshot import frame_from_arrays, frame_to_arrays, open_snapshot, write_snapshot
+from features import _haversine
+
+# Soğuk katman özeti: 0.1°'lik hücreler (~11 km) ve 0.5 genişliğinde büyüklük aralıkları.
+# Aralık k, [MAG_EDGES[k], MAG_EDGES[k+1]) büyüklüklerini sayar; ilk aralık 0.5 altını,
+# son aralık 10 ve üstünü de kapsar.
+CELL_DEG = 0.1
+MAG_EDGES = np.arange(0.0, 10.01, 0.5)
+_KEY_BASE = 1_000_003
+_KEY_OFFSET = _KEY_BASE // 2
+
+
+def cell_keys(lats, lons, cell_deg=CELL_DEG):
+    """Hücre anahtarları; koordinatı eksik olaylar için geçerlilik maskesi de döner."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    valid = np.isfinite(lats) & np.isfinite(lons)
+    ci = np.floor(np.where(valid, lats, 0.0) / cell_deg).astype(np.int64)
+    cj = np.floor(np.where(valid, lons, 0.0) / cell_deg).astype(np.int64)
+    return ci * _KEY_BASE + cj, valid
+
+
+def epoch_ms(times):
+    """tz'li zaman Series'i veya datetime64 dizisi -> UTC int64 milisaniye."""
+    if isinstance(times, pd.Series):
+        if isinstance(times.dtype, pd.DatetimeTZDtype):
+            times = times.dt.tz_convert(None)
+        times = times.to_numpy()
+    return np.asarray(times).astype("datetime64[ms]").view(np.int64)
+
+
+def concat_frames(frames):
+    """
+    Aynı sütunlu çerçeveleri alt alta ekler. Kategorik sütunların kategori kümeleri farklı
+    olsa da sonuç kategorik kalır (pd.concat bunları object'e çevirirdi).
+    """
+    frames = list(frames)
+    out = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype) and not isinstance(
+            out[col].dtype, pd.CategoricalDtype
+        ):
+            out[col] = out[col].astype("category")
+    return out
+
+
+def _ranges(lo, hi):
+    # [lo_k, hi_k) aralıklarının birleşimi, döngüsüz
+    lengths = hi - lo
+    total = int(lengths.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(lo, lengths) + offsets
+
+
+class ColdSummary:
+    """
+    Soğuk katmanın bellekte kalan özeti: hücre x büyüklük aralığı olay sayıları, hücre başına
+    ilk/son olay zamanı ve sorgu yolunun ihtiyaç duyduğu toplamlar. Boyutu olay sayısıyla
+    değil dolu hücre sayısıyla (bölgenin alanıyla) sınırlıdır. Değişmezdir; add() yenisini döner.
+    """
+
+    def __init__(self, keys, counts, first_ms, last_ms, totals):
+        self.keys = keys
+        self.counts = counts
+        self.first_ms = first_ms
+        self.last_ms = last_ms
+        self.totals = totals
+        ci = (keys + _KEY_OFFSET) // _KEY_BASE
+        cj = keys - ci * _KEY_BASE
+        self.center_lat = (ci + 0.5) * CELL_DEG
+        self.center_lon = (cj + 0.5) * CELL_DEG
+        # Merkezden hücredeki en uzak noktaya (köşe) mesafe; yuvarlama için küçük pay
+        half = CELL_DEG / 2
+        reach = np.zeros(len(keys))
+        for dlat in (-half, half):
+            for dlon in (-half, half):
+                np.maximum(reach, _haversine(self.center_lat, self.center_lon,
+                                             self.center_lat + dlat, self.center_lon + dlon), out=reach)
+        self.reach_km = reach * 1.001 + 0.01
+
+    @classmethod
+    def empty(cls):
+        totals = {"events": 0, "main_events": 0, "main_depth_sum": 0.0,
+                  "first_ms": None, "first_main_ms": None, "last_ms": None}
+        return cls(np.zeros(0, dtype=np.int64), np.zeros((0, len(MAG_EDGES)), dtype=np.int32),
+                   np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), totals)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.keys, self.counts, self.first_ms, self.last_ms,
+                                      self.center_lat, self.center_lon, self.reach_km))
+
+    def add(self, df_full, df_main):
+        """df_full / df_main satırları eklenmiş yeni özet."""
+        keys_new, valid = cell_keys(df_full["latitude"], df_full["longitude"])
+        keys_new = keys_new[valid]
+        ms = epoch_ms(df_full["time"])
+        mags = df_full["mag"].to_numpy(dtype=np.float64)[valid]
+
+        keys = np.union1d(self.keys, keys_new)
+        counts = np.zeros((len(keys), len(MAG_EDGES)), dtype=np.int32)
+        first = np.full(len(keys), np.iinfo(np.int64).max)
+        last = np.full(len(keys), np.iinfo(np.int64).min)
+        old = np.searchsorted(keys, self.keys)
+        counts[old] = self.counts
+        first[old] = self.first_ms
+        last[old] = self.last_ms
+
+        pos = np.searchsorted(keys, keys_new)
+        finite = np.isfinite(mags)
+        bins = np.clip(np.searchsorted(MAG_EDGES, mags[finite], side="right") - 1, 0, len(MAG_EDGES) - 1)
+        np.add.at(counts, (pos[finite], bins), 1)
+        np.minimum.at(first, pos, ms[valid])
+        np.maximum.at(last, pos, ms[valid])
+
+        totals = dict(self.totals)
+        totals["events"] += len(df_full)
+        totals["main_events"] += len(df_main)
+        totals["main_depth_sum"] += float(df_main["depth"].to_numpy(dtype=np.float64).sum())
+        if len(df_full):
+            totals["first_ms"] = int(ms.min()) if totals["first_ms"] is None else min(totals["first_ms"], int(ms.min()))
+            totals["last_ms"] = int(ms.max()) if totals["last_ms"] is None else max(totals["last_ms"], int(ms.max()))
+        if len(df_main) and totals["first_main_ms"] is None:
+            totals["first_main_ms"] = int(epoch_ms(df_main["time"]).min())
+        return ColdSummary(keys, counts, first, last, totals)
+
+    def classify(self, lat, lon, radius_km):
+        """(tamamen içerideki hücreler, sınırı kesen hücreler) maskeleri."""
+        d = _haversine(lat, lon, self.center_lat, self.center_lon)
+        inside = d + self.reach_km <= radius_km
+        edge = ~inside & (d - self.reach_km <= radius_km)
+        return inside, edge
+
+
+class _Segment:
+    """Arşivin bir segment dosyası: bellek eşlemeli açılır, satırlar istendiğinde okunur."""
+
+    def __init__(self, path):
+        self.path = path
+        self.arrays, self.meta = open_snapshot(path)
+
+    @property
+    def rows(self):
+        return self.meta["rows"]
+
+    def frame(self, name, idx=None):
+        arrays = {k: v for k, v in self.arrays.items() if k.startswith(f"{name}/")}
+        if idx is not None:
+            arrays = {k: v[idx] for k, v in arrays.items()}
+        return frame_from_arrays(arrays, self.meta["frames"][name], name)
+
+    def cell_rows(self, keys):
+        """keys hücrelerindeki df_full satır numaraları (artan sırada)."""
+        ckeys = self.arrays["cell/keys"]
+        if not len(ckeys) or not len(keys):
+            return np.zeros(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(ckeys, keys), len(ckeys) - 1)
+        pos = pos[ckeys[pos] == keys]
+        starts = self.arrays["cell/starts"]
+        return np.sort(self.arrays["cell/order"][_ranges(starts[pos], starts[pos + 1])])
+
+
+def write_segment(path, df_full, df_main):
+    """Soğuk satırları zaman sırasıyla ve hücreye göre satır dizini ile tek dosyaya yazar."""
+    arrays, full_schema = frame_to_arrays(df_full, "df_full")
+    main_arrays, main_schema = frame_to_arrays(df_main, "df_main")
+    arrays.update(main_arrays)
+    keys, valid = cell_keys(df_full["latitude"], df_full["longitude"])
+    rows = np.nonzero(valid)[0]
+    order = rows[np.argsort(keys[rows], kind="stable")]
+    ukeys, starts = np.unique(keys[order], return_index=True)
+    arrays["cell/keys"] = ukeys
+    arrays["cell/starts"] = np.append(starts, len(order)).astype(np.int64)
+    arrays["cell/order"] = order.astype(np.int64)
+    meta = {"frames": {"df_full": full_schema, "df_main": main_schema},
+            "rows": len(df_full), "main_rows": len(df_main)}
+    return write_snapshot(path, arrays, meta)
+
+
+class ColdArchive:
+    """
+    Soğuk katmanın diskteki tam ayrıntılı kopyası: eklemeli, zaman sıralı segment dosyaları.
+    Son iki segment benzer boydaysa birleştirilir; segment sayısı satır sayısının logaritması
+    kadar kalır. Değişmezdir: append() yeni nesne döner, eski görüntüyü tutan sorgular
+    kendi segmentlerini okumaya devam eder.
+    """
+
+    def __init__(self, directory, segments=(), next_id=0):
+        self.directory = directory
+        self.segments = list(segments)
+        self.next_id = next_id
+
+    @property
+    def rows(self):
+        return sum(s.rows for s in self.segments)
+
+    @property
+    def disk_bytes(self):
+        return sum(os.path.getsize(s.path) for s in self.segments if os.path.exists(s.path))
+
+    def append(self, df_full, df_main):
+        os.makedirs(self.directory, exist_ok=True)
+        segments = list(self.segments)
+        next_id = self.next_id
+
+        def new_path():
+            nonlocal next_id
+            next_id += 1
+            return os.path.join(self.directory, f"segment-{next_id - 1:05d}.snap")
+
+        segments.append(_Segment(write_segment(new_path(), df_full, df_main)))
+        while len(segments) >= 2 and segments[-2].rows <= 2 * segments[-1].rows:
+            a, b = segments[-2:]
+            merged = write_segment(
+                new_path(),
+                concat_frames([a.frame("df_full"), b.frame("df_full")]),
+                concat_frames([a.frame("df_main"), b.frame("df_main")]),
+            )
+            segments[-2:] = [_Segment(merged)]
+            for old in (a, b):
+                try:
+                    # Eşlemesi açık kalan eski görüntüler silinen dosyayı okumaya devam eder
+                    os.remove(old.path)
+                except OSError:
+                    pass
+        return ColdArchive(self.directory, segments, next_id)
+
+    def events_in_cells(self, keys):
+        """Hücrelerdeki olayların konum/büyüklük/zaman dizileri (yalnızca bu satırlar okunur)."""
+        parts = []
+        for seg in self.segments:
+            idx = seg.cell_rows(keys)
+            if len(idx):
+                a = seg.arrays
+                parts.append((a["df_full/latitude"][idx], a["df_full/longitude"][idx],
+                              a["df_full/mag"][idx], epoch_ms(a["df_full/time"][idx])))
+        if not parts:
+            empty = np.zeros(0)
+            return empty, empty, empty, np.zeros(0, dtype=np.int64)
+        return tuple(np.concatenate(col) for col in zip(*parts))
+
+    def frames_in_cells(self, keys):
+        """Hücrelerdeki df_full satırları, zaman sırasıyla (DataFrame listesi)."""
+        out = []
+        for seg in self.segments:
+            idx = seg.cell_rows(keys)
+            if len(idx):
+                out.append(seg.frame("df_full", idx))
+        return out
+
+    def frames(self):
+        """Arşivin tamamı (df_full, df_main); segmentler diskten okunup birleştirilir."""
+        if not self.segments:
+            return None, None
+        return (concat_frames([s.frame("df_full") for s in self.segments]),
+                concat_frames([s.frame("df_main") for s in self.segments]))
+
+
+class ColdTier:
+    """Özet (bellekte) + arşiv (diskte). Motorun sorgu yolu yalnızca özeti ve sınır hücrelerini okur."""
+
+    def __init__(self, summary, archive):
+        self.summary = summary
+        self.archive = archive
+
+    @classmethod
+    def create(cls, directory):
+        return cls(ColdSummary.empty(), ColdArchive(directory))
+
+    @property
+    def rows(self):
+        return self.summary.totals["events"]
+
+    def add(self, df_full, df_main):
+        if not len(df_full):
+            return self
+        return ColdTier(self.summary.add(df_full, df_main), self.archive.append(df_full, df_main))
+
+    def hazard_terms(self, lat, lon, radius_km, mag_threshold):
+        """
+        Uzun vadeli tehlikenin soğuk katmandaki terimleri: yarıçap içindeki
+        mag >= mag_threshold olay sayısı ile ilk/son olay zamanı (ms; olay yoksa None).
+        Tamamen içerideki hücreler histogramdan, sınırı kesen hücreler arşivdeki olaylardan
+        tam mesafeyle sayılır; sonuç tüm olaylar üzerinden hesapla aynıdır.
+        """
+        s = self.summary
+        inside, edge = s.classify(lat, lon, radius_km)
+        edges = MAG_EDGES[1:]
+        if np.isin(mag_threshold, edges):
+            k = int(np.searchsorted(MAG_EDGES, mag_threshold))
+            n_big = int(s.counts[inside, k:].sum())
+        else:
+            # Eşik aralık sınırında değil: histogram yetmez, içerideki hücreler de arşivden
+            edge |= inside
+            inside[:] = False
+            n_big = 0
+        firsts = [s.first_ms[inside]]
+        lasts = [s.last_ms[inside]]
+        if edge.any():
+            lats, lons, mags, ms = self.archive.events_in_cells(s.keys[edge])
+            near = _haversine(lat, lon, lats.astype(np.float64), lons.astype(np.float64)) <= radius_km
+            n_big += int((mags[near] >= mag_threshold).sum())
+            firsts.append(ms[near])
+            lasts.append(ms[near])
+        firsts = np.concatenate(firsts)
+        if not len(firsts):
+            return n_big, None, None
+        return n_big, int(firsts.min()), int(np.concatenate(lasts).max())
+
+    def quakes_near(self, lat, lon, radius_km):
+        """Arşivden yarıçap içindeki df_full satırları (DataFrame listesi)."""
+        inside, edge = self.summary.classify(lat, lon, radius_km)
+        out = []
+        for frame in self.archive.frames_in_cells(self.summary.keys[inside | edge]):
+            d = _haversine(lat, lon, frame["latitude"].to_numpy(dtype=np.float64),
+                           frame["longitude"].to_numpy(dtype=np.float64))
+            out.append(frame[d <= radius_km])
+        return out
+
+    def frames(self):
+        return self.archive.frames()
+
+    def info(self):
+        return {
+            "cold_events": self.rows,
+            "cells": len(self.summary.keys),
+            "summary_kb": round(self.summary.nbytes / 1024, 1),
+            "archive_mb": round(self.archive.disk_bytes / 1e6, 2),
+            "segments": len(self.archive.segments),
+        }
+
+
+# --- Ölçüm: katalog yıllar boyunca büyürken tam ve katmanlı motor ---
+
+def _rss_mb():
+    try:
+        # Serbest bırakılan yığın sayfaları işletim sistemine geri verilsin (glibc)
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+    out = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "RssAnon:")):
+                key = "rss_mb" if line.startswith("VmRSS:") else "anon_mb"
+                out[key] = round(int(line.split()[1]) / 1024, 1)
+    return out
+
+
+def _frames_mb(catalog):
+    total = sum(df.memory_usage(deep=True).sum() for df in (catalog.df_full, catalog.df_main))
+    for value in (catalog.arrays or {}).values():
+        total += getattr(value, "nbytes", 0)
+    if catalog.cold is not None:
+        total += catalog.cold.summary.nbytes
+    return round(total / 1e6, 2)
+
+
+def _measure(mode, csv_path, batch_dir, hot_days, sites_path):
+    from data_manager import _prepend_rows
+    from risk_engine import EarthquakeRiskEngine
+
+    sites = pd.read_csv(sites_path)
+    points = list(zip(sites["latitude"].astype(float), sites["longitude"].astype(float)))
+    engine = EarthquakeRiskEngine(csv_path=csv_path, cache_dir=None)
+    engine.predict_thread_count = 1
+    if mode == "tiered":
+        engine.hot_days = hot_days
+    engine.warm_up()
+
+    batches = sorted(f for f in os.listdir(batch_dir) if f.endswith(".csv"))
+    for year in range(len(batches) + 1):
+        refresh = 0.0
+        if year:
+            _prepend_rows(pd.read_csv(os.path.join(batch_dir, batches[year - 1])), csv_path)
+            t0 = time.perf_counter()
+            engine.refresh_catalog(background=False)
+            refresh = time.perf_counter() - t0
+        catalog = engine._catalog
+        scores = engine.score_many(points)
+        gc.collect()
+        row = {
+            "year": year,
+            "hot_events": len(catalog.df_full),
+            "refresh_s": round(refresh, 2),
+            "resident_mb": _frames_mb(catalog),
+            **_rss_mb(),
+            "scores": [s["final_score"] for s in scores],
+        }
+        if catalog.cold is not None:
+            row.update(catalog.cold.info())
+        print(json.dumps(row), flush=True)
+
+
+def compare(csv_path, years=8, events_per_year=20_000, hot_days=365, sites_path=None, seed=7):
+    """
+    Katalog yıl yıl büyürken (sentetik canlı akış) tam ve katmanlı motoru ayrı süreçlerde
+    çalıştırır; her yıl sonunda bellek ve illerin nihai skorları karşılaştırılır.
+    """
+    from catalog_io import read_latest_time
+    from synthetic_catalog import generate_catalog
+
+    sites_path = sites_path or os.path.join("assets", "provinces.csv")
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_dir = os.path.join(tmp, "batches")
+        os.makedirs(batch_dir)
+        start = read_latest_time(csv_path) + pd.Timedelta(days=1)
+        for k in range(years):
+            df = generate_catalog(events_per_year, seed=seed + k, start=start.tz_convert(None).isoformat(),
+                                  years=1.0)
+            # Artçı dizileri yıl sonunu aşabilir; yıllar çakışmasın (akış zaman sırasıyla gelir)
+            df = df[df["time"] < start + pd.Timedelta(days=366)]
+            df["time"] = df["time"].dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            # Canlı akıştaki gibi yeniden eskiye
+            df.iloc[::-1].to_csv(os.path.join(batch_dir, f"year-{k + 1:02d}.csv"), index=False)
+            start += pd.Timedelta(days=366)
+
+        results = {}
+        for mode in ("full", "tiered"):
+            work = os.path.join(tmp, mode)
+            os.makedirs(work)
+            path = os.path.join(work, "query.csv")
+            shutil.copy(csv_path, path)
+            proc = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", mode, "--csv", path,
+                 "--batch-dir", batch_dir, "--hot-days", str(hot_days), "--sites", sites_path],
+                stdout=subprocess.PIPE, text=True, check=True,
+            )
+            results[mode] = [json.loads(line) for line in proc.stdout.splitlines() if line.startswith("{")]
+    for full, tiered in zip(results["full"], results["tiered"]):
+        tiered["max_score_diff"] = float(np.max(np.abs(np.subtract(full["scores"], tiered["scores"]))))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sıcak/soğuk katmanlı katalog: bellek ve doğruluk ölçümü")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--years", type=int, default=8, help="Benzetilen canlı akış süresi (yıl)")
+    parser.add_argument("--events-per-year", type=int, default=20_000)
+    parser.add_argument("--hot-days", type=float, default=365)
+    parser.add_argument("--sites", default=None, help="Skorları karşılaştırılacak konumlar (varsayılan: iller)")
+    parser.add_argument("--measure", choices=["full", "tiered"], help=argparse.SUPPRESS)
+    parser.add_argument("--batch-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(args.measure, args.csv, args.batch_dir, args.hot_days, args.sites)
+        return
+
+    r = compare(args.csv, years=args.years, events_per_year=args.events_per_year,
+                hot_days=args.hot_days, sites_path=args.sites)
+    # MB: çerçeveler + sorgu dizileri + özet; RSS/anon: süreç toplamı ve dosyaya bağlı olmayan kısmı
+    print(f"{'yıl':>3} {'tam: olay':>10} {'MB':>6} {'RSS/anon':>13} {'yenileme':>8} | "
+          f"{'sıcak':>6} {'soğuk':>7} {'MB':>5} {'RSS/anon':>13} {'yenileme':>8} {'arşiv MB':>8} {'skor farkı':>10}")
+    for full, tiered in zip(r["full"], r["tiered"]):
+        print(f"{full['year']:>3} {full['hot_events']:>10} {full['resident_mb']:>6} "
+              f"{full['rss_mb']:>6}/{full['anon_mb']:<6} {full['refresh_s']:>7}s | "
+              f"{tiered['hot_events']:>6} {tiered['cold_events']:>7} {tiered['resident_mb']:>5} "
+              f"{tiered['rss_mb']:>6}/{tiered['anon_mb']:<6} {tiered['refresh_s']:>7}s "
+              f"{tiered['archive_mb']:>8} {tiered['max_score_diff']:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
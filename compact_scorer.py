@@ -0,0 +1,390 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from scipy.stats import spearmanr
+
+try:
+    from catboost import CatBoostRegressor
+except ImportError:
+    CatBoostRegressor = None
+
+# Damıtılmış öğrenci: tam modelin ham logit çıktısını taklit eden sığ model
+DISTILL_PARAMS = {
+    "iterations": 300,
+    "depth": 4,
+    "learning_rate": 0.1,
+    "loss_function": "RMSE",
+    "random_seed": 42,
+    "border_count": 64,
+    "verbose": False,
+}
+# "prune" yönteminde tam modelden tutulan ilk ağaç sayısı
+PRUNE_TREES = 200
+# Damıtma aktarım kümesine eklenen, son katalog anında sorgu noktası özellikleri
+TRANSFER_POINTS = 20_000
+# Bu kadar satıra kadar tek adımlı (satır x ağaç x derinlik) yol; üstünde derinlik döngüsü
+_SMALL_BATCH = 32
+# Toplu değerlendirmede ara dizi (ağaç x satır) üst sınırı
+_CHUNK_CELLS = 4_000_000
+
+
+def _catboost_json(model):
+    # Simetrik ağaçlar (bölme öznitelikleri, eşikler, yaprak değerleri) JSON dökümünden okunur
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        model.save_model(path, format="json")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+def _sigmoid(raw):
+    return 1.0 / (1.0 + np.exp(-raw))
+
+
+class CompactScorer:
+    """
+    CatBoost simetrik (oblivious) ağaç topluluğunun NumPy ile değerlendirilmesi.
+    Her ağaç derinlik kadar (öznitelik > eşik) testinin bitlerinden yaprak indeksi üretir;
+    DataFrame ve CatBoost Pool kurulmaz, tek satırda maliyet ağaç x derinlik karşılaştırmadır.
+    Özellikler float32'ye çevrilerek CatBoost ile aynı sınıflandırma kararları verilir.
+    """
+
+    def __init__(self, features, borders, leaf_values, leaf_offsets, scale, bias, n_features, method="exact"):
+        self.features = np.asarray(features, dtype=np.int32)
+        self.borders = np.ascontiguousarray(borders, dtype=np.float32)
+        self.leaf_values = np.asarray(leaf_values, dtype=np.float64)
+        self.leaf_offsets = np.asarray(leaf_offsets, dtype=np.int64)
+        self.scale = float(scale)
+        self.bias = float(bias)
+        self.n_features = int(n_features)
+        self.method = method
+        self._pow2 = (1 << np.arange(self.features.shape[1], dtype=np.int64))
+        self._single = np.zeros(1, dtype=np.int64)
+        # Toplu yol için farklı (öznitelik, eşik) çiftleri: her biri satır başına bir kez karşılaştırılır
+        pairs = np.stack([self.features.ravel().astype(np.int64),
+                          self.borders.ravel().view(np.int32).astype(np.int64)], axis=1)
+        uniq, inv = np.unique(pairs, axis=0, return_inverse=True)
+        self._split_feature = uniq[:, 0].astype(np.intp)
+        self._split_border = uniq[:, 1].astype(np.int32).view(np.float32)
+        self._split_id = inv.reshape(self.features.shape)
+        self._leaf_dtype = np.uint8 if self.depth <= 8 else np.uint16
+        self._local = threading.local()
+
+    @property
+    def n_trees(self):
+        return len(self.features)
+
+    @property
+    def depth(self):
+        return self.features.shape[1]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.features, self.borders, self.leaf_values, self.leaf_offsets))
+
+    @classmethod
+    def from_catboost(cls, model, ntree_end=None, method="exact"):
+        """Eğitilmiş CatBoost modelinin ilk ntree_end ağacından (None: hepsi) değerlendirici kurar."""
+        data = _catboost_json(model)
+        trees = data["oblivious_trees"][:ntree_end]
+        depth = max((len(t["splits"]) for t in trees), default=1) or 1
+        features = np.zeros((len(trees), depth), dtype=np.int32)
+        # Eksik derinlikler hiç sağlanmayan (+inf) eşikle doldurulur: bit 0 kalır
+        borders = np.full((len(trees), depth), np.inf, dtype=np.float32)
+        leaves = []
+        offsets = np.zeros(len(trees), dtype=np.int64)
+        pos = 0
+        for k, tree in enumerate(trees):
+            for d, split in enumerate(tree["splits"]):
+                if split.get("split_type", "FloatFeature") != "FloatFeature":
+                    raise ValueError("Yalnızca sayısal bölmeli modeller desteklenir.")
+                features[k, d] = split["float_feature_index"]
+                borders[k, d] = split["border"]
+            offsets[k] = pos
+            leaves.append(np.asarray(tree["leaf_values"], dtype=np.float64))
+            pos += len(tree["leaf_values"])
+        scale, bias = data.get("scale_and_bias", [1.0, [0.0]])
+        bias = bias[0] if isinstance(bias, (list, tuple)) else bias
+        n_features = len(data["features_info"].get("float_features", []))
+        return cls(features, borders, np.concatenate(leaves) if leaves else np.zeros(0),
+                   offsets, scale, bias, n_features, method=method)
+
+    @classmethod
+    def distill(cls, teacher, x, params=None):
+        """
+        Öğrenci modeli öğretmenin ham logit çıktısına (RawFormulaVal) RMSE ile eğitir;
+        olasılık ölçeği sigmoid ile korunur. x: aktarım kümesi (eğitim satırları + sorgu noktaları).
+        """
+        if CatBoostRegressor is None:
+            raise RuntimeError("catboost paketi yüklü olmalı.")
+        x = np.asarray(x, dtype=np.float64)
+        target = teacher.predict(x, prediction_type="RawFormulaVal")
+        student = CatBoostRegressor(**dict(DISTILL_PARAMS, **(params or {})))
+        student.fit(x, target)
+        return cls.from_catboost(student, method="distill")
+
+    @classmethod
+    def build(cls, teacher, x=None, method="exact", params=None):
+        """
+        method: exact (tüm ağaçlar, tam modelle aynı skor), distill (x üzerinde eğitilmiş sığ
+        öğrenci) veya prune (ilk PRUNE_TREES ağaç). Erken durdurma öğretmeni zaten küçük
+        tutuyorsa exact hem hızlı hem birebir aynıdır; distill/prune büyük öğretmen içindir.
+        """
+        params = dict(params or {})
+        trees = params.pop("trees", PRUNE_TREES)
+        if method == "distill":
+            return cls.distill(teacher, x, params)
+        if method == "prune":
+            return cls.from_catboost(teacher, ntree_end=trees, method="prune")
+        if method == "exact":
+            return cls.from_catboost(teacher, method="exact")
+        raise ValueError(f"Bilinmeyen yöntem: {method}")
+
+    def buffer(self, n):
+        """İş parçacığına özel, önceden ayrılmış (n, öznitelik) float64 özellik tamponu (görünüm)."""
+        buf = getattr(self._local, "buf", None)
+        if buf is None or len(buf) < n:
+            buf = np.empty((max(n, 64), self.n_features), dtype=np.float64)
+            self._local.buf = buf
+        return buf[:n]
+
+    def _tree_sums(self, x, starts):
+        """(satır, grup) ağaç çıktısı toplamları; grup i, starts[i] ağacından bir sonrakine kadardır."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[None, :]
+        if len(x) <= _SMALL_BATCH:
+            # Az satır: tüm (satır, ağaç, derinlik) bitleri tek seferde, yaprak indeksi matris çarpımıyla
+            bits = x[:, self.features] > self.borders
+            leaf = bits.astype(np.int64) @ self._pow2
+            return np.add.reduceat(self.leaf_values[self.leaf_offsets + leaf], starts, axis=1)
+        out = np.empty((len(x), len(starts)), dtype=np.float64)
+        step = max(1, _CHUNK_CELLS // max(1, self.n_trees))
+        for start in range(0, len(x), step):
+            # Çok satır: her farklı eşik bir kez karşılaştırılır, ağaçlar bu bitleri (ağaç, satır)
+            # düzeninde küçük tamsayı yaprak indeksine toplar
+            xt = np.ascontiguousarray(x[start:start + step].T)
+            bits = (xt[self._split_feature] > self._split_border[:, None]).view(np.uint8)
+            if self._leaf_dtype is not np.uint8:
+                bits = bits.astype(self._leaf_dtype)
+            leaf = bits[self._split_id[:, 0]]
+            for d in range(1, self.depth):
+                leaf |= bits[self._split_id[:, d]] << d
+            values = self.leaf_values[self.leaf_offsets[:, None] + leaf]
+            out[start:start + step] = np.add.reduceat(values, starts, axis=0).T
+        return out
+
+    def raw(self, x):
+        return self.scale * self._tree_sums(x, self._single)[:, 0] + self.bias
+
+    def predict_proba(self, x):
+        """Pozitif sınıf olasılıkları (1 boyutlu)."""
+        return _sigmoid(self.raw(x))
+
+    def info(self):
+        return {"method": self.method, "trees": self.n_trees, "depth": self.depth,
+                "kb": round(self.nbytes / 1024, 1)}
+
+    _ARRAYS = ("features", "borders", "leaf_values", "leaf_offsets")
+
+    def _meta(self):
+        return {"scale": self.scale, "bias": self.bias, "n_features": self.n_features, "method": self.method}
+
+    def save(self, path):
+        np.savez(path, meta=np.array(json.dumps(self._meta())), **{k: getattr(self, k) for k in self._ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {k: data[k] for k in cls._ARRAYS}
+        return cls(**arrays, **meta)
+
+
+class CompactEnsemble(CompactScorer):
+    """
+    Üyeleri ayrı CatBoost modelleri olan topluluk. Üyelerin ağaçları tek dizide art arda
+    durur (member_starts); tek geçişte her (satır, üye) ham skoru çıkar. Özellik matrisi ve
+    farklı eşik karşılaştırmaları üyeler arasında paylaşılır, üye başına ek maliyet yalnızca
+    yaprak indeksleme ve toplamadır.
+    """
+
+    def __init__(self, features, borders, leaf_values, leaf_offsets, member_starts, member_scale,
+                 member_bias, n_features, method="bootstrap"):
+        super().__init__(features, borders, leaf_values, leaf_offsets, 1.0, 0.0, n_features, method=method)
+        self.member_starts = np.asarray(member_starts, dtype=np.int64)
+        self.member_scale = np.asarray(member_scale, dtype=np.float64)
+        self.member_bias = np.asarray(member_bias, dtype=np.float64)
+
+    @property
+    def n_members(self):
+        return len(self.member_starts)
+
+    @property
+    def nbytes(self):
+        return super().nbytes + self.member_starts.nbytes + self.member_scale.nbytes + self.member_bias.nbytes
+
+    @classmethod
+    def from_members(cls, scorers, method="bootstrap"):
+        """CompactScorer üyelerini tek diziye dizer (sığ ağaçlar +inf eşikle en derine tamamlanır)."""
+        depth = max(s.depth for s in scorers)
+        features, borders, leaves, offsets, starts = [], [], [], [], []
+        trees = 0
+        leaf_pos = 0
+        for s in scorers:
+            pad = depth - s.depth
+            features.append(np.pad(s.features, ((0, 0), (0, pad))))
+            borders.append(np.pad(s.borders, ((0, 0), (0, pad)), constant_values=np.inf))
+            leaves.append(s.leaf_values)
+            offsets.append(s.leaf_offsets + leaf_pos)
+            starts.append(trees)
+            trees += s.n_trees
+            leaf_pos += len(s.leaf_values)
+        return cls(np.concatenate(features), np.concatenate(borders), np.concatenate(leaves),
+                   np.concatenate(offsets), starts, [s.scale for s in scorers], [s.bias for s in scorers],
+                   scorers[0].n_features, method=method)
+
+    def member_raw(self, x):
+        """(satır, üye) ham skorlar."""
+        return self._tree_sums(x, self.member_starts) * self.member_scale + self.member_bias
+
+    def member_proba(self, x):
+        """(satır, üye) olasılıklar."""
+        return _sigmoid(self.member_raw(x))
+
+    def raw(self, x):
+        # Ortalama olasılığın logiti: predict_proba ile tutarlı
+        p = np.clip(self.predict_proba(x), 1e-12, 1 - 1e-12)
+        return np.log(p / (1 - p))
+
+    def predict_proba(self, x):
+        """Üye olasılıklarının ortalaması."""
+        return self.member_proba(x).mean(axis=1)
+
+    def info(self):
+        return dict(super().info(), members=self.n_members)
+
+    _ARRAYS = CompactScorer._ARRAYS + ("member_starts", "member_scale", "member_bias")
+
+    def _meta(self):
+        return {"n_features": self.n_features, "method": self.method}
+
+
+def summarize_members(member_probas, quantiles=(0.05, 0.5, 0.95)):
+    """(satır, üye) olasılıklarından ortalama, yayılım (std) ve nicelikler: {ad: (satır,) dizi}."""
+    p = np.asarray(member_probas, dtype=np.float64)
+    out = {
+        "mean": p.mean(axis=1),
+        "std": p.std(axis=1, ddof=1) if p.shape[1] > 1 else np.zeros(len(p)),
+    }
+    for q, values in zip(quantiles, np.quantile(p, quantiles, axis=1)):
+        out[f"q{round(q * 100):02d}"] = values
+    return out
+
+
+def agreement(full, compact, y=None, bins=10):
+    """
+    Sıkıştırılmış skorların tam modelle uyumu: sıra korelasyonu, mutlak fark, tam modelin
+    ondalık dilimlerinde ortalama olasılık farkı (kalibrasyon) ve etiket varsa Brier.
+    """
+    full = np.asarray(full, dtype=float)
+    compact = np.asarray(compact, dtype=float)
+    diff = np.abs(full - compact)
+    edges = np.unique(np.quantile(full, np.linspace(0, 1, bins + 1)))
+    which = np.clip(np.searchsorted(edges, full, side="right") - 1, 0, max(len(edges) - 2, 0))
+    gaps = [abs(full[which == b].mean() - compact[which == b].mean()) for b in np.unique(which)]
+    out = {
+        "n": int(len(full)),
+        "spearman": float(spearmanr(full, compact).statistic) if len(full) > 1 else float("nan"),
+        "mean_abs_diff": float(diff.mean()),
+        "p99_abs_diff": float(np.percentile(diff, 99)),
+        "max_abs_diff": float(diff.max()),
+        "calibration_gap": float(max(gaps)),
+        "mean_full": float(full.mean()),
+        "mean_compact": float(compact.mean()),
+    }
+    if y is not None:
+        y = np.asarray(y, dtype=float)
+        out["brier_full"] = float(np.mean((full - y) ** 2))
+        out["brier_compact"] = float(np.mean((compact - y) ** 2))
+    return out
+
+
+def _time_calls(fn, calls):
+    t0 = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - t0) / len(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sıkıştırılmış kısa vadeli skorlayıcı: tam modelle uyum ve gecikme")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--method", choices=["exact", "distill", "prune"], default="exact")
+    parser.add_argument("--depth", type=int, default=DISTILL_PARAMS["depth"])
+    parser.add_argument("--iterations", type=int, default=DISTILL_PARAMS["iterations"])
+    parser.add_argument("--trees", type=int, default=PRUNE_TREES, help="prune: tutulan ağaç sayısı")
+    parser.add_argument("--points", type=int, default=2000, help="Uyum için rastgele sorgu noktası")
+    parser.add_argument("--single", type=int, default=200, help="Tek satır gecikmesi için çağrı sayısı")
+    parser.add_argument("--batch", type=int, default=1000, help="Toplu gecikme için nokta sayısı")
+    args = parser.parse_args()
+
+    from synthetic_catalog import synthetic_locations
+    from risk_engine import EarthquakeRiskEngine, RISK_FEATURE_COLUMNS
+
+    engine = EarthquakeRiskEngine(csv_path=args.csv, cache_dir=args.cache_dir or None)
+    engine.scorer = "compact"
+    engine.compact_params = {"method": args.method, "depth": args.depth,
+                             "iterations": args.iterations, "trees": args.trees}
+    engine.warm_up()
+    t0 = time.perf_counter()
+    scorer = engine.compact_scorer()
+    print(f"Sıkıştırılmış skorlayıcı: {scorer.info()} ({time.perf_counter() - t0:.2f} sn); "
+          f"tam model {engine.model.tree_count_} ağaç")
+
+    # Uyum: eğitim olayları (etiketli) ve eğitimde kullanılmayan tohumla sorgu noktaları
+    df_main = engine.full_frames()[1]
+    x_train = df_main[RISK_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y_train = df_main["label_30d"].astype(int).to_numpy()
+    locs = synthetic_locations(args.points, seed=12345)
+    points = list(zip(locs["latitude"], locs["longitude"]))
+    x_query = engine._short_term_feature_matrix(points)
+    for name, x, y in (("eğitim olayları", x_train, y_train), ("sorgu noktaları", x_query, None)):
+        full = engine.model.predict_proba(x)[:, 1]
+        a = agreement(full, scorer.predict_proba(x), y)
+        line = (f"  {name} ({a['n']}): Spearman {a['spearman']:.4f}, |fark| ort {a['mean_abs_diff']:.4f} "
+                f"p99 {a['p99_abs_diff']:.4f} max {a['max_abs_diff']:.4f}, kalibrasyon farkı "
+                f"{a['calibration_gap']:.4f} (ort {a['mean_full']:.4f} / {a['mean_compact']:.4f})")
+        if y is not None:
+            line += f", Brier {a['brier_full']:.4f} / {a['brier_compact']:.4f}"
+        print(line)
+
+    # Gecikme: özellik çıkarımı dahil kısa vadeli olasılık (sonuç önbelleği devre dışı)
+    single = [([p],) for p in points[:args.single]]
+    batch = points[:args.batch]
+    print("Gecikme (özellikler dahil):")
+    for mode in ("full", "compact"):
+        engine.scorer = mode
+        engine._short_term_probas(single[0][0])
+        one = _time_calls(engine._short_term_probas, single)
+        many = _time_calls(engine._short_term_probas, [(batch,)] * 5)
+        print(f"  {mode:<8} tek satır {one * 1e3:.3f} ms, {len(batch)} nokta {many * 1e3:.1f} ms "
+              f"({many / len(batch) * 1e6:.1f} µs/nokta)")
+    row = x_query[:1]
+    print("Yalnızca model (hazır özellik satırı):")
+    print(f"  predict_proba(DataFrame) {_time_calls(lambda: engine.model.predict_proba(engine._feature_frame(row)), [()] * 200) * 1e3:.3f} ms, "
+          f"predict_proba(ndarray) {_time_calls(lambda: engine.model.predict_proba(row), [()] * 200) * 1e3:.3f} ms, "
+          f"sıkıştırılmış {_time_calls(lambda: scorer.predict_proba(row), [()] * 200) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,102 @@
 import requests
 import pandas as pd
+import csv
 import os
+import shutil
+import tempfile
+import threading
 from datetime import datetime
 import numpy as np
 
+from tracing import span, traced
+from catalog_io import read_latest_time
+
 CSV_PATH = "assets/query.csv"
 API_URL = "https://api.orhanaydogdu.com.tr/deprem/kandilli/live"
+DEFAULT_COLUMNS = ["time", "latitude", "longitude", "depth", "mag", "magType", "place", "type", "status"]
+
+# Eşzamanlı iki güncelleme aynı dosyayı okuyup birbirinin satırlarını ezmesin
+_ingest_lock = threading.Lock()
+
+# Yeni olay eklendiğinde çağrılacak fonksiyonlar (ör. motor önbelleğini geçersiz kılmak için)
+_update_listeners = []
+
+def add_update_listener(callback):
+    """callback(yeni_kayit_sayisi) her başarılı eklemeden sonra çağrılır."""
+    if callback not in _update_listeners:
+        _update_listeners.append(callback)
+
+def remove_update_listener(callback):
+    if callback in _update_listeners:
+        _update_listeners.remove(callback)
+
+def _notify_listeners(count):
+    for callback in list(_update_listeners):
+        try:
+            callback(count)
+        except Exception as e:
+            print(f"Güncelleme dinleyicisi hatası: {e}")
 
-def fetch_and_update_data():
+def _prepend_rows(df_new, path):
+    """
+    Yeni kayıtları başlığın hemen altına ekler. Yeni sürüm aynı dizinde ayrı bir dosyada
+    hazırlanıp os.replace ile tek adımda yayınlanır: dosyayı açmış okuyucular eski sürümü
+    sonuna kadar okur, sonraki açılışlar yenisini görür; yarım yazılmış dosya hiç görünmez.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".query-", suffix=".csv.tmp", dir=directory)
+    try:
+        with open(fd, "w", newline="", encoding="utf-8") as dst:
+            if os.path.exists(path):
+                with open(path, "r", newline="", encoding="utf-8") as src:
+                    header = src.readline()
+                    columns = next(csv.reader([header]))
+                    dst.write(header)
+                    df_new.reindex(columns=columns).to_csv(dst, index=False, header=False, lineterminator="\n")
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            else:
+                df_new.reindex(columns=DEFAULT_COLUMNS).to_csv(dst, index=False, lineterminator="\n")
+            dst.flush()
+            os.fsync(dst.fileno())
+        # mkstemp dosyası 0600 açılır; yayınlanan katalog eskisinin izinlerini korusun
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@traced("ingest.fetch_and_update")
+def fetch_and_update_data(api_url=None, csv_path=None):
     """
     Kandilli API'den son depremleri çeker ve assets/query.csv dosyasına ekler.
     Sadece yeni depremleri ekler (tarih ve büyüklük kontrolü ile).
+    Aynı anda tek güncelleme çalışır; dinleyiciler dosya yayınlandıktan sonra çağrılır.
+    api_url/csv_path verilmezse API_URL/CSV_PATH kullanılır (ör. yerel sahte sunucu ile yük testi).
     """
+    with _ingest_lock:
+        return _fetch_and_update(api_url or API_URL, csv_path or CSV_PATH)
+
+def _fetch_and_update(api_url, csv_path):
     print("Canlı veri kontrol ediliyor...")
     
     try:
-        # 1. Mevcut CSV'yi Oku
-        if os.path.exists(CSV_PATH):
+        # 1. Mevcut CSV'den sadece en son deprem zamanını oku (diğer sütunlar yüklenmez)
+        last_recorded_time = None
+        if os.path.exists(csv_path):
             try:
-                df_existing = pd.read_csv(CSV_PATH)
-                # Tarih formatını datetime objesine çevir (UTC olarak)
-                df_existing['time'] = pd.to_datetime(df_existing['time'], errors='coerce')
-                # NaT olanları temizle
-                df_existing = df_existing.dropna(subset=['time'])
-                
-                # Eğer timezone bilgisi yoksa UTC varsay
-                if df_existing['time'].dt.tz is None:
-                    df_existing['time'] = df_existing['time'].dt.tz_localize('UTC')
-                else:
-                    df_existing['time'] = df_existing['time'].dt.tz_convert('UTC')
-                    
+                with span("ingest.read_csv"):
+                    last_recorded_time = read_latest_time(csv_path)
             except Exception as e:
                 print(f"CSV okuma hatası: {e}")
                 return "CSV okuma hatası."
         else:
             print("CSV dosyası bulunamadı, yeni oluşturulacak.")
-            df_existing = pd.DataFrame(columns=[
-                "time", "latitude", "longitude", "depth", "mag", "place", "type"
-            ])
 
         # 2. API'den Veri Çek
-        response = requests.get(API_URL, timeout=10)
+        with span("ingest.api_request"):
+            response = requests.get(api_url, timeout=10)
         if response.status_code != 200:
             print(f"API Hatası: {response.status_code}")
             return f"API Hatası: {response.status_code}"
@@ -53,10 +109,8 @@ def fetch_and_update_data():
         earthquakes = data["result"]
         new_records = []
         
-        # En son kaydedilen deprem zamanını bul (eğer varsa)
-        if not df_existing.empty:
-            last_recorded_time = df_existing['time'].max()
-        else:
+        # Kayıt yoksa tüm API olayları yenidir
+        if last_recorded_time is None:
             last_recorded_time = pd.Timestamp.min.tz_localize('UTC')
 
         print(f"Son kayıtlı deprem tarihi (UTC): {last_recorded_time}")
@@ -109,33 +163,16 @@ def fetch_and_update_data():
             print("Yeni deprem verisi yok.")
             return "Veriler güncel."
 
-        # 3. Yeni Kayıtları Ekle
-        df_new = pd.DataFrame(new_records)
-        
-        # Mevcut sütun yapısına uydur (Eksik sütunları NaN yap)
-        df_updated = pd.concat([df_existing, df_new], ignore_index=True)
-        
-        # Tarihe göre sırala (Yeniden eskiye)
-        df_updated = df_updated.sort_values("time", ascending=False)
-
-        # 4. Dosyayı Kaydet
-        # Tarih formatını ISO 8601'e geri çevir (CSV uyumu için)
+        # 3. Yeni Kayıtları Hazırla (Yeniden eskiye; hepsi mevcut kayıtlardan yeni)
+        df_new = pd.DataFrame(new_records).sort_values("time", ascending=False)
         # Orijinal CSV formatı: 2024-10-04T05:57:19.724Z
-        # Pandas to_csv datetime'ı varsayılan olarak ISO formatında yazar ama Z eklemez.
-        # Formatı manuel ayarlayalım:
-        
-        # UTC timezone bilgisini düşürüp string formatlayalım ki CSV temiz olsun
-        # Ancak okurken tekrar UTC kabul edeceğiz.
-        
-        # df_updated['time'] datetime64[ns, UTC] tipinde.
-        # Bunu string'e çevirirken formatlayalım.
-        
-        # Geçici bir kolon yapıp formatlayalım
-        df_to_save = df_updated.copy()
-        df_to_save['time'] = df_to_save['time'].dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
-        
-        df_to_save.to_csv(CSV_PATH, index=False)
+        df_new['time'] = df_new['time'].dt.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+        # 4. Dosyayı Kaydet: yeni satırlar başa yazılır, mevcut satırlar ayrıştırılmadan kopyalanır
+        with span("ingest.write_csv", rows=len(df_new)):
+            _prepend_rows(df_new, csv_path)
         print(f"{count} yeni deprem eklendi.")
+        _notify_listeners(count)
         return f"{count} yeni deprem eklendi."
 
     except Exception as e:
@@ -0,0 +1,245 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from features import EventIndex, KM_PER_DEG, _haversine
+
+MAIN = 1
+AFTERSHOCK = 2
+
+
+def event_times_ns(times):
+    # tz'li Series / datetime64 -> int64 ns (UTC)
+    if hasattr(times, "dt") and times.dt.tz is not None:
+        times = times.dt.tz_convert(None)
+    return np.asarray(times).astype("datetime64[ns]").astype(np.int64)
+
+
+def candidate_pairs(times_ns, lats, lons, mags, query, time_window_days=1.0, space_window_km=50.0):
+    """
+    query'deki her j olayı için öncül adayları (i, j) döner: sırada j'den önce gelen,
+    en fazla time_window_days önce ve space_window_km içinde olan, büyüklüğü mags[j]'den
+    küçük olmayan olaylar. Dizi sırası zaman sırasıdır (simple_declustering ile aynı).
+    """
+    query = np.asarray(query, dtype=np.int64)
+    if not len(query) or not len(times_ns):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    index = EventIndex(times_ns.astype("datetime64[ns]"), lats, lons, mags, radius_km=space_window_km)
+    pair_i, pair_j = [], []
+    # Saniyeye yuvarlama payı için pencere 1 sn geniş aranır, ardından tam koşul uygulanır
+    window = time_window_days + 1.0 / 86400
+    for q, e, _ in index.pairs(times_ns[query].astype("datetime64[ns]"), lats[query], lons[query],
+                               window, include_self=True):
+        j = query[q]
+        dt_days = ((times_ns[j] - times_ns[e]) // 1_000_000_000).astype(float) / 86400.0
+        keep = (e < j) & (dt_days <= time_window_days) & (mags[e] >= mags[j])
+        pair_i.append(e[keep])
+        pair_j.append(j[keep])
+    if not pair_i:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(pair_i), np.concatenate(pair_j)
+
+
+def resolve_statuses(status, pair_i, pair_j):
+    """
+    0 (bilinmiyor) olan durumları doldurur: öncüllerinden biri ana şoksa artçı, hiç öncülü
+    yoksa veya hepsi artçıysa ana şok. Bilinmeyenlerin en erkeninin tüm öncülleri her turda
+    bilindiğinden döngü her turda ilerler; turlar yalnızca hâlâ bilinmeyen olayların çiftleriyle çalışır.
+    """
+    n = len(status)
+    n_pred = np.bincount(pair_j, minlength=n)
+    status[(status == 0) & (n_pred == 0)] = MAIN
+    live = status[pair_j] == 0
+    pair_i, pair_j = pair_i[live], pair_j[live]
+    while len(pair_j):
+        pred = status[pair_i]
+        main_pred = np.bincount(pair_j, weights=pred == MAIN, minlength=n) > 0
+        after_pred = np.bincount(pair_j, weights=pred == AFTERSHOCK, minlength=n)
+        unknown = status == 0
+        status[unknown & main_pred] = AFTERSHOCK
+        status[unknown & ~main_pred & (after_pred == n_pred)] = MAIN
+        live = status[pair_j] == 0
+        pair_i, pair_j = pair_i[live], pair_j[live]
+    return status
+
+
+def reference_flags(times_ns, lats, lons, mags, time_window_days=1.0, space_window_km=50.0):
+    """Özgün döngü (doğrulama için); zaman sıralı dizilerde is_aftershock döner."""
+    n = len(times_ns)
+    is_aftershock = np.zeros(n, dtype=bool)
+    for i in range(n):
+        if is_aftershock[i]:
+            continue
+        j = i + 1
+        while j < n:
+            dt_days = float((times_ns[j] - times_ns[i]) // 1_000_000_000) / 86400.0
+            if dt_days > time_window_days:
+                break
+            if _haversine(lats[i], lons[i], lats[j], lons[j]) <= space_window_km and mags[j] <= mags[i]:
+                is_aftershock[j] = True
+            j += 1
+    return is_aftershock
+
+
+def _decluster_tile(task):
+    # İşçi süreçte çalışır: çekirdek olaylar için öncül çiftleri ve yerel durumlar
+    global_idx, core, times_ns, lats, lons, mags, time_window_days, space_window_km = task
+    local_i, local_j = candidate_pairs(
+        times_ns, lats, lons, mags, np.nonzero(core)[0],
+        time_window_days=time_window_days, space_window_km=space_window_km,
+    )
+    n = len(global_idx)
+    # Hale olaylarının öncülleri bu karoda eksik olabilir: "kirli" sayılır ve kirlilik
+    # öncül zinciri boyunca çekirdeğe yayılır. Temiz olayların durumu yerelde kesindir.
+    dirty = ~core
+    while True:
+        spread = np.bincount(local_j, weights=dirty[local_i], minlength=n) > 0
+        grown = dirty | spread
+        if (grown == dirty).all():
+            break
+        dirty = grown
+    clean_pairs = ~dirty[local_j]
+    status = np.zeros(n, dtype=np.int8)
+    status[dirty] = -1
+    status = resolve_statuses(status, local_i[clean_pairs], local_j[clean_pairs])
+    status[dirty] = 0
+
+    dirty_pairs = dirty[local_j]
+    return (
+        global_idx[core],
+        status[core],
+        global_idx[local_i[dirty_pairs]],
+        global_idx[local_j[dirty_pairs]],
+    )
+
+
+def make_tiles(lats, lons, n_tiles, halo_km):
+    """
+    Olay sayısı dengeli karolar: boylam dilimleri, her dilim enlemde bölünür.
+    (çekirdek maskesi, hale dahil maske) çiftlerinin listesini döner.
+    """
+    cols = max(1, int(math.sqrt(n_tiles)))
+    rows = max(1, int(math.ceil(n_tiles / cols)))
+    halo_lat = halo_km / KM_PER_DEG
+    max_abs_lat = min(float(np.abs(lats).max()) + halo_lat, 89.0)
+    halo_lon = halo_km / (KM_PER_DEG * math.cos(math.radians(max_abs_lat)))
+
+    lon_edges = np.quantile(lons, np.linspace(0, 1, cols + 1))
+    lon_edges[0], lon_edges[-1] = -np.inf, np.inf
+    col = np.clip(np.searchsorted(lon_edges, lons, side="right") - 1, 0, cols - 1)
+    tiles = []
+    for c in range(cols):
+        in_col = col == c
+        if not in_col.any():
+            continue
+        lat_edges = np.quantile(lats[in_col], np.linspace(0, 1, rows + 1))
+        lat_edges[0], lat_edges[-1] = -np.inf, np.inf
+        for r in range(rows):
+            lo_lat, hi_lat = lat_edges[r], lat_edges[r + 1]
+            lo_lon, hi_lon = lon_edges[c], lon_edges[c + 1]
+            core = in_col & (lats >= lo_lat) & (lats < hi_lat)
+            if r == rows - 1:
+                core |= in_col & (lats == hi_lat)
+            if not core.any():
+                continue
+            region = (
+                (lats >= lo_lat - halo_lat) & (lats <= hi_lat + halo_lat)
+                & (lons >= lo_lon - halo_lon) & (lons <= hi_lon + halo_lon)
+            )
+            tiles.append((core, region | core))
+    return tiles
+
+
+def aftershock_flags(times, lats, lons, mags, time_window_days=1.0, space_window_km=50.0,
+                     workers=1, tiles_per_worker=4):
+    """
+    Zaman sıralı olaylar için is_aftershock (simple_declustering ile birebir aynı).
+    workers > 1 ise olaylar hale payı space_window_km olan karolara bölünür, karolar süreç
+    havuzunda işlenir; hale yüzünden belirsiz kalan ("kirli") olaylar sonra zaman sırasıyla
+    birleştirilmiş çiftler üzerinden kesinleştirilir.
+    """
+    times_ns = event_times_ns(times)
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    mags = np.asarray(mags, dtype=float)
+    n = len(times_ns)
+    status = np.zeros(n, dtype=np.int8)
+    if n == 0:
+        return status.astype(bool)
+
+    if not workers or workers <= 1:
+        pair_i, pair_j = candidate_pairs(times_ns, lats, lons, mags, np.arange(n),
+                                         time_window_days, space_window_km)
+        return resolve_statuses(status, pair_i, pair_j) == AFTERSHOCK
+
+    # İşçiler yalnızca bu modülü yükler; catboost/sklearn içe aktarılmasın diye burada
+    from model_training import _pool_context
+
+    tasks = []
+    for core, region in make_tiles(lats, lons, workers * tiles_per_worker, space_window_km):
+        idx = np.nonzero(region)[0]
+        tasks.append((idx, core[idx], times_ns[idx], lats[idx], lons[idx], mags[idx],
+                      time_window_days, space_window_km))
+    dirty_i, dirty_j = [], []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        for core_idx, core_status, pi, pj in pool.map(_decluster_tile, tasks):
+            status[core_idx] = core_status
+            dirty_i.append(pi)
+            dirty_j.append(pj)
+    # Uzlaştırma: kirli olayların tüm öncül çiftleri çekirdek karolarından geldi; temiz
+    # olaylar sabit tutulup kalanlar zaman sırasına göre çözülür
+    status = resolve_statuses(status, np.concatenate(dirty_i), np.concatenate(dirty_j))
+    return status == AFTERSHOCK
+
+
+def benchmark(n_events=200_000, worker_counts=(1, 2, 4, 8, 16), seed=7, verify_reference=20_000):
+    """Sentetik sürüler üzerinde seri ve paralel ayıklamayı karşılaştırır."""
+    from synthetic_catalog import generate_catalog
+
+    df = generate_catalog(n_events, seed=seed, aftershock_fraction=0.6)
+    args = (df["time"], df["latitude"].to_numpy(), df["longitude"].to_numpy(), df["mag"].to_numpy())
+    print(f"{len(df)} olay, {os.cpu_count()} çekirdek")
+
+    if verify_reference:
+        sub = df.iloc[:verify_reference]
+        ref = reference_flags(event_times_ns(sub["time"]), sub["latitude"].to_numpy(float),
+                              sub["longitude"].to_numpy(float), sub["mag"].to_numpy(float))
+        vec = aftershock_flags(sub["time"], sub["latitude"].to_numpy(), sub["longitude"].to_numpy(),
+                               sub["mag"].to_numpy())
+        print(f"  özgün döngü ile ilk {len(sub)} olayda fark: {int((ref != vec).sum())}")
+
+    rows = []
+    base = None
+    serial = None
+    for workers in worker_counts:
+        t0 = time.perf_counter()
+        flags = aftershock_flags(*args, workers=workers)
+        secs = time.perf_counter() - t0
+        if serial is None:
+            serial, base = flags, secs
+        diff = int((flags != serial).sum())
+        rows.append({"workers": workers, "seconds": secs, "speedup": base / secs, "diff": diff})
+        print(f"  workers={workers:<3} {secs:7.2f} sn  hızlanma x{base / secs:.2f}  "
+              f"artçı oranı {flags.mean():.3f}  seri ile fark: {diff}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Karolu paralel ayıklama hız ölçümü")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--workers", default="1,2,4,8,16")
+    parser.add_argument("--verify-reference", type=int, default=20_000,
+                        help="Özgün döngüyle karşılaştırılacak olay sayısı (0: atla)")
+    args = parser.parse_args()
+    benchmark(args.events, tuple(int(w) for w in args.workers.split(",")),
+              verify_reference=args.verify_reference)
+
+
+if __name__ == "__main__":
+    main()
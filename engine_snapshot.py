@@ -0,0 +1,219 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Dosya düzeni: MAGIC | uint64 başlık boyu | JSON başlık | (64 bayta hizalı) diziler.
+# Başlık her dizi için dtype/şekil/ofset tutar; açılışta diziler dosya üzerinde görünüm
+# olarak oluşur, veri okunmaz. Salt okunur paylaşımlı eşleme sayesinde aynı dosyayı açan
+# süreçler aynı fiziksel sayfaları (sayfa önbelleğini) kullanır.
+MAGIC = b"EQSNAP01"
+ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_snapshot(path, arrays, meta=None):
+    """arrays: {ad: ndarray}. Geçici dosyaya yazılıp os.replace ile yerine konur."""
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+    entries = {}
+    offset = 0
+    for name, a in arrays.items():
+        offset = _aligned(offset)
+        entries[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset += a.nbytes
+    header = json.dumps({"arrays": entries, "meta": meta or {}}).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 8 + len(header))
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(a.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return path
+
+
+def open_snapshot(path):
+    """
+    Anlık görüntüyü bellek eşlemesiyle açar: ({ad: salt okunur ndarray görünümü}, meta).
+    Sayfalar yalnızca dokunulduğunda diskten (veya paylaşılan sayfa önbelleğinden) gelir.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Geçersiz anlık görüntü: {path}")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        data_start = _aligned(len(MAGIC) + 8 + header_len)
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = {}
+    for name, e in header["arrays"].items():
+        dtype = np.dtype(e["dtype"])
+        count = int(np.prod(e["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(buf, dtype=dtype, count=count,
+                                     offset=data_start + e["offset"]).reshape(e["shape"])
+    return arrays, header["meta"]
+
+
+def frame_to_arrays(df, prefix):
+    """
+    DataFrame'i sütun sütun dizilere ayırır: ({ad: dizi}, şema). Kategoriler kod dizisi +
+    başlıktaki kategori listesi, tz'li zaman UTC datetime64 olarak saklanır.
+    """
+    arrays = {}
+    schema = []
+    for col in df.columns:
+        s = df[col]
+        key = f"{prefix}/{col}"
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            arrays[key] = s.cat.codes.to_numpy()
+            schema.append({"name": col, "kind": "category", "categories": [str(c) for c in s.cat.categories]})
+        elif isinstance(s.dtype, pd.DatetimeTZDtype):
+            arrays[key] = s.dt.tz_convert(None).to_numpy()
+            schema.append({"name": col, "kind": "datetime_tz", "tz": str(s.dt.tz)})
+        else:
+            arrays[key] = s.to_numpy()
+            schema.append({"name": col, "kind": "plain"})
+    return arrays, schema
+
+
+def frame_from_arrays(arrays, schema, prefix):
+    """frame_to_arrays'in tersi. Sayısal sütunlar eşlenmiş dizilerin görünümüdür (kopyasız)."""
+    cols = {}
+    for spec in schema:
+        values = arrays[f"{prefix}/{spec['name']}"]
+        if spec["kind"] == "category":
+            cols[spec["name"]] = pd.Categorical.from_codes(values, categories=spec["categories"])
+        elif spec["kind"] == "datetime_tz":
+            # tz eklemek zaman sütununu kopyalar (satır başına 8 bayt)
+            cols[spec["name"]] = pd.Series(values).dt.tz_localize(spec["tz"])
+        else:
+            cols[spec["name"]] = values
+    return pd.DataFrame(cols, copy=False)
+
+
+# --- Ölçüm: yeniden kurulum ve anlık görüntü, ayrı süreçlerde ---
+
+def _memory(pid="self", path=None):
+    """VmRSS/Pss (MB) ve path verilirse o dosyanın eşlemesindeki Rss/Pss."""
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                out[parts[0][:-1].lower() + "_mb"] = round(int(parts[1]) / 1024, 1)
+    if path:
+        rss = pss = 0
+        inside = False
+        with open(f"/proc/{pid}/smaps") as f:
+            for line in f:
+                parts = line.split()
+                if "-" in parts[0] and len(parts) >= 5:
+                    inside = len(parts) >= 6 and parts[-1] == os.path.abspath(path)
+                elif inside and parts[0] == "Rss:":
+                    rss += int(parts[1])
+                elif inside and parts[0] == "Pss:":
+                    pss += int(parts[1])
+        out["snapshot_rss_mb"] = round(rss / 1024, 1)
+        out["snapshot_pss_mb"] = round(pss / 1024, 1)
+    return out
+
+
+def _measure(mode, csv_path, cache_dir, hold):
+    from risk_engine import EarthquakeRiskEngine
+
+    t0 = time.perf_counter()
+    engine = EarthquakeRiskEngine(csv_path=csv_path, cache_dir=cache_dir if mode == "snapshot" else None)
+    engine.warm_up()
+    ready = time.perf_counter() - t0
+    scores = engine.score_location(39.93, 32.85)
+    result = {
+        "mode": mode,
+        "ready_s": round(ready, 3),
+        "first_prediction_s": round(time.perf_counter() - t0, 3),
+        "final_score": scores["final_score"],
+    }
+    print(json.dumps(result), flush=True)
+    if hold:
+        # Ölçüm ebeveyn tarafından yapılır; tüm süreçler aynı anda canlı kalsın
+        sys.stdin.read()
+
+
+def compare(csv_path, cache_dir, workers=4):
+    """
+    Yeniden kurulum (önbelleksiz warm_up) ile anlık görüntüden açılışı ayrı süreçlerde
+    karşılaştırır; ardından workers süreç aynı görüntüyü açar ve süreç başına bellek ölçülür.
+    """
+    from risk_engine import EarthquakeRiskEngine
+
+    engine = EarthquakeRiskEngine(csv_path=csv_path, cache_dir=cache_dir)
+    engine.warm_up()
+    snap_path = engine._cache_paths()[0]
+
+    def launch(mode, hold):
+        return subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--measure", mode,
+             "--csv", csv_path, "--cache-dir", cache_dir] + (["--hold"] if hold else []),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+
+    def finish(procs):
+        rows = []
+        for p in procs:
+            rows.append(json.loads(p.stdout.readline()))
+        for p, row in zip(procs, rows):
+            row.update(_memory(p.pid, snap_path))
+        for p in procs:
+            p.stdin.close()
+            p.wait()
+        return rows
+
+    results = {"snapshot_mb": round(os.path.getsize(snap_path) / 1e6, 1)}
+    results["rebuild"] = finish([launch("rebuild", True)])[0]
+    results["snapshot"] = finish([launch("snapshot", True)])[0]
+    results["shared"] = finish([launch("snapshot", True) for _ in range(workers)])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motor anlık görüntüsü: açılış süresi ve bellek ölçümü")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--cache-dir", default=None, help="Varsayılan: geçici dizin")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--measure", choices=["rebuild", "snapshot"], help=argparse.SUPPRESS)
+    parser.add_argument("--hold", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(args.measure, args.csv, args.cache_dir, args.hold)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        r = compare(args.csv, args.cache_dir or tmp, workers=args.workers)
+    print(f"Anlık görüntü: {r['snapshot_mb']} MB")
+    for label in ("rebuild", "snapshot"):
+        m = r[label]
+        print(f"  {label:<9} hazır {m['ready_s']:.2f} sn, ilk tahmin {m['first_prediction_s']:.2f} sn, "
+              f"RSS {m['rss_mb']} MB, PSS {m['pss_mb']} MB (skor {m['final_score']:.4f})")
+    print(f"  {len(r['shared'])} süreç aynı görüntüyü açtığında:")
+    for m in r["shared"]:
+        print(f"    ilk tahmin {m['first_prediction_s']:.2f} sn, RSS {m['rss_mb']} MB, PSS {m['pss_mb']} MB, "
+              f"görüntü eşlemesi RSS {m['snapshot_rss_mb']} MB / PSS {m['snapshot_pss_mb']} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+
+# Yerel aktivite özellikleri: her olay (veya sorgu noktası) için, ondan ÖNCEKİ
+# pencere içinde ve FEATURE_RADIUS_KM yarıçapındaki ana şokların istatistikleri.
+FEATURE_RADIUS_KM = 100.0
+FEATURE_WINDOWS_DAYS = (7, 30)
+# Bir enlem derecesinin (111.195 km) biraz altı: hücre boyu hiçbir zaman yarıçaptan küçük olmaz
+KM_PER_DEG = 111.19
+_CHUNK_PAIRS = 1_000_000
+
+
+def window_feature_columns(windows=FEATURE_WINDOWS_DAYS):
+    cols = []
+    for w in windows:
+        cols += [f"rolling_mean_{w}d", f"rolling_std_{w}d", f"rolling_max_{w}d", f"event_count_{w}d"]
+    return cols
+
+
+def to_epoch_seconds(times):
+    """datetime64 dizisi, tz'li Series veya Timestamp dizisi -> UTC int64 saniye."""
+    if isinstance(times, pd.Series) and isinstance(times.dtype, pd.DatetimeTZDtype):
+        times = times.dt.tz_convert(None)
+    arr = np.asarray(times)
+    if arr.dtype == object:
+        arr = pd.to_datetime(arr, utc=True).tz_convert(None).to_numpy()
+    if np.issubdtype(arr.dtype, np.datetime64):
+        return arr.astype("datetime64[s]").astype(np.int64)
+    return np.asarray(arr, dtype=np.int64)
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(a))
+
+
+def gaussian_smooth(grid, sigma_rows, sigma_cols):
+    """
+    Ayrılabilir Gauss yumuşatma (kenarlarda sıfır dolgu); sigma'lar hücre cinsindendir.
+    Her eksen kaydır-topla ile işlenir: çekirdek boyu kadar dizi işlemi, satır döngüsü yok.
+    """
+    out = np.asarray(grid, dtype=np.float64)
+    for axis, sigma in ((0, sigma_rows), (1, sigma_cols)):
+        if sigma <= 0:
+            continue
+        half = max(1, int(np.ceil(3 * sigma)))
+        x = np.arange(-half, half + 1)
+        kernel = np.exp(-0.5 * (x / sigma) ** 2)
+        kernel /= kernel.sum()
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (half, half)
+        padded = np.pad(out, pad)
+        n = out.shape[axis]
+        acc = np.zeros_like(out)
+        for k, w in enumerate(kernel):
+            window = [slice(None), slice(None)]
+            window[axis] = slice(k, k + n)
+            acc += w * padded[tuple(window)]
+        out = acc
+    return out
+
+
+class EventIndex:
+    """
+    Olayları (hücre, zaman) sırasına göre dizen ızgara indeksi.
+    Hücre boyu yarıçaptan küçük olmadığı için yarıçap içindeki her olay komşu 3x3 hücrede bulunur;
+    hücre içinde zaman sıralı olduğundan pencere sınırları tek searchsorted ile bulunur.
+    """
+
+    def __init__(self, times, lats, lons, mags, radius_km=FEATURE_RADIUS_KM):
+        self.radius_km = radius_km
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        secs = to_epoch_seconds(times)
+
+        self.cell_lat = radius_km / KM_PER_DEG
+        # Boylam derecesi kutba doğru kısalır; en yüksek enlemde bile hücre >= yarıçap olsun
+        max_abs_lat = min(float(np.abs(lats).max()) if len(lats) else 0.0, 89.0)
+        self.cell_lon = radius_km / (KM_PER_DEG * np.cos(np.radians(max_abs_lat + self.cell_lat)))
+
+        self.t0 = int(secs.min()) if len(secs) else 0
+        self.t_span = int(secs.max() - self.t0 + 1) if len(secs) else 1
+        keys = self._cell_keys(lats, lons)
+        order = np.lexsort((secs, keys))
+        self.order = order
+        self.lat = lats[order]
+        self.lon = lons[order]
+        self.mag_by_input = np.asarray(mags, dtype=np.float64)
+        self.sec = secs[order]
+        self.keys, rank = np.unique(keys[order], return_inverse=True)
+        # (hücre sırası, zaman) bileşik anahtarı: tüm hücrelerde tek searchsorted
+        self.composite = rank.astype(np.int64) * self.t_span + (self.sec - self.t0)
+
+    _STATE_ARRAYS = ("order", "lat", "lon", "mag_by_input", "sec", "keys", "composite")
+
+    def state(self):
+        """Dizini yeniden kurmadan saklamak için (ölçekler, diziler) çifti."""
+        scalars = {
+            "radius_km": float(self.radius_km),
+            "cell_lat": float(self.cell_lat),
+            "cell_lon": float(self.cell_lon),
+            "t0": int(self.t0),
+            "t_span": int(self.t_span),
+        }
+        return scalars, {name: getattr(self, name) for name in self._STATE_ARRAYS}
+
+    @classmethod
+    def from_state(cls, scalars, arrays):
+        """state() çıktısından dizini kurar; diziler kopyalanmaz (bellek eşlemeli olabilir)."""
+        index = cls.__new__(cls)
+        index.__dict__.update(scalars)
+        for name in cls._STATE_ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    def _cell_keys(self, lats, lons):
+        ci = np.floor(lats / self.cell_lat).astype(np.int64)
+        cj = np.floor(lons / self.cell_lon).astype(np.int64)
+        return ci * 1_000_003 + cj
+
+    def pairs(self, q_times, q_lats, q_lons, window_days, include_self=False):
+        """
+        Her sorgu için [t - pencere, t) (include_self=True ise t dahil) aralığında ve
+        yarıçap içindeki olay çiftlerini parça parça üretir.
+        Her parça (sorgu_indeksi, olay_indeksi, yaş_sn) dizileridir; olay indeksi EventIndex'e
+        verilen orijinal sıradadır.
+        """
+        q_lat = np.asarray(q_lats, dtype=np.float64)
+        q_lon = np.asarray(q_lons, dtype=np.float64)
+        q_sec = to_epoch_seconds(q_times)
+        if not len(q_lat) or not len(self.sec):
+            return
+        w_sec = int(window_days * 86400)
+        qi = np.floor(q_lat / self.cell_lat).astype(np.int64)
+        qj = np.floor(q_lon / self.cell_lon).astype(np.int64)
+        lo_off = np.clip(q_sec - w_sec - self.t0, 0, self.t_span - 1)
+        hi_off = np.clip(q_sec - self.t0, -1, self.t_span - 1)
+        side = "right" if include_self else "left"
+
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                nkey = (qi + di) * 1_000_003 + (qj + dj)
+                pos = np.minimum(np.searchsorted(self.keys, nkey), len(self.keys) - 1)
+                found = self.keys[pos] == nkey
+                if not found.any():
+                    continue
+                qidx = np.nonzero(found)[0]
+                base = pos[qidx].astype(np.int64) * self.t_span
+                lo = np.searchsorted(self.composite, base + lo_off[qidx], side="left")
+                # Sorgu zamanı olayların başlangıcından önceyse aralık boş kalır
+                hi = np.where(
+                    hi_off[qidx] < 0, lo,
+                    np.searchsorted(self.composite, base + hi_off[qidx], side=side),
+                )
+                yield from self._expand(qidx, lo, hi, q_lat, q_lon, q_sec)
+
+    def _expand(self, qidx, lo, hi, q_lat, q_lon, q_sec):
+        lengths = hi - lo
+        total = int(lengths.sum())
+        if total == 0:
+            return
+        # Aday çift sayısı büyükse sorguları parçalara böl (bellek sınırı)
+        if total > _CHUNK_PAIRS and len(qidx) > 1:
+            cut = int(np.searchsorted(np.cumsum(lengths), _CHUNK_PAIRS)) + 1
+            cut = min(max(cut, 1), len(qidx) - 1)
+            for sl in (slice(0, cut), slice(cut, None)):
+                yield from self._expand(qidx[sl], lo[sl], hi[sl], q_lat, q_lon, q_sec)
+            return
+
+        pair_q = np.repeat(qidx, lengths)
+        starts = np.repeat(lo - np.cumsum(lengths) + lengths, lengths)
+        pair_e = starts + np.arange(total)
+        d = _haversine(q_lat[pair_q], q_lon[pair_q], self.lat[pair_e], self.lon[pair_e])
+        near = d <= self.radius_km
+        pair_q = pair_q[near]
+        pair_e = pair_e[near]
+        yield pair_q, self.order[pair_e], q_sec[pair_q] - self.sec[pair_e]
+
+    def window_stats(self, q_times, q_lats, q_lons, windows=FEATURE_WINDOWS_DAYS, include_self=False):
+        """
+        Her sorgu için [t - pencere, t) aralığında (include_self=True ise t dahil) ve
+        yarıçap içindeki olayların sayı/ortalama/std/max değerlerini döner.
+        Sonuç: {pencere_gün: (mean, std, max, count)}; olay yoksa değerler 0'dır.
+        """
+        nq = len(q_lats)
+        windows = sorted(windows)
+        counts = {w: np.zeros(nq) for w in windows}
+        sums = {w: np.zeros(nq) for w in windows}
+        sumsq = {w: np.zeros(nq) for w in windows}
+        maxes = {w: np.full(nq, -np.inf) for w in windows}
+
+        for pair_q, pair_e, age in self.pairs(q_times, q_lats, q_lons, windows[-1], include_self):
+            mags = self.mag_by_input[pair_e]
+            for w in windows:
+                m = age <= w * 86400 if w != windows[-1] else slice(None)
+                pq = pair_q[m]
+                pm = mags[m]
+                counts[w] += np.bincount(pq, minlength=nq)
+                sums[w] += np.bincount(pq, weights=pm, minlength=nq)
+                sumsq[w] += np.bincount(pq, weights=pm * pm, minlength=nq)
+                np.maximum.at(maxes[w], pq, pm)
+
+        out = {}
+        for w in windows:
+            n = counts[w]
+            safe = np.maximum(n, 1)
+            mean = np.where(n > 0, sums[w] / safe, 0.0)
+            var = np.where(n > 1, (sumsq[w] - sums[w] ** 2 / safe) / np.maximum(n - 1, 1), 0.0)
+            std = np.sqrt(np.clip(var, 0.0, None))
+            mx = np.where(n > 0, maxes[w], 0.0)
+            out[w] = (mean, std, mx, n)
+        return out
+
+
+def compute_window_features(
+    event_times, event_lats, event_lons, event_mags,
+    query_times, query_lats, query_lons,
+    windows=FEATURE_WINDOWS_DAYS, radius_km=FEATURE_RADIUS_KM, include_self=False,
+):
+    """
+    Eğitim ve çıkarımın ortak yolu: sorgu noktaları için yerel, zamana dayalı pencere
+    özelliklerini {sütun adı: dizi} olarak döner. Eğitimde sorgular olayların kendisidir.
+    """
+    index = EventIndex(event_times, event_lats, event_lons, event_mags, radius_km=radius_km)
+    stats = index.window_stats(query_times, query_lats, query_lons, windows=windows, include_self=include_self)
+    cols = {}
+    for w in windows:
+        mean, std, mx, n = stats[w]
+        cols[f"rolling_mean_{w}d"] = mean
+        cols[f"rolling_std_{w}d"] = std
+        cols[f"rolling_max_{w}d"] = mx
+        cols[f"event_count_{w}d"] = n
+    return cols
+
+
+def add_window_features(df, time_col="time", lat_col="latitude", lon_col="longitude", mag_col="mag",
+                        windows=FEATURE_WINDOWS_DAYS, radius_km=FEATURE_RADIUS_KM):
+    """Katalogdaki her olay için, kendisinden önceki yerel pencere özelliklerini ekler."""
+    times = df[time_col].to_numpy()
+    lats = df[lat_col].to_numpy()
+    lons = df[lon_col].to_numpy()
+    cols = compute_window_features(
+        times, lats, lons, df[mag_col].to_numpy(),
+        times, lats, lons, windows=windows, radius_km=radius_km,
+    )
+    for name, values in cols.items():
+        df[name] = values
+    return df
@@ -1,6 +1,7 @@
 import os
 import platform
 import threading
+import time
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 
@@ -9,14 +10,17 @@ try:
 except ImportError:
     ctk = None
 
-from risk_engine import EarthquakeRiskEngine, haversine
-from risk_engine import FAULT_LINES, FAULT_POINTS
-from data_manager import fetch_and_update_data
-from map_visualizer import generate_map
+# Ağır modüller (pandas, scikit-learn, catboost, folium) pencere açıldıktan sonra,
+# ilk kullanıldıkları yerde içe aktarılır.
+import tracing
+from task_executor import TaskExecutor
 
 class App:
-    def __init__(self, root):
+    def __init__(self, root, startup_t0=None, on_ready=None):
         self.root = root
+        self.startup_t0 = startup_t0 if startup_t0 is not None else time.perf_counter()
+        self.startup_times = {}
+        self.on_ready = on_ready
         self.root.title("Deprem Risk ve Tespit Paneli")
         self.root.geometry("900x600")
         
@@ -32,26 +36,97 @@ class App:
         else:
             self.root.configure(bg="#0b1c2c")
 
-        self.engine = EarthquakeRiskEngine()
+        self.engine = None
+        self._engine_ready = threading.Event()
         self.status_var = tk.StringVar(value="Hazır")
 
-        # Canlı veri güncellemesi
-        self._update_data_on_startup()
+        # Uzun işler (ısınma, risk, harita, kamera) bu havuzda paralel çalışır
+        self.executor = TaskExecutor(self.root, max_workers=4)
+        self.task_rows = {}
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self._build_layout()
 
+        # Pencere çizildikten sonra arka planda motoru ısıt ve canlı veriyi güncelle
+        self.root.after_idle(self._on_first_paint)
+        self._start_warm_up()
+        self._update_data_on_startup()
+
+    def _record_startup(self, label):
+        elapsed = time.perf_counter() - self.startup_t0
+        self.startup_times[label] = elapsed
+        print(f"[Açılış] {label}: {elapsed:.3f} sn")
+        return elapsed
+
+    def _on_first_paint(self):
+        elapsed = self._record_startup("ilk_cizim")
+        self._log(f"Pencere hazır ({elapsed*1000:.0f} ms).")
+
+    def _start_warm_up(self):
+        self.executor.submit(
+            self._warm_up_task,
+            name="Motor ısınması",
+            on_done=self._on_warm_up_done,
+            on_error=lambda exc: self._log(f"Motor ısıtılamadı: {exc}"),
+            on_progress=self._on_task_progress,
+            on_finish=self._on_warm_up_finish,
+        )
+
+    def _warm_up_task(self, task):
+        try:
+            task.progress("Modüller yükleniyor", 0.0)
+            from risk_engine import EarthquakeRiskEngine
+            self.engine = EarthquakeRiskEngine()
+            return self.engine.warm_up(progress=task.progress)
+        finally:
+            # Hata veya iptalde de bekleyen sorgular serbest kalsın
+            self._engine_ready.set()
+
+    def _on_warm_up_done(self, from_cache):
+        elapsed = self._record_startup("motor_hazir")
+        source = "önbellek" if from_cache else "yeniden hesaplandı"
+        self._log(f"Risk motoru hazır: {elapsed:.2f} sn ({source})")
+        report = self.engine.training_report if self.engine else None
+        if report:
+            self._log(
+                f"Model doğrulaması (ileri yürüyen {len(report['folds'])} kat): "
+                f"AUC {report['mean_auc']:.3f}, Brier {report['mean_brier']:.4f}, "
+                f"{report['iterations']} ağaç"
+            )
+
+    def _on_warm_up_finish(self, task):
+        self._on_task_finish(task)
+        if self.on_ready:
+            self.on_ready()
+
+    def _get_engine(self):
+        # Isınma bitmeden gelen sorgular motorun hazır olmasını bekler
+        self._engine_ready.wait()
+        if self.engine is None:
+            from risk_engine import EarthquakeRiskEngine
+            self.engine = EarthquakeRiskEngine()
+        return self.engine
+
     def _update_data_on_startup(self):
-        def run():
-            try:
-                self.status_var.set("Veriler güncelleniyor...")
-                msg = fetch_and_update_data()
-                self.root.after(0, lambda: self._log(f"Veri Durumu: {msg}"))
-            except Exception as e:
-                self.root.after(0, lambda: self._log(f"Veri güncelleme hatası: {e}"))
-            finally:
-                self.root.after(0, lambda: self.status_var.set("Hazır"))
-        
-        threading.Thread(target=run, daemon=True).start()
+        def on_new_events(count):
+            # Yeni olaylar gelince motorun sonuç önbelleği ve çerçeveleri geçersiz olur
+            if self.engine is not None:
+                self.engine.on_catalog_updated(count)
+
+        def run(task):
+            task.progress("Canlı veri çekiliyor")
+            from data_manager import fetch_and_update_data, add_update_listener
+            add_update_listener(on_new_events)
+            return fetch_and_update_data()
+
+        self.executor.submit(
+            run,
+            name="Veri güncelleme",
+            on_done=lambda msg: self._log(f"Veri Durumu: {msg}"),
+            on_error=lambda exc: self._log(f"Veri güncelleme hatası: {exc}"),
+            on_progress=self._on_task_progress,
+            on_finish=self._on_task_finish,
+        )
 
     def _build_layout(self):
         # Ana Container
@@ -131,6 +206,10 @@ class App:
             self.output.pack(fill="both", expand=True, padx=20, pady=10)
             self.output.insert("end", "Paneli kullanmak için sol menüden işlem seçin.\n")
             self.output.configure(state="disabled")
+
+            # Süren işlemler (her biri ayrı iptal edilebilir)
+            self.tasks_frame = ctk.CTkFrame(self.content_frame, fg_color="transparent")
+            self.tasks_frame.pack(fill="x", padx=20)
             
             # Durum Çubuğu
             self.status_label = ctk.CTkLabel(
@@ -213,6 +292,9 @@ class App:
             self.output.insert("end", "Paneli kullanmak için butonlardan birini seçin.\n")
             self.output.config(state="disabled")
 
+            self.tasks_frame = tk.Frame(self.root, bg="#0b1c2c")
+            self.tasks_frame.pack(fill="x", padx=20)
+
             status_bar = tk.Label(
                 self.root,
                 textvariable=self.status_var,
@@ -236,30 +318,91 @@ class App:
             self.output.see("end")
             self.output.config(state="disabled")
 
-    def _set_busy(self, busy=True):
-        state = "disabled" if busy else "normal"
-        if ctk:
-            self.camera_btn.configure(state=state)
-            self.risk_btn.configure(state=state)
-        else:
-            self.camera_btn.config(state=state)
-            self.risk_btn.config(state=state)
-        
-        self.status_var.set("İşleniyor..." if busy else "Hazır")
+    # --- GÖREV PANELİ ---
+
+    def _refresh_status(self):
+        count = self.executor.active_count()
+        if count:
+            self.status_var.set(f"{count} işlem sürüyor...")
+        elif not tracing.is_enabled():
+            self.status_var.set("Hazır")
+
+    def _task_text(self, task):
+        return f"{task.name}: {task.message} (%{task.fraction*100:.0f})"
+
+    def _on_task_progress(self, task):
+        row = self.task_rows.get(task.id)
+        if row is None:
+            if ctk:
+                frame = ctk.CTkFrame(self.tasks_frame, fg_color="transparent")
+                label = ctk.CTkLabel(frame, text="", anchor="w")
+                button = ctk.CTkButton(frame, text="İptal", width=60, command=task.cancel, corner_radius=0)
+            else:
+                frame = tk.Frame(self.tasks_frame, bg="#0b1c2c")
+                label = tk.Label(frame, text="", anchor="w", bg="#0b1c2c", fg="#9cc3d5")
+                button = tk.Button(frame, text="İptal", command=task.cancel, relief="flat")
+            label.pack(side="left", fill="x", expand=True)
+            button.pack(side="right")
+            frame.pack(fill="x", pady=2)
+            row = self.task_rows[task.id] = (frame, label)
+        row[1].configure(text=self._task_text(task))
+        self._refresh_status()
+
+    def _on_task_finish(self, task):
+        row = self.task_rows.pop(task.id, None)
+        if row is not None:
+            row[0].destroy()
+        if task.message == "İptal edildi":
+            self._log(f"{task.name} iptal edildi.")
+        self._refresh_status()
+
+    def _on_close(self):
+        self.executor.shutdown()
+        self.root.destroy()
+
+    def _show_trace_summary(self, root_name):
+        # İzleme açıksa son işlemin aşama sürelerini durum çubuğunda göster
+        if not tracing.is_enabled():
+            return
+        summary = tracing.summarize(root_name)
+        if summary:
+            self.status_var.set(summary)
+
+    # --- İŞLEMLER ---
 
     def _on_camera(self):
         self._log("Kamera tespiti başlatılıyor...")
 
-        def run():
-            try:
-                from camera_manager import main as cam_main
-                cam_main()
-            except Exception as exc:
-                messagebox.showerror("Hata", f"Kamera başlatılamadı: {exc}")
-            finally:
-                self._log("Kamera tespiti kapandı.")
+        def run(task):
+            from camera_manager import main as cam_main
+            cam_main(should_stop=lambda: task.cancelled)
+
+        def on_finish(task):
+            self._on_task_finish(task)
+            self._log("Kamera tespiti kapandı.")
+
+        self.executor.submit(
+            run,
+            name="Kamera",
+            on_error=lambda exc: messagebox.showerror("Hata", f"Kamera başlatılamadı: {exc}"),
+            on_progress=self._on_task_progress,
+            on_finish=on_finish,
+        )
+
+    def _risk_task(self, task, city):
+        task.progress("Motor bekleniyor", 0.05)
+        engine = self._get_engine()
+
+        task.progress("Konum bulunuyor", 0.2)
+        coords = engine.locate_city(city)
+        task.progress("Risk hesaplanıyor", 0.4)
+        result = engine.predict_city_risk(city, manual_coords=coords)
 
-        threading.Thread(target=run, daemon=True).start()
+        # Şehre ait depremleri filtrele (150 km yarıçap)
+        task.progress("Bölgesel depremler seçiliyor", 0.9)
+        city_quakes = engine.city_quakes(coords[0], coords[1], radius_km=150.0)
+        city_data = {"name": city, "lat": coords[0], "lon": coords[1], "df": city_quakes}
+        return result, city_data
 
     def _on_risk(self):
         # CustomTkinter dialog
@@ -272,58 +415,50 @@ class App:
         if not city:
             return
 
-        self._set_busy(True)
         self._log(f"{city} için risk hesaplanıyor...")
 
-        def run():
-            try:
-                result = self.engine.predict_city_risk(city)
-                self._log(result)
-                
-                # Şehre ait depremleri filtrele (150 km yarıçap)
-                full_df = self.engine.df_full
-                dists = haversine(
-                    self.engine.last_lat, 
-                    self.engine.last_lon, 
-                    full_df["latitude"].values, 
-                    full_df["longitude"].values
-                )
-                city_quakes = full_df[dists <= 150.0].copy()
-
-                # Harita butonunu aktif et ve şehir bilgisini sakla
-                self.last_city_data = {
-                    "name": city,
-                    "lat": self.engine.last_lat,
-                    "lon": self.engine.last_lon,
-                    "df": city_quakes
-                }
-                
-                if ctk:
-                    self.map_btn.configure(state="normal")
-                else:
-                    self.map_btn.config(state="normal")
-                
-            except Exception as exc:
-                messagebox.showerror("Hata", str(exc))
-            finally:
-                self._set_busy(False)
-
-        threading.Thread(target=run, daemon=True).start()
+        def on_done(payload):
+            result, city_data = payload
+            self._log(result)
+            if "ilk_risk_cevabi" not in self.startup_times:
+                self._record_startup("ilk_risk_cevabi")
+
+            # Harita butonunu aktif et ve şehir bilgisini sakla
+            self.last_city_data = city_data
+            if ctk:
+                self.map_btn.configure(state="normal")
+            else:
+                self.map_btn.config(state="normal")
+            self._show_trace_summary("risk.predict_city_risk")
+
+        self.executor.submit(
+            self._risk_task,
+            city,
+            name=f"Risk: {city}",
+            on_done=on_done,
+            on_error=lambda exc: messagebox.showerror("Hata", str(exc)),
+            on_progress=self._on_task_progress,
+            on_finish=self._on_task_finish,
+        )
 
     def _on_map(self):
         if not hasattr(self, "last_city_data") or not self.last_city_data:
             messagebox.showinfo("Bilgi", "Önce bir şehir için risk hesaplamalısınız.")
             return
-            
-        try:
-            data = self.last_city_data
-            # GeoJSON dosyalarının yolları (data_files klasöründe)
-            geojson_files = [
-                os.path.join("data_files", "fay_haritası", "gem_active_faults.geojson"),
-                os.path.join("data_files", "fay_haritası", "gem_active_faults_harmonized.geojson")
-            ]
-            
-            path = generate_map(
+
+        data = self.last_city_data
+        # GeoJSON dosyalarının yolları (data_files klasöründe)
+        geojson_files = [
+            os.path.join("data_files", "fay_haritası", "gem_active_faults.geojson"),
+            os.path.join("data_files", "fay_haritası", "gem_active_faults_harmonized.geojson")
+        ]
+
+        def run(task):
+            task.progress("Harita modülleri yükleniyor", 0.1)
+            from risk_engine import FAULT_LINES, FAULT_POINTS
+            from map_visualizer import generate_map
+            task.progress("Harita oluşturuluyor", 0.3)
+            return generate_map(
                 data["name"], 
                 data["lat"], 
                 data["lon"], 
@@ -332,8 +467,22 @@ class App:
                 geojson_paths=geojson_files,
                 all_quakes_df=data["df"]
             )
+
+        def on_done(path):
             self._log(f"Harita oluşturuldu: {path}")
-        except ImportError as e:
-             messagebox.showerror("Eksik Kütüphane", str(e))
-        except Exception as e:
-            messagebox.showerror("Hata", f"Harita oluşturulurken hata: {e}")
+            self._show_trace_summary("map.generate_map")
+
+        def on_error(exc):
+            if isinstance(exc, ImportError):
+                messagebox.showerror("Eksik Kütüphane", str(exc))
+            else:
+                messagebox.showerror("Hata", f"Harita oluşturulurken hata: {exc}")
+
+        self.executor.submit(
+            run,
+            name=f"Harita: {data['name']}",
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=self._on_task_progress,
+            on_finish=self._on_task_finish,
+        )
@@ -0,0 +1,315 @@
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import KM_PER_DEG, _haversine, gaussian_smooth
+
+# ETAS benzeri tetikleme için varsayılanlar: doğrudan artçı sayısı K * 10^(alpha * (M - m_min)),
+# Omori zamanı (c, p), uzaklık için kırılma boyuyla ölçeklenen güç yasası çekirdeği (q).
+# K=0.08, alpha=0.8, b≈1 ile dallanma oranı ~0.3 (kritik altı, zincirler sonludur).
+DEFAULT_ETAS = {"K": 0.08, "alpha": 0.8, "c_days": 0.01, "p": 1.1, "q": 1.5}
+MAX_GENERATIONS = 20
+# p05 / p95 için parametre (oran, b) çekilişi sayısı; simülasyon partilerinden bağımsız
+PARAM_DRAWS = 4000
+# Hücre içindeki alt örnek ızgarası (konum yarıçapındaki arka plan yoğunluğu kütlesi için)
+MASS_SUBSAMPLE = 4
+
+
+def _gr_magnitudes(rng, n, b_value, m_min, m_max):
+    # Kesilmiş Gutenberg-Richter, ters CDF ile
+    beta = b_value * math.log(10)
+    u = rng.random(n)
+    return m_min - np.log(1 - u * (1 - math.exp(-beta * (m_max - m_min)))) / beta
+
+
+class HazardModel:
+    """
+    Ayıklanmış katalogdan uydurulan stokastik katalog modeli.
+
+    Arka plan: M >= m_min ana şokların toplam yıllık oranı (Gamma sonsal), Aki-Utsu b değeri
+    (belirsizliğiyle) ve hücre sayımlarının Gauss ile yumuşatılmış mekânsal yoğunluğu.
+    """
+
+    def __init__(self, lat0, lon0, cell_deg, pdf, n_events, years, b_value, b_std, m_min, m_max):
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.cell_deg = cell_deg
+        self.pdf = pdf
+        self.n_events = n_events
+        self.years = years
+        self.b_value = b_value
+        self.b_std = b_std
+        self.m_min = m_min
+        self.m_max = m_max
+
+    @classmethod
+    def fit(cls, df_full, m_min=4.5, start="1970-01-01", cell_deg=0.5, smoothing_km=50.0,
+            m_max=8.0, background_floor=0.02, mag_bin=0.1):
+        """
+        df_full: is_aftershock sütunlu katalog. Yalnızca ana şoklar ve start sonrası (tamlık
+        dönemi) kullanılır.
+        """
+        times = df_full["time"]
+        start = pd.Timestamp(start, tz=times.dt.tz)
+        mains = df_full[~df_full["is_aftershock"] & (times >= start) & (df_full["mag"] >= m_min)]
+        if len(mains) < 10:
+            raise RuntimeError("Oran uydurmak için yeterli ana şok yok.")
+        years = (times.max() - start).days / 365.25
+        mags = mains["mag"].to_numpy(dtype=float)
+        # Aki-Utsu en çok olabilirlik; standart hata b / sqrt(N)
+        b_value = math.log10(math.e) / (mags.mean() - (m_min - mag_bin / 2))
+        b_std = b_value / math.sqrt(len(mags))
+
+        lats = df_full["latitude"].to_numpy(dtype=float)
+        lons = df_full["longitude"].to_numpy(dtype=float)
+        lat0 = math.floor(lats.min()) - 1.0
+        lon0 = math.floor(lons.min()) - 1.0
+        n_rows = int(math.ceil((lats.max() + 1.0 - lat0) / cell_deg))
+        n_cols = int(math.ceil((lons.max() + 1.0 - lon0) / cell_deg))
+        counts, _, _ = np.histogram2d(
+            mains["latitude"].to_numpy(dtype=float), mains["longitude"].to_numpy(dtype=float),
+            bins=(n_rows, n_cols),
+            range=((lat0, lat0 + n_rows * cell_deg), (lon0, lon0 + n_cols * cell_deg)),
+        )
+        mid_lat = math.radians(lat0 + n_rows * cell_deg / 2)
+        sigma_rows = smoothing_km / KM_PER_DEG / cell_deg
+        sigma_cols = smoothing_km / (KM_PER_DEG * math.cos(mid_lat)) / cell_deg
+        smoothed = gaussian_smooth(counts, sigma_rows, sigma_cols)
+        pdf = (1 - background_floor) * smoothed / smoothed.sum() + background_floor / smoothed.size
+        return cls(lat0, lon0, cell_deg, pdf, len(mains), years, b_value, b_std, m_min, m_max)
+
+    @property
+    def annual_rate(self):
+        return self.n_events / self.years
+
+    def draw_parameters(self, rng):
+        """Epistemik belirsizlik: toplam oran Gamma(N + 0.5) / yıl, b ~ Normal(b, b_std)."""
+        rate = rng.gamma(self.n_events + 0.5) / self.years
+        b_value = max(0.5, rng.normal(self.b_value, self.b_std))
+        return rate, b_value
+
+    def tail_fraction(self, b_value, mag_threshold):
+        """Kesilmiş Gutenberg-Richter'de M >= mag_threshold olasılığı."""
+        beta = b_value * math.log(10)
+        top = np.exp(-beta * (self.m_max - self.m_min))
+        return np.clip((np.exp(-beta * (mag_threshold - self.m_min)) - top) / (1 - top), 0.0, 1.0)
+
+    def site_mass(self, site_lat, site_lon, radius_km, sub=MASS_SUBSAMPLE):
+        """Her konumun radius_km yarıçapına düşen arka plan yoğunluğu payı (hücre başına sub x sub nokta)."""
+        n_rows, n_cols = self.pdf.shape
+        frac = (np.arange(sub) + 0.5) / sub
+        lat = self.lat0 + (np.arange(n_rows)[:, None] + frac[None, :]).ravel() * self.cell_deg
+        lon = self.lon0 + (np.arange(n_cols)[:, None] + frac[None, :]).ravel() * self.cell_deg
+        weight = np.repeat(np.repeat(self.pdf, sub, axis=0), sub, axis=1).ravel() / (sub * sub)
+        grid_lat = np.repeat(lat, len(lon))
+        grid_lon = np.tile(lon, len(lat))
+        mass = np.empty(len(site_lat))
+        for i, (la, lo) in enumerate(zip(site_lat, site_lon)):
+            mass[i] = weight[_haversine(la, lo, grid_lat, grid_lon) <= radius_km].sum()
+        return mass
+
+    def background(self, rng, n_sims, horizon_years, rate, b_value):
+        """n_sims katalog için arka plan olayları: (sim, zaman_gün, enlem, boylam, büyüklük)."""
+        per_sim = rng.poisson(rate * horizon_years, n_sims)
+        n = int(per_sim.sum())
+        sim = np.repeat(np.arange(n_sims), per_sim)
+        cells = rng.choice(self.pdf.size, size=n, p=self.pdf.ravel())
+        rows, cols = np.divmod(cells, self.pdf.shape[1])
+        lat = self.lat0 + (rows + rng.random(n)) * self.cell_deg
+        lon = self.lon0 + (cols + rng.random(n)) * self.cell_deg
+        t = rng.random(n) * horizon_years * 365.25
+        mag = _gr_magnitudes(rng, n, b_value, self.m_min, self.m_max)
+        return sim, t, lat, lon, mag
+
+    def aftershocks(self, rng, parents, horizon_years, b_value, etas):
+        """ETAS benzeri kuşaklar: her kuşak bir önceki kuşağın olaylarından tetiklenir."""
+        horizon_days = horizon_years * 365.25
+        out = [parents]
+        sim, t, lat, lon, mag = parents
+        for _ in range(MAX_GENERATIONS):
+            n_child = rng.poisson(etas["K"] * 10 ** (etas["alpha"] * (mag - self.m_min)))
+            total = int(n_child.sum())
+            if total == 0:
+                break
+            idx = np.repeat(np.arange(len(mag)), n_child)
+            # Omori: t = c * ((1 - u)^(1 / (1 - p)) - 1)
+            u = rng.random(total)
+            dt = etas["c_days"] * ((1 - u) ** (1 / (1 - etas["p"])) - 1)
+            # Uzaklık: kırılma boyu L = 10^(0.5 M - 1.85) km ölçekli güç yasası
+            d_km = 10 ** (0.5 * mag[idx] - 1.85)
+            r_km = d_km * np.sqrt((1 - rng.random(total)) ** (-1 / (etas["q"] - 1)) - 1)
+            az = rng.random(total) * 2 * np.pi
+            c_lat = lat[idx] + r_km * np.cos(az) / KM_PER_DEG
+            c_lon = lon[idx] + r_km * np.sin(az) / (KM_PER_DEG * np.cos(np.radians(lat[idx])))
+            c_t = t[idx] + dt
+            keep = c_t < horizon_days
+            sim, t, lat, lon = sim[idx][keep], c_t[keep], c_lat[keep], c_lon[keep]
+            mag = _gr_magnitudes(rng, int(keep.sum()), b_value, self.m_min, self.m_max)
+            out.append((sim, t, lat, lon, mag))
+        return tuple(np.concatenate(parts) for parts in zip(*out))
+
+
+def _simulate_batch(task):
+    # İşçi süreçte çalışır: tek parametre çekilişiyle n_sims katalog ve site aşımları
+    model, site_lat, site_lon, n_sims, horizon_years, mag_threshold, radius_km, etas, seed = task
+    rng = np.random.default_rng(seed)
+    rate, b_value = model.draw_parameters(rng)
+    events = model.background(rng, n_sims, horizon_years, rate, b_value)
+    if etas:
+        events = model.aftershocks(rng, events, horizon_years, b_value, etas)
+    sim, _, lat, lon, mag = events
+    big = mag >= mag_threshold
+    sim, lat, lon = sim[big], lat[big], lon[big]
+
+    hits = np.zeros((len(site_lat), n_sims), dtype=bool)
+    counts = np.zeros(len(site_lat))
+    if len(sim):
+        d = _haversine(site_lat[:, None], site_lon[:, None], lat[None, :], lon[None, :])
+        site_idx, ev_idx = np.nonzero(d <= radius_km)
+        hits[site_idx, sim[ev_idx]] = True
+        counts = np.bincount(site_idx, minlength=len(site_lat)).astype(float)
+    return hits.sum(axis=1), counts, len(mag)
+
+
+def _wilson(k, n, z=1.96):
+    p = k / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return center - half, center + half
+
+
+def _parameter_band(model, site_lat, site_lon, p_exceed, horizon_years, mag_threshold, radius_km,
+                    n_draws=PARAM_DRAWS, seed=0, quantiles=(5, 95)):
+    """
+    Parametre (oran, b) belirsizliğinden gelen aşım olasılığı yayılımı. Her çekilişte konumun
+    beklenen arka plan sayısı λ = oran x süre x P(M >= eşik | b) x yarıçaptaki yoğunluk payı ve
+    aşım 1 - exp(-s λ) analitik hesaplanır (Monte Carlo gürültüsü yok). s, çekilişler üzerindeki
+    ortalama simülasyon oranına (p_exceed) eşit olacak şekilde konum başına seçilir: ETAS
+    kümelenmesi etkin oranı değiştirir, bant ise yalnızca parametrelerin yayılımını taşır.
+    """
+    rng = np.random.default_rng(seed)
+    draws = np.array([model.draw_parameters(rng) for _ in range(n_draws)])
+    mass = model.site_mass(site_lat, site_lon, radius_km)
+    lam = (draws[:, 0] * horizon_years * model.tail_fraction(draws[:, 1], mag_threshold))[:, None] * mass[None, :]
+    # ortalama(1 - exp(-s λ)) = p_exceed: s'de monoton, ikiye bölme (konumlar birlikte)
+    lo = np.zeros(len(mass))
+    hi = np.full(len(mass), 1.0)
+    target = np.minimum(p_exceed, 1 - 1e-9)
+    while True:
+        short = (1 - np.exp(-hi * lam)).mean(axis=0) < target
+        if not (short & (mass > 0)).any() or hi.max() > 1e12:
+            break
+        hi[short] *= 2
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        below = (1 - np.exp(-mid * lam)).mean(axis=0) < target
+        lo = np.where(below, mid, lo)
+        hi = np.where(below, hi, mid)
+    p = 1 - np.exp(-hi * lam)
+    low, high = np.percentile(p, quantiles, axis=0)
+    # Yarıçapta arka plan yoğunluğu yoksa (ızgara dışı) yayılım tanımsız: nokta tahmini
+    return np.where(mass > 0, low, p_exceed), np.where(mass > 0, high, p_exceed)
+
+
+def simulate_hazard(model, sites, n_sims=10_000, horizon_years=10.0, mag_threshold=6.0, radius_km=200.0,
+                    etas=None, batch_size=100, workers=None, seed=42):
+    """
+    sites: (ad, enlem, boylam) listesi. Her site için horizon_years içinde radius_km yarıçapında
+    en az bir M >= mag_threshold olma olasılığını döner.
+      p_exceed          : tüm simülasyonlardaki oran
+      ci_low / ci_high  : Monte Carlo %95 (Wilson) aralığı
+      p05 / p95         : parametre (oran, b) belirsizliğinden gelen yayılım (_parameter_band;
+                          parti boyutundan ve Monte Carlo gürültüsünden bağımsız)
+      mean_events       : yarıçaptaki beklenen M >= eşik olay sayısı
+    """
+    etas = dict(DEFAULT_ETAS, **etas) if isinstance(etas, dict) else (DEFAULT_ETAS if etas else None)
+    names = [s[0] for s in sites]
+    site_lat = np.array([s[1] for s in sites], dtype=float)
+    site_lon = np.array([s[2] for s in sites], dtype=float)
+
+    n_batches = max(1, int(math.ceil(n_sims / batch_size)))
+    sizes = [batch_size] * (n_batches - 1) + [n_sims - batch_size * (n_batches - 1)]
+    # Parti tohumları işçi sayısından bağımsız: sonuçlar her zaman aynı
+    seeds = np.random.SeedSequence(seed).spawn(n_batches)
+    tasks = [(model, site_lat, site_lon, size, horizon_years, mag_threshold, radius_km, etas, s)
+             for size, s in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    t0 = time.perf_counter()
+    if workers <= 1:
+        results = [_simulate_batch(t) for t in tasks]
+    else:
+        from model_training import _pool_context
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+            results = list(pool.map(_simulate_batch, tasks))
+    seconds = time.perf_counter() - t0
+
+    hits = np.stack([r[0] for r in results]).sum(axis=0)
+    counts = np.stack([r[1] for r in results]).sum(axis=0)
+    low, high = _wilson(hits, n_sims)
+    p05, p95 = _parameter_band(model, site_lat, site_lon, hits / n_sims, horizon_years, mag_threshold,
+                               radius_km, seed=seed)
+    out = pd.DataFrame({
+        "name": names,
+        "latitude": site_lat,
+        "longitude": site_lon,
+        "p_exceed": hits / n_sims,
+        "ci_low": low,
+        "ci_high": high,
+        "p05": p05,
+        "p95": p95,
+        "mean_events": counts / n_sims,
+    })
+    out.attrs.update({
+        "n_sims": n_sims,
+        "seconds": seconds,
+        "events_simulated": int(sum(r[2] for r in results)),
+        "etas": bool(etas),
+    })
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stokastik katalog Monte Carlo tehlike simülasyonu")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--sites", default=os.path.join("assets", "provinces.csv"),
+                        help="name,latitude,longitude sütunlu CSV")
+    parser.add_argument("--sims", type=int, default=10_000)
+    parser.add_argument("--years", type=float, default=10.0)
+    parser.add_argument("--mag", type=float, default=6.0)
+    parser.add_argument("--radius-km", type=float, default=200.0)
+    parser.add_argument("--etas", action="store_true", help="ETAS benzeri artçı tetiklemesini aç")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from risk_engine import EarthquakeRiskEngine
+
+    engine = EarthquakeRiskEngine(csv_path=args.csv, cache_dir=None)
+    engine._prepare_frames()
+    model = HazardModel.fit(engine.df_full)
+    print(f"Model: {model.n_events} ana şok / {model.years:.1f} yıl "
+          f"({model.annual_rate:.1f}/yıl, M>={model.m_min}), b={model.b_value:.2f}±{model.b_std:.2f}")
+
+    sites = list(pd.read_csv(args.sites)[["name", "latitude", "longitude"]].itertuples(index=False, name=None))
+    result = simulate_hazard(model, sites, n_sims=args.sims, horizon_years=args.years,
+                             mag_threshold=args.mag, radius_km=args.radius_km, etas=args.etas,
+                             batch_size=args.batch_size, workers=args.workers)
+    print(f"{args.sims} simülasyon x {len(sites)} konum, {result.attrs['events_simulated']} olay, "
+          f"{result.attrs['seconds']:.1f} sn (ETAS: {'açık' if args.etas else 'kapalı'})")
+    print(result.sort_values("p_exceed", ascending=False).head(15)
+          .to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    if args.output:
+        result.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import argparse
+import array
+import collections
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import data_manager
+from catalog_io import read_latest_time
+from features import to_epoch_seconds
+from kandilli_stub import start_stub_process
+
+# Katalog satırı ile yayınlanan olay sürümünün konum eşleşme toleransı (derece; API 4 hane, katalog float32)
+MATCH_TOL_DEG = 5e-4
+
+
+def _stub_url(url, path):
+    # Akış sunucusunun yardımcı uç noktaları (/_stub/...) aynı adreste
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}{path}"
+
+
+class IngestProbe:
+    """
+    data_manager ve motor dinleyicisi: akıştaki her olayın ilk yayın anından motorda
+    sorgulanabilir olduğu (katalog sürümü yayınlandığı) ana kadar geçen süreyi kaydeder.
+    Katalog satırları akıştaki sürümlerle (olay saniyesi + konum) eşlenir.
+
+    Akış ayrı süreçtedir; sürümler /_stub/versions ile okunur. Eşlenen olayın adayları
+    bırakılır, kataloğun gerisinde kalan bekleyenler kayıp sayılıp bırakılır, revizyon takibi
+    yanıt penceresindeki (revise_window) olaylarla sınırlıdır; olay başına yalnızca zaman
+    damgaları kalır. Böylece ölçülen bellek eğimine düzeneğin
+    kendi kayıtları karışmaz (kalan kayıt sayısı entries() ile ayrıca raporlanır).
+    """
+
+    def __init__(self, stub_url, revise_window=500):
+        self.versions_url = _stub_url(stub_url, "/_stub/versions")
+        self.revise_window = revise_window
+        # Henüz kataloğa girmemiş olaylar: olay_no -> [ilk yayın anı, son sürüm değerleri]
+        self.pending = {}
+        self._by_sec = collections.defaultdict(list)
+        # Görünür olaylar: ilk yayın ve görünme anları; pencere içindekilerin eşlenen değeri
+        self.first_walls = array.array("d")
+        self.visible_walls = array.array("d")
+        # Kataloğun son olay saniyesinin gerisinde kalmış bekleyenler bir daha eklenemez (kayıp)
+        self.lost_walls = array.array("d")
+        self.seen = {}
+        self.stale = set()
+        self.stale_dropped = 0
+        self.unmatched_rows = 0
+        self.refresh_s = []
+        self.publishes = 0
+        self._max_eid = -1
+        self._synced = 0
+        self._last_ingest = None
+
+    def _sync(self):
+        with urllib.request.urlopen(f"{self.versions_url}?since={self._synced}", timeout=10) as response:
+            data = json.load(response)
+        for eid, sec, lat, lon, mag, wall in data["versions"]:
+            values = (lat, lon, mag)
+            if eid in self.pending:
+                self.pending[eid][1] = values
+                self._by_sec[sec].append((eid, lat, lon, mag))
+            elif eid in self.seen:
+                # Görünür olayın revizyonu: katalogdaki değerden farklıysa bayat
+                if values != self.seen[eid]:
+                    self.stale.add(eid)
+                else:
+                    self.stale.discard(eid)
+            elif eid > self._max_eid:
+                self.pending[eid] = [wall, values]
+                self._by_sec[sec].append((eid, lat, lon, mag))
+                self._max_eid = eid
+        self._synced = data["first"] + len(data["versions"])
+        # Yanıt penceresinden çıkan olaylar artık revize edilemez
+        horizon = self._max_eid - self.revise_window
+        for eid in [e for e in self.seen if e <= horizon]:
+            del self.seen[eid]
+            if eid in self.stale:
+                self.stale.remove(eid)
+                self.stale_dropped += 1
+
+    def on_ingest(self, count):
+        self._last_ingest = time.time()
+
+    def on_catalog_published(self, old, new):
+        wall = time.time()
+        self.publishes += 1
+        if self._last_ingest is not None:
+            self.refresh_s.append(wall - self._last_ingest)
+        if old is None or old.df_full is None or new.df_full is None:
+            return
+        times = new.df_full["time"]
+        start = int(times.searchsorted(old.df_full["time"].iloc[-1], side="right")) if len(old.df_full) else 0
+        rows = new.df_full.iloc[start:]
+        self._sync()
+        secs = to_epoch_seconds(rows["time"].to_numpy())
+        for sec, lat, lon, mag in zip(secs, rows["latitude"].to_numpy(), rows["longitude"].to_numpy(),
+                                      rows["mag"].to_numpy()):
+            candidates = self._by_sec.get(int(sec), ())
+            match = None
+            for eid, vlat, vlon, vmag in candidates:
+                if abs(vlat - lat) < MATCH_TOL_DEG and abs(vlon - lon) < MATCH_TOL_DEG:
+                    match = (eid, (vlat, vlon, vmag))
+                    break
+            if match is None:
+                self.unmatched_rows += 1
+                continue
+            eid, seen = match
+            first_wall, latest = self.pending.pop(eid)
+            self.first_walls.append(first_wall)
+            self.visible_walls.append(wall)
+            # Katalog eşleşen sürümü taşır; akıştaki son sürüm farklıysa revizyon alınmamış
+            self.seen[eid] = seen
+            if latest != seen:
+                self.stale.add(eid)
+            remaining = [c for c in candidates if c[0] != eid]
+            if remaining:
+                self._by_sec[int(sec)] = remaining
+            else:
+                del self._by_sec[int(sec)]
+        if len(rows):
+            self._drop_passed(int(to_epoch_seconds(rows["time"].to_numpy()[-1:])[0]))
+
+    def _drop_passed(self, last_sec):
+        # data_manager yalnızca son kayıttan yeni olayları ekler: daha eski saniyedekiler kayıptır
+        for sec in [s for s in self._by_sec if s < last_sec]:
+            for eid, *_ in self._by_sec.pop(sec):
+                entry = self.pending.pop(eid, None)
+                if entry is not None:
+                    self.lost_walls.append(entry[0])
+
+    @property
+    def visible(self):
+        return len(self.first_walls)
+
+    def latencies(self):
+        return np.asarray(self.visible_walls) - np.asarray(self.first_walls)
+
+    def stale_revisions(self):
+        """Katalogdaki değeri akıştaki son sürümden farklı kalan (revizyonu alınmamış) olay sayısı."""
+        return self.stale_dropped + len(self.stale)
+
+    def due_and_lost(self, before):
+        """before anından önce yayınlanan olaylar ve bunlardan kataloğa hiç girmeyenler."""
+        lost = sum(1 for wall, _ in self.pending.values() if wall < before)
+        lost += int((np.asarray(self.lost_walls) < before).sum())
+        return int((np.asarray(self.first_walls) < before).sum()) + lost, lost
+
+    def entries(self):
+        """Düzeneğin olay başına olmayan kayıtları (bekleyen adaylar, revizyon penceresi)."""
+        return len(self.pending) + sum(len(v) for v in self._by_sec.values()) + len(self.seen) + len(self.stale)
+
+
+def _classify(message):
+    if "eklendi" in message:
+        return "added"
+    if "güncel" in message:
+        return "empty"
+    return "error"
+
+
+def _wait_until_visible(engine, csv_path, timeout=120.0):
+    # Son alımın arka plan yenilemesi bitene kadar bekle
+    latest = read_latest_time(csv_path)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        catalog = engine._catalog
+        if catalog is not None and len(catalog.df_full) and catalog.df_full["time"].iloc[-1] >= latest:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def _pct(values, q):
+    return float(np.percentile(values, q)) if len(values) else float("nan")
+
+
+def run(csv_path, cycles=2000, interval=0.05, hot_days=365, sample_every=100, feed_kwargs=None, stub_kwargs=None):
+    """
+    Katalog geçici kopyası, yerel Kandilli benzeri ve ısınmış motorla alım yolunu cycles kez
+    yoklar. Sonuç: kayıt/sn, uçtan uca gecikme, kayıp/revizyon sayıları ve RSS örnekleri.
+    """
+    from catalog_tiers import _rss_mb
+    from risk_engine import EarthquakeRiskEngine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        local_csv = os.path.join(tmp, "query.csv")
+        shutil.copy(csv_path, local_csv)
+        engine = EarthquakeRiskEngine(csv_path=local_csv, cache_dir=None)
+        engine.hot_days = hot_days
+        engine.warm_up()
+
+        # Akış saati ısınmadan sonra başlar: ısınma süresi gecikmeye yazılmasın. Akış ayrı
+        # süreçte: kayıtları ölçülen sürecin belleğine yazılmaz
+        feed_kwargs = feed_kwargs or {}
+        stub, url = start_stub_process(feed_kwargs, stub_kwargs)
+        probe = IngestProbe(url, revise_window=feed_kwargs.get("payload_size", 500))
+        data_manager.add_update_listener(probe.on_ingest)
+        data_manager.add_update_listener(engine.on_catalog_updated)
+        engine.add_catalog_listener(probe.on_catalog_published)
+        outcomes = collections.Counter()
+        rows_added = 0
+        poll_s = []
+        samples = []
+        last_poll_start = None
+        t_start = time.time()
+        try:
+            for cycle in range(cycles):
+                if cycle % sample_every == 0:
+                    samples.append((cycle, {**_rss_mb(), "probe_entries": probe.entries()}))
+                t0 = time.time()
+                # data_manager her yoklamada birkaç satır yazar; ölçümü kirletmesin
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    message = data_manager.fetch_and_update_data(api_url=url, csv_path=local_csv)
+                poll_s.append(time.time() - t0)
+                kind = _classify(message)
+                outcomes[kind] += 1
+                if kind != "error":
+                    last_poll_start = t0
+                if kind == "added":
+                    rows_added += int(message.split()[0])
+                time.sleep(interval)
+            elapsed = time.time() - t_start
+            flushed = _wait_until_visible(engine, local_csv)
+            samples.append((cycles, {**_rss_mb(), "probe_entries": probe.entries()}))
+            engine.remove_catalog_listener(probe.on_catalog_published)
+            probe._sync()
+            with urllib.request.urlopen(_stub_url(url, "/_stub/stats"), timeout=10) as response:
+                stub_stats = json.load(response)
+        finally:
+            data_manager.remove_update_listener(engine.on_catalog_updated)
+            data_manager.remove_update_listener(probe.on_ingest)
+            engine.remove_catalog_listener(probe.on_catalog_published)
+            stub.terminate()
+            stub.join()
+
+        # Son başarılı yoklamadan önce yayınlanmış ama kataloğa hiç girmemiş olaylar kayıptır
+        due, lost = probe.due_and_lost(last_poll_start) if last_poll_start is not None else (0, 0)
+        latency = probe.latencies()
+        poll = np.array(poll_s)
+        cyc = np.array([c for c, _ in samples], dtype=float)
+        anon = np.array([s.get("anon_mb", s.get("rss_mb", 0.0)) for _, s in samples])
+        # İlk örnekler ısınma artığı içerir; eğim ikinci yarıdan
+        half = len(cyc) // 2
+        slope = float(np.polyfit(cyc[half:], anon[half:], 1)[0] * 1000) if len(cyc) - half >= 2 else float("nan")
+        return {
+            "cycles": cycles,
+            "elapsed_s": elapsed,
+            "outcomes": dict(outcomes),
+            "stub": stub_stats,
+            "rows_added": rows_added,
+            "records_per_s": rows_added / elapsed if elapsed else 0.0,
+            "records_per_busy_s": rows_added / poll.sum() if poll.sum() else 0.0,
+            "poll_ms": (_pct(poll * 1000, 50), _pct(poll * 1000, 99)),
+            "latency_s": (_pct(latency, 50), _pct(latency, 95), _pct(latency, 99),
+                          float(latency.max()) if len(latency) else float("nan")),
+            "visible": probe.visible,
+            "due": due,
+            "lost": lost,
+            "stale_revisions": probe.stale_revisions(),
+            "unmatched_rows": probe.unmatched_rows,
+            "publishes": probe.publishes,
+            "refresh_ms": (_pct(np.array(probe.refresh_s) * 1000, 50), _pct(np.array(probe.refresh_s) * 1000, 99)),
+            "flushed": flushed,
+            "memory": samples,
+            "anon_slope_mb_per_1000": slope,
+            "probe_entries": probe.entries(),
+            "retention": engine.retention_info(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Alım yolu yük testi: yerel Kandilli benzeri -> data_manager -> motor (kayıt/sn, gecikme, bellek)")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--cycles", type=int, default=2000, help="Yoklama sayısı")
+    parser.add_argument("--interval", type=float, default=0.05, help="Yoklamalar arası bekleme (sn)")
+    parser.add_argument("--hot-days", type=int, default=365, help="Motor sıcak katman günü (0: katmansız)")
+    parser.add_argument("--sample-every", type=int, default=100, help="Kaç yoklamada bir RSS örneği")
+    parser.add_argument("--rate", type=float, default=2.0, help="Saniyede yayınlanan olay")
+    parser.add_argument("--payload-size", type=int, default=500)
+    parser.add_argument("--revision-rate", type=float, default=0.0)
+    parser.add_argument("--origin-delay", type=float, default=0.0, help="Ortalama olay->yayın gecikmesi (sn)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--replay", help="Kaydedilmiş API yanıtı (JSON)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    r = run(
+        args.csv, cycles=args.cycles, interval=args.interval, hot_days=args.hot_days or None,
+        sample_every=args.sample_every,
+        feed_kwargs={
+            "rate": args.rate, "payload_size": args.payload_size, "revision_rate": args.revision_rate,
+            "origin_delay_s": args.origin_delay, "replay": args.replay, "seed": args.seed,
+        },
+        stub_kwargs={
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+            "error_rate": args.error_rate, "seed": args.seed,
+        },
+    )
+    s = r["stub"]
+    print(f"{r['cycles']} yoklama, {r['elapsed_s']:.1f} sn; sonuçlar: {r['outcomes']}")
+    print(f"  akış: {s['events']} olay, {s['revisions']} revizyon, {s['requests']} istek ({s['errors']} hata)")
+    print(f"  alım: {r['rows_added']} kayıt, {r['records_per_s']:.2f} kayıt/sn "
+          f"(yoklama içinde {r['records_per_busy_s']:.0f} kayıt/sn); "
+          f"yoklama p50 {r['poll_ms'][0]:.1f} ms, p99 {r['poll_ms'][1]:.1f} ms")
+    p50, p95, p99, mx = r["latency_s"]
+    print(f"  yayın -> sorgulanabilir: p50 {p50:.2f} sn, p95 {p95:.2f} sn, p99 {p99:.2f} sn, max {mx:.2f} sn "
+          f"({r['visible']} olay, {r['publishes']} katalog yayını; yenileme p50 {r['refresh_ms'][0]:.0f} ms, "
+          f"p99 {r['refresh_ms'][1]:.0f} ms)")
+    print(f"  kayıp: {r['lost']}/{r['due']} olay hiç alınmadı; {r['stale_revisions']} olayda son revizyon "
+          f"kataloğa yansımadı; eşleşmeyen satır {r['unmatched_rows']}"
+          + ("" if r["flushed"] else "; UYARI: son yenileme zaman aşımına uğradı"))
+    first, last = r["memory"][0][1], r["memory"][-1][1]
+    print(f"  bellek: RSS {first.get('rss_mb')} -> {last.get('rss_mb')} MB, anonim {first.get('anon_mb')} -> "
+          f"{last.get('anon_mb')} MB; eğim (ikinci yarı) {r['anon_slope_mb_per_1000']:+.2f} MB / 1000 yoklama "
+          f"(akış ayrı süreçte; düzenek kayıtları {first.get('probe_entries')} -> {last.get('probe_entries')}, "
+          f"olay başına 8-16 bayt zaman damgası)")
+    print(f"  saklama: {r['retention']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import collections
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from synthetic_catalog import TURKEY_BOUNDS, gutenberg_richter
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+# Gerçek servisle aynı yol: data_manager'a yalnızca taban adres değiştirilerek verilir
+LIVE_PATH = "/deprem/kandilli/live"
+# Kandilli yerel saati (UTC+3) yayınlar; data_manager da böyle yorumlar
+LOCAL_OFFSET = timedelta(hours=3)
+
+
+def _load_replay(path):
+    # Kaydedilmiş API yanıtı ({"status":..,"result":[..]}) veya düz olay listesi
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.get("result", []) if isinstance(data, dict) else data
+    items = [it for it in items if it.get("date_time") and it.get("geojson")]
+    # En eskiden yeniye yayınlanır
+    return sorted(items, key=lambda it: it["date_time"].replace(".", "-"))
+
+
+class KandilliFeed:
+    """
+    Kandilli canlı akışının yerel benzeri. Olaylar Poisson süreciyle saniyede rate olay
+    hızında yayınlanır; yanıt en yeni payload_size olayı (yeniden eskiye) içerir.
+
+    - origin_delay_s > 0: olay zamanı yayın anından üstel dağılımlı gecikme kadar öncedir
+      (gerçek servis olayları değerlendirme sonrası, sırası bozulmuş olarak yayınlayabilir).
+    - revision_rate: saniyede, listedeki olaylardan birinin büyüklük/konumunun revize
+      edilme sayısı (date_time aynı kalır, rev artar).
+    - replay: kaydedilmiş yanıttaki olaylar sırayla tekrar yayınlanır; keep_times=False ise
+      zamanları yayın anına taşınır (aksi halde tek geçişte eski zamanlar kalır).
+
+    Her olay sürümü published_versions'a (olay_no, olay_utc_sn, enlem, boylam, büyüklük,
+    yayın_duvar_saati) olarak yazılır; yük testi uçtan uca gecikmeyi buradan ölçer. Okunan
+    sürümler versions_since ile bırakılır (liste uzun çalışmalarda büyümez).
+    """
+
+    def __init__(self, rate=2.0, payload_size=500, revision_rate=0.0, origin_delay_s=0.0,
+                 replay=None, keep_times=False, bounds=TURKEY_BOUNDS, seed=0):
+        self.rate = rate
+        self.revision_rate = revision_rate
+        self.origin_delay_s = origin_delay_s
+        self.bounds = bounds
+        self.keep_times = keep_times
+        self.replay = _load_replay(replay) if replay else None
+        self.rng = np.random.default_rng(seed)
+        self.items = collections.deque(maxlen=payload_size)
+        self.published_versions = []
+        self._versions_base = 0
+        self.revisions = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._clock = time.time()
+        self._next_at = self._clock + self._gap()
+
+    def _gap(self):
+        return float(self.rng.exponential(1.0 / self.rate)) if self.rate > 0 else float("inf")
+
+    def _synthetic(self, origin):
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        mag = float(gutenberg_richter(self.rng, 1, m_min=1.0, m_max=7.0)[0])
+        return {
+            "lat": float(self.rng.uniform(lat_min, lat_max)),
+            "lon": float(self.rng.uniform(lon_min, lon_max)),
+            "depth": float(self.rng.uniform(2.0, 30.0)),
+            "mag": mag,
+            "title": "SENTETIK",
+            "origin": origin,
+        }
+
+    def _replayed(self, origin):
+        rec = self.replay[self._seq % len(self.replay)]
+        if self.keep_times:
+            local = datetime.strptime(rec["date_time"].replace(".", "-"), "%Y-%m-%d %H:%M:%S")
+            origin = (local - LOCAL_OFFSET).replace(tzinfo=timezone.utc).timestamp()
+        lon, lat = rec["geojson"]["coordinates"][:2]
+        return {
+            "lat": float(lat), "lon": float(lon), "depth": float(rec.get("depth") or 0.0),
+            "mag": float(rec.get("mag") or 0.0), "title": rec.get("title", ""), "origin": origin,
+        }
+
+    def _item(self, ev, rev=0):
+        local = datetime.fromtimestamp(ev["origin"], timezone.utc).replace(tzinfo=None) + LOCAL_OFFSET
+        return {
+            "earthquake_id": f"stub{ev['id']}",
+            "provider": "kandilli",
+            "title": ev["title"],
+            "date": local.strftime("%Y.%m.%d %H:%M:%S"),
+            "date_time": local.strftime("%Y-%m-%d %H:%M:%S"),
+            "mag": round(ev["mag"], 1),
+            "depth": round(ev["depth"], 1),
+            "geojson": {"type": "Point", "coordinates": [round(ev["lon"], 4), round(ev["lat"], 4)]},
+            "rev": rev or None,
+            "created_at": int(ev["origin"]),
+        }
+
+    def _record(self, item, wall):
+        lon, lat = item["geojson"]["coordinates"]
+        self.published_versions.append(
+            (int(item["earthquake_id"][4:]), item["created_at"], lat, lon, item["mag"], wall)
+        )
+
+    def _publish(self, wall):
+        delay = float(self.rng.exponential(self.origin_delay_s)) if self.origin_delay_s > 0 else 0.0
+        # API saniye çözünürlüklüdür
+        origin = float(int(wall - delay))
+        ev = self._replayed(origin) if self.replay else self._synthetic(origin)
+        ev["id"] = self._seq
+        self._seq += 1
+        item = self._item(ev)
+        item["_ev"] = ev
+        self.items.append(item)
+        self._record(item, wall)
+
+    def _revise(self, wall):
+        item = self.items[int(self.rng.integers(len(self.items)))]
+        ev = item["_ev"]
+        ev["mag"] = max(0.5, ev["mag"] + float(self.rng.choice([-0.2, -0.1, 0.1, 0.2])))
+        ev["lat"] += float(self.rng.normal(0, 0.02))
+        ev["lon"] += float(self.rng.normal(0, 0.02))
+        revised = self._item(ev, rev=(item["rev"] or 0) + 1)
+        item.update(revised)
+        self.revisions += 1
+        self._record(item, wall)
+
+    def advance(self, now=None):
+        """now (duvar saati) anına kadar vadesi gelen yayınları ve revizyonları uygular."""
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._next_at <= now:
+                self._publish(self._next_at)
+                self._next_at += self._gap()
+            if self.revision_rate > 0 and self.items and now > self._clock:
+                for _ in range(int(self.rng.poisson(self.revision_rate * (now - self._clock)))):
+                    self._revise(now)
+            self._clock = max(self._clock, now)
+
+    def payload(self, now=None):
+        """API yanıtı: {"status": true, "result": [en yeniden eskiye olaylar]}."""
+        self.advance(now)
+        with self._lock:
+            result = [{k: v for k, v in it.items() if k != "_ev"} for it in reversed(self.items)]
+        return {"status": True, "desc": "", "result": result}
+
+    def versions_since(self, start):
+        """
+        start sıra numarasından itibaren yayınlanan sürümler: (ilk sıra no, sürüm listesi).
+        start'tan önceki sürümler okunmuş sayılır ve bırakılır.
+        """
+        with self._lock:
+            drop = min(max(start - self._versions_base, 0), len(self.published_versions))
+            del self.published_versions[:drop]
+            self._versions_base += drop
+            return self._versions_base, list(self.published_versions)
+
+    def stats(self):
+        with self._lock:
+            return {"events": self._seq, "revisions": self.revisions, "listed": len(self.items)}
+
+
+class KandilliRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "KandilliStub/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == "/_stub/stats":
+            self._send_json(200, {**server.feed.stats(), "requests": server.requests, "errors": server.errors})
+            return
+        if url.path == "/_stub/versions":
+            since = int(parse_qs(url.query).get("since", ["0"])[0])
+            first, versions = server.feed.versions_since(since)
+            self._send_json(200, {"first": first, "versions": versions})
+            return
+        if url.path != LIVE_PATH:
+            self._send_json(404, {"error": "Bulunamadı"})
+            return
+        with server.lock:
+            server.requests += 1
+            delay = server.latency + server.jitter * float(server.rng.random())
+            fail = server.error_rate > 0 and float(server.rng.random()) < server.error_rate
+            kind = int(server.rng.integers(3)) if fail else None
+            if fail:
+                server.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        # Hata türleri: 503, 500 veya 200 ile status=false
+        if kind == 0:
+            self._send_json(503, {"error": "Servis kullanılamıyor"})
+        elif kind == 1:
+            self._send_json(500, {"error": "Sunucu hatası"})
+        elif kind == 2:
+            self._send_json(200, {"status": False, "desc": "Veri yok", "result": []})
+        else:
+            self._send_json(200, server.feed.payload())
+
+
+class KandilliStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, feed, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0, verbose=False):
+        super().__init__(address, KandilliRequestHandler)
+        self.feed = feed
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.rng = np.random.default_rng(seed + 1)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{LIVE_PATH}"
+
+
+def start_stub(feed, host=DEFAULT_HOST, port=0, **kwargs):
+    """Sunucuyu arka plan iş parçacığında başlatır (port=0: boş port). Sunucu nesnesini döner."""
+    server = KandilliStubServer((host, port), feed, **kwargs)
+    threading.Thread(target=server.serve_forever, name="kandilli-stub", daemon=True).start()
+    return server
+
+
+def _serve(conn, feed_kwargs, stub_kwargs):
+    server = KandilliStubServer((DEFAULT_HOST, 0), KandilliFeed(**feed_kwargs), **stub_kwargs)
+    conn.send(server.url)
+    conn.close()
+    server.serve_forever()
+
+
+def start_stub_process(feed_kwargs=None, stub_kwargs=None, timeout=60.0):
+    """
+    Akışı ve sunucuyu ayrı süreçte başlatır; (süreç, url) döner. Yük testinde ölçülen
+    sürecin belleği akışın kendi kayıtlarını taşımaz. Durdurmak için process.terminate().
+    """
+    from model_training import _pool_context
+
+    ctx = _pool_context()
+    recv, send = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_serve, args=(send, feed_kwargs or {}, stub_kwargs or {}),
+                          name="kandilli-stub", daemon=True)
+    process.start()
+    send.close()
+    if not recv.poll(timeout):
+        process.terminate()
+        raise RuntimeError("Kandilli benzeri süreç başlamadı.")
+    return process, recv.recv()
+
+
+def record_live(path, url=None):
+    """Gerçek servisin tek yanıtını replay için dosyaya kaydeder."""
+    import requests
+
+    from data_manager import API_URL
+    response = requests.get(url or API_URL, timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    return len(data.get("result", []))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kandilli canlı API'sinin yerel benzeri (alım yük testi için)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=2.0, help="Saniyede yayınlanan olay")
+    parser.add_argument("--payload-size", type=int, default=500, help="Yanıttaki olay sayısı")
+    parser.add_argument("--revision-rate", type=float, default=0.0, help="Saniyede revizyon")
+    parser.add_argument("--origin-delay", type=float, default=0.0,
+                        help="Olay zamanı ile yayın arasındaki ortalama gecikme (sn)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Hatalı yanıt oranı (0-1)")
+    parser.add_argument("--replay", help="Kaydedilmiş API yanıtı (JSON)")
+    parser.add_argument("--keep-times", action="store_true", help="Replay olaylarının özgün zamanları korunur")
+    parser.add_argument("--record", metavar="JSON", help="Gerçek servisten bir yanıt kaydet ve çık")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"{record_live(args.record)} olay kaydedildi: {args.record}")
+        return
+    feed = KandilliFeed(
+        rate=args.rate, payload_size=args.payload_size, revision_rate=args.revision_rate,
+        origin_delay_s=args.origin_delay, replay=args.replay, keep_times=args.keep_times, seed=args.seed,
+    )
+    server = KandilliStubServer(
+        (args.host, args.port), feed, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, seed=args.seed, verbose=args.verbose,
+    )
+    print(f"Dinleniyor: {server.url}  (GET /_stub/stats, GET /_stub/versions?since=N)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import http.client
+import json
+import threading
+import time
+
+import numpy as np
+
+from risk_server import DEFAULT_HOST, DEFAULT_PORT
+from synthetic_catalog import TURKEY_BOUNDS
+
+
+def run_client(host, port, points, latencies, errors, stop_at):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    i = 0
+    while time.perf_counter() < stop_at:
+        lat, lon = points[i % len(points)]
+        i += 1
+        body = json.dumps({"lat": lat, "lon": lon})
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/risk", body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except Exception as exc:
+            errors.append(str(exc))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="risk_server için yük testi (p50/p99 gecikme ve istek/sn)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--clients", type=int, default=16, help="Eşzamanlı istemci sayısı")
+    parser.add_argument("--duration", type=float, default=10.0, help="Saniye")
+    parser.add_argument("--unique-points", type=int, default=5000,
+                        help="Farklı konum sayısı (küçük değer önbellek isabetini artırır)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    lat_min, lat_max, lon_min, lon_max = TURKEY_BOUNDS
+    points = list(zip(
+        np.round(rng.uniform(lat_min + 0.5, lat_max - 1.0, args.unique_points), 4).tolist(),
+        np.round(rng.uniform(lon_min + 0.5, lon_max - 0.5, args.unique_points), 4).tolist(),
+    ))
+
+    per_client = []
+    errors = []
+    stop_at = time.perf_counter() + args.duration
+    threads = []
+    for c in range(args.clients):
+        latencies = []
+        per_client.append(latencies)
+        # Her istemci listeye farklı bir noktadan başlar
+        offset = c * len(points) // args.clients
+        t = threading.Thread(
+            target=run_client,
+            args=(args.host, args.port, points[offset:] + points[:offset], latencies, errors, stop_at),
+            daemon=True,
+        )
+        threads.append(t)
+
+    t_start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+
+    lat = np.array([x for lst in per_client for x in lst]) * 1000
+    if len(lat) == 0:
+        print(f"Hiç başarılı istek yok. Hatalar: {errors[:5]}")
+        return
+    print(f"{args.clients} istemci, {elapsed:.1f} sn, {len(lat)} istek, {len(errors)} hata")
+    print(f"  istek/sn: {len(lat) / elapsed:.1f}")
+    print(f"  gecikme p50: {np.percentile(lat, 50):.2f} ms  p90: {np.percentile(lat, 90):.2f} ms  "
+          f"p99: {np.percentile(lat, 99):.2f} ms  max: {lat.max():.2f} ms")
+
+    conn = http.client.HTTPConnection(args.host, args.port, timeout=10)
+    conn.request("GET", "/health")
+    health = json.loads(conn.getresponse().read())
+    batches = health.get("batches") or 0
+    if batches:
+        print(f"  ortalama mikro-batch boyutu: {health['batched_points'] / batches:.1f}")
+    print(f"  önbellek: {health['cache']}")
+
+
+if __name__ == "__main__":
+    main()
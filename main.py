@@ -1,3 +1,10 @@
+import sys
+import threading
+import time
+
+# Açılış süresini ölçmek için başlangıç zamanı (ağır importlardan önce)
+STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 try:
     import customtkinter as ctk
@@ -6,14 +13,35 @@ except ImportError:
 
 from gui_app import App
 
+def run_startup_bench(app, root):
+    # Motor hazır olunca örnek bir sorgu çalıştırıp açılış sürelerini raporla ve çık
+    def run():
+        try:
+            engine = app._get_engine()
+            engine.predict_city_risk("İstanbul", manual_coords=(41.01, 28.98))
+            app._record_startup("ilk_risk_cevabi")
+        except Exception as e:
+            print(f"Açılış ölçümü başarısız: {e}")
+        finally:
+            print("Açılış süreleri (sn):")
+            for label, elapsed in app.startup_times.items():
+                print(f"  {label}: {elapsed:.3f}")
+            root.after(0, root.destroy)
+
+    threading.Thread(target=run, daemon=True).start()
+
 def main():
     if ctk:
         # CustomTkinter ana penceresi
         root = ctk.CTk()
     else:
         root = tk.Tk()
-        
-    app = App(root)
+
+    on_ready = None
+    if "--startup-bench" in sys.argv:
+        on_ready = lambda: run_startup_bench(app, root)
+
+    app = App(root, startup_t0=STARTUP_T0, on_ready=on_ready)
     root.mainloop()
 
 if __name__ == "__main__":
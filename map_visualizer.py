@@ -4,13 +4,103 @@ import json
 import webbrowser
 import os
 import json
+import argparse
+import time
+import numpy as np
 import folium
-from folium.plugins import MarkerCluster, HeatMap
+import pandas as pd
+from folium.plugins import MarkerCluster, HeatMap, HeatMapWithTime
 
-def generate_map(city_name, lat, lon, fault_points, fault_lines=None, geojson_paths=None, all_quakes_df=None, output_file="risk_map.html"):
+from features import KM_PER_DEG, gaussian_smooth
+from tracing import span, traced
+
+HEAT_GRADIENT = {0.4: 'blue', 0.65: 'lime', 1: 'red'}
+_GRADIENT_RGB = {'blue': (0, 0, 255), 'lime': (0, 255, 0), 'red': (255, 0, 0)}
+# auto modunda bu sayıdan fazla nokta varsa yoğunluk sunucuda hesaplanır
+RASTER_MIN_POINTS = 10_000
+# Zaman animasyonu: kare sayısı bu sınırı aşmayacak en kısa dönem seçilir
+ANIMATION_MAX_FRAMES = 600
+_PERIODS = (("D", 1.0, "%Y-%m-%d"), ("W", 7.0, "%Y-%m-%d"), ("M", 30.44, "%Y-%m"),
+            ("Q", 91.31, "%Y-Q%q"), ("Y", 365.25, "%Y"))
+
+
+def _mercator_y(lat):
+    return np.log(np.tan(np.pi / 4 + np.radians(lat) / 2))
+
+
+def _inverse_mercator_y(y):
+    return np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2)
+
+
+def density_grid(lats, lons, weights, cell_km=2.0, bandwidth_km=15.0):
+    """
+    Büyüklük ağırlıklı çekirdek yoğunluğu. Satırlar Web Mercator y ekseninde eşit aralıklı
+    olduğundan görüntü Leaflet üzerine yeniden örneklemeden oturur.
+    (yoğunluk[satır (güneyden kuzeye), sütun], [[güney, batı], [kuzey, doğu]]) döner.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    pad_deg = 3 * bandwidth_km / KM_PER_DEG
+    south, north = lats.min() - pad_deg, lats.max() + pad_deg
+    west, east = lons.min() - pad_deg, lons.max() + pad_deg
+    mid_lat = np.radians((south + north) / 2)
+    # Mercator'da x ve y aynı ölçekte: kare piksel, kenarı orta enlemde cell_km
+    cell = np.radians(cell_km / (KM_PER_DEG * np.cos(mid_lat)))
+    y0, y1 = _mercator_y(south), _mercator_y(north)
+    n_rows = max(1, int(np.ceil((y1 - y0) / cell)))
+    n_cols = max(1, int(np.ceil(np.radians(east - west) / cell)))
+    grid, _, _ = np.histogram2d(
+        _mercator_y(lats), np.radians(lons), bins=(n_rows, n_cols),
+        range=((y0, y0 + n_rows * cell), (np.radians(west), np.radians(west) + n_cols * cell)),
+        weights=np.asarray(weights, dtype=float),
+    )
+    sigma = bandwidth_km / cell_km
+    grid = gaussian_smooth(grid, sigma, sigma)
+    north = float(_inverse_mercator_y(y0 + n_rows * cell))
+    east = west + float(np.degrees(n_cols * cell))
+    return grid, [[float(south), float(west)], [north, east]]
+
+
+def colorize(grid, gradient=HEAT_GRADIENT, min_opacity=0.4, cutoff=0.05, saturation=0.99, gamma=0.5):
+    """
+    Yoğunluğu HeatMap renk geçişiyle RGBA (uint8) görüntüye çevirir; çok düşük değerler saydam.
+    gamma < 1 birkaç sıcak noktanın tüm ölçeği ezmesini önler (tarayıcı HeatMap'i de doygunlaşır).
+    """
+    positive = grid[grid > 0]
+    top = np.quantile(positive, saturation) if len(positive) else 1.0
+    v = np.clip(grid / (top or 1.0), 0.0, 1.0) ** gamma
+    stops = sorted(gradient)
+    colors = np.array([_GRADIENT_RGB.get(gradient[k], (255, 0, 0)) for k in stops], dtype=float)
+    rgba = np.empty(grid.shape + (4,), dtype=np.uint8)
+    for c in range(3):
+        rgba[..., c] = np.interp(v, stops, colors[:, c]).astype(np.uint8)
+    alpha = np.where(v < cutoff, 0.0, np.maximum(v, min_opacity))
+    rgba[..., 3] = (alpha * 255).astype(np.uint8)
+    return rgba
+
+
+def add_density_overlay(m, df, name="Deprem Yoğunluğu (Isı Haritası)", cell_km=2.0, bandwidth_km=15.0):
+    """Yoğunluğu sunucuda hesaplayıp tek bir PNG ImageOverlay olarak haritaya gömer."""
+    df = df.dropna(subset=['latitude', 'longitude', 'mag'])
+    grid, bounds = density_grid(df['latitude'].to_numpy(), df['longitude'].to_numpy(),
+                                df['mag'].to_numpy(), cell_km=cell_km, bandwidth_km=bandwidth_km)
+    folium.raster_layers.ImageOverlay(
+        colorize(grid),
+        bounds=bounds,
+        origin="lower",
+        pixelated=False,
+        name=name,
+    ).add_to(m)
+    return grid.shape
+
+@traced("map.generate_map")
+def generate_map(city_name, lat, lon, fault_points, fault_lines=None, geojson_paths=None, all_quakes_df=None,
+                 output_file="risk_map.html", heatmap_mode="auto", show_markers=True, open_browser=True):
     """
     Generates a focused map showing the city, its risk radius, and local earthquakes.
     Includes Heatmap, Fault Lines, and GeoJSON layers with improved aesthetics.
+    heatmap_mode: "points" (ham noktalar, yoğunluk tarayıcıda), "raster" (yoğunluk sunucuda,
+    PNG katman) veya "auto" (RASTER_MIN_POINTS üzerinde raster).
     """
     # 1. Temel Harita ve Katmanlar
     m = folium.Map(location=[lat, lon], zoom_start=8, tiles=None)
@@ -66,16 +156,23 @@ def generate_map(city_name, lat, lon, fault_points, fault_lines=None, geojson_pa
 
     if all_quakes_df is not None and not all_quakes_df.empty:
         # 5. Isı Haritası (Heatmap) Katmanı
-        heat_data = all_quakes_df[['latitude', 'longitude', 'mag']].values.tolist()
-        HeatMap(
-            heat_data,
-            name="Deprem Yoğunluğu (Isı Haritası)",
-            radius=15,
-            max_zoom=10,
-            min_opacity=0.4,
-            gradient={0.4: 'blue', 0.65: 'lime', 1: 'red'}
-        ).add_to(m)
+        if heatmap_mode == "auto":
+            heatmap_mode = "raster" if len(all_quakes_df) > RASTER_MIN_POINTS else "points"
+        with span("map.heatmap", points=len(all_quakes_df), mode=heatmap_mode):
+            if heatmap_mode == "raster":
+                add_density_overlay(m, all_quakes_df)
+            else:
+                heat_data = all_quakes_df[['latitude', 'longitude', 'mag']].values.tolist()
+                HeatMap(
+                    heat_data,
+                    name="Deprem Yoğunluğu (Isı Haritası)",
+                    radius=15,
+                    max_zoom=10,
+                    min_opacity=0.4,
+                    gradient=HEAT_GRADIENT
+                ).add_to(m)
 
+    if show_markers and all_quakes_df is not None and not all_quakes_df.empty:
         # 6. Geçmiş Depremler (Marker Cluster ile Gruplanmış)
         # MarkerCluster kullanarak kalabalığı önlüyoruz
         quake_cluster = MarkerCluster(name="Bölgesel Depremler (Kümelenmiş)").add_to(m)
@@ -83,39 +180,40 @@ def generate_map(city_name, lat, lon, fault_points, fault_lines=None, geojson_pa
         # Sadece 3.0 ve üzeri depremleri gösterelim (daha temiz görüntü için)
         significant_quakes = all_quakes_df[all_quakes_df['mag'] >= 3.0]
         
-        for _, row in significant_quakes.iterrows():
-            mag = row['mag']
+        with span("map.markers", points=len(significant_quakes)):
+            for _, row in significant_quakes.iterrows():
+                mag = row['mag']
             
-            # Renk belirle
-            color = "green"
-            if mag >= 4.0: color = "orange"
-            if mag >= 5.0: color = "red"
-            if mag >= 6.0: color = "darkred"
+                # Renk belirle
+                color = "green"
+                if mag >= 4.0: color = "orange"
+                if mag >= 5.0: color = "red"
+                if mag >= 6.0: color = "darkred"
             
-            # Etki alanı yarıçapı
-            impact_radius_km = int(10**(0.5 * mag - 1))
-            impact_radius_m = impact_radius_km * 1000
+                # Etki alanı yarıçapı
+                impact_radius_km = int(10**(0.5 * mag - 1))
+                impact_radius_m = impact_radius_km * 1000
             
-            # Popup içeriği
-            popup_html = f"""
-            <div style="font-family: Arial; font-size: 12px;">
-                <b>Tarih:</b> {row['time']}<br>
-                <b>Büyüklük:</b> <span style="color: {color}; font-weight: bold;">{mag}</span><br>
-                <b>Derinlik:</b> {row['depth']} km<br>
-                <b>Tahmini Etki Yarıçapı:</b> ~{impact_radius_km} km
-                <span id="impact_radius_m" hidden>{int(impact_radius_m)}</span>
-            </div>
-            """
-
-            folium.CircleMarker(
-                location=[row['latitude'], row['longitude']],
-                radius=5,
-                color=color,
-                fill=True,
-                fill_color=color,
-                fill_opacity=0.7,
-                popup=folium.Popup(popup_html, max_width=250)
-            ).add_to(quake_cluster)
+                # Popup içeriği
+                popup_html = f"""
+                <div style="font-family: Arial; font-size: 12px;">
+                    <b>Tarih:</b> {row['time']}<br>
+                    <b>Büyüklük:</b> <span style="color: {color}; font-weight: bold;">{mag}</span><br>
+                    <b>Derinlik:</b> {row['depth']} km<br>
+                    <b>Tahmini Etki Yarıçapı:</b> ~{impact_radius_km} km
+                    <span id="impact_radius_m" hidden>{int(impact_radius_m)}</span>
+                </div>
+                """
+
+                folium.CircleMarker(
+                    location=[row['latitude'], row['longitude']],
+                    radius=5,
+                    color=color,
+                    fill=True,
+                    fill_color=color,
+                    fill_opacity=0.7,
+                    popup=folium.Popup(popup_html, max_width=250)
+                ).add_to(quake_cluster)
 
     # Katman Kontrolü
     folium.LayerControl(collapsed=False).add_to(m)
@@ -166,8 +264,158 @@ def generate_map(city_name, lat, lon, fault_points, fault_lines=None, geojson_pa
     m.get_root().html.add_child(folium.Element(js_script))
 
     # Haritayı kaydet
-    m.save(output_file)
+    with span("map.save"):
+        m.save(output_file)
     
     # Tarayıcıda aç
-    webbrowser.open("file://" + os.path.realpath(output_file))
+    if open_browser:
+        webbrowser.open("file://" + os.path.realpath(output_file))
+    return os.path.realpath(output_file)
+
+
+def aggregate_time_bins(df, freq=None, cell_deg=0.1, max_frames=ANIMATION_MAX_FRAMES):
+    """
+    Olayları (dönem x ızgara hücresi) kutularında toplar. freq: "D", "W", "M", "Q", "Y"
+    veya None (kare sayısı max_frames'i aşmayan en kısa dönem).
+    (kareler, etiketler, kutu tablosu) döner; her kare [hücre_enlem, hücre_boylam, ağırlık]
+    listesidir, olaysız dönemler boş karedir. Ağırlık log(1 + olay sayısı) ile ölçeklenir.
+    Olay yoksa kareler ve etiketler boş listedir.
+    """
+    df = df.dropna(subset=['time', 'latitude', 'longitude'])
+    if df.empty:
+        empty = pd.DataFrame({c: pd.Series(dtype=np.int64) for c in ('frame', 'ci', 'cj', 'count')})
+        empty['max_mag'] = pd.Series(dtype=float)
+        empty['weight'] = pd.Series(dtype=float)
+        return [], [], empty
+    times = df['time']
+    if getattr(times.dt, 'tz', None) is not None:
+        times = times.dt.tz_convert(None)
+    if freq is None:
+        days = (times.max() - times.min()).days + 1
+        freq = next((f for f, length, _ in _PERIODS if days / length <= max_frames), "Y")
+    label_fmt = dict((f, fmt) for f, _, fmt in _PERIODS)[freq]
+
+    periods = pd.PeriodIndex(times, freq=freq)
+    first = periods.min()
+    bins = pd.DataFrame({
+        'frame': periods.asi8 - first.ordinal,
+        'ci': np.floor(df['latitude'].to_numpy(dtype=float) / cell_deg).astype(np.int64),
+        'cj': np.floor(df['longitude'].to_numpy(dtype=float) / cell_deg).astype(np.int64),
+        'mag': df['mag'].to_numpy(dtype=float),
+    })
+    agg = (bins.groupby(['frame', 'ci', 'cj'], sort=True)
+           .agg(count=('mag', 'size'), max_mag=('mag', 'max'))
+           .reset_index())
+    agg['weight'] = np.log1p(agg['count']) / np.log1p(agg['count'].max())
+
+    labels = pd.period_range(first, periods.max(), freq=freq).strftime(label_fmt).tolist()
+    rows = np.round(np.column_stack([
+        (agg['ci'].to_numpy() + 0.5) * cell_deg,
+        (agg['cj'].to_numpy() + 0.5) * cell_deg,
+        agg['weight'].to_numpy(),
+    ]), 3).tolist()
+    bounds = np.searchsorted(agg['frame'].to_numpy(), np.arange(len(labels) + 1))
+    frames = [rows[bounds[k]:bounds[k + 1]] for k in range(len(labels))]
+    return frames, labels, agg
+
+
+def generate_time_map(df, output_file="risk_time_map.html", freq=None, cell_deg=0.1, center=None,
+                      zoom_start=6, open_browser=True):
+    """
+    Zaman kaydırıcılı ısı haritası. Sayfaya olaylar değil, yalnızca (dönem x hücre)
+    toplamları gömülür; sayfa boyutu olay sayısıyla değil dolu kutu sayısıyla büyür.
+    Gösterilecek olay yoksa sayfa yazılmaz ve None döner.
+    """
+    with span("map.time_bins", points=len(df)):
+        frames, labels, agg = aggregate_time_bins(df, freq=freq, cell_deg=cell_deg)
+    if not labels:
+        print("Zaman haritası: gösterilecek olay yok.")
+        return None
+    if center is None:
+        center = (float(df['latitude'].mean()), float(df['longitude'].mean()))
+    m = folium.Map(location=list(center), zoom_start=zoom_start, tiles=None)
+    folium.TileLayer('CartoDB dark_matter', name='Koyu Mod (Varsayılan)').add_to(m)
+    folium.TileLayer('OpenStreetMap', name='Aydınlık Mod').add_to(m)
+    HeatMapWithTime(
+        frames,
+        index=labels,
+        name="Deprem Etkinliği (Zaman)",
+        radius=12,
+        min_opacity=0.3,
+        max_opacity=0.8,
+        gradient=HEAT_GRADIENT,
+        auto_play=False,
+        max_speed=20,
+    ).add_to(m)
+    folium.LayerControl(collapsed=False).add_to(m)
+    with span("map.save"):
+        m.save(output_file)
+    if open_browser:
+        webbrowser.open("file://" + os.path.realpath(output_file))
     return os.path.realpath(output_file)
+
+
+def compare_heatmap_modes(df, output_dir=".", show_markers=False):
+    """Aynı katalog için points ve raster modlarının üretim süresi ve sayfa boyutu."""
+    results = []
+    center = (float(df['latitude'].mean()), float(df['longitude'].mean()))
+    for mode in ("points", "raster"):
+        path = os.path.join(output_dir, f"heatmap_{mode}.html")
+        t0 = time.perf_counter()
+        generate_map("Türkiye", center[0], center[1], None, all_quakes_df=df, output_file=path,
+                     heatmap_mode=mode, show_markers=show_markers, open_browser=False)
+        results.append({
+            "mode": mode,
+            "seconds": time.perf_counter() - t0,
+            "page_kb": os.path.getsize(path) / 1024,
+            "path": path,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Isı haritası modları: üretim süresi ve sayfa boyutu")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--markers", action="store_true", help="Deprem işaretçilerini de ekle")
+    parser.add_argument("--animate", action="store_true", help="Zaman kaydırıcılı harita üret ve ölç")
+    parser.add_argument("--freq", choices=[f for f, _, _ in _PERIODS], default=None)
+    parser.add_argument("--cell-deg", type=float, default=0.1)
+    parser.add_argument("--start", default=None, help="ör. 2023-01-01")
+    parser.add_argument("--end", default=None)
+    parser.add_argument("--lat", type=float, default=None, help="Yalnızca bu noktanın çevresi")
+    parser.add_argument("--lon", type=float, default=None)
+    parser.add_argument("--radius-km", type=float, default=150.0)
+    args = parser.parse_args()
+
+    from catalog_io import load_catalog
+
+    df = load_catalog(args.csv)
+    if args.start:
+        df = df[df['time'] >= pd.Timestamp(args.start, tz="UTC")]
+    if args.end:
+        df = df[df['time'] < pd.Timestamp(args.end, tz="UTC")]
+    if args.lat is not None and args.lon is not None:
+        from features import _haversine
+        df = df[_haversine(args.lat, args.lon, df['latitude'].to_numpy(float),
+                           df['longitude'].to_numpy(float)) <= args.radius_km]
+    print(f"{len(df)} olay")
+    if df.empty:
+        print("Filtrelerle eşleşen olay yok; harita üretilmedi.")
+        return
+
+    if args.animate:
+        path = os.path.join(args.output_dir, "risk_time_map.html")
+        t0 = time.perf_counter()
+        generate_time_map(df, output_file=path, freq=args.freq, cell_deg=args.cell_deg, open_browser=False)
+        seconds = time.perf_counter() - t0
+        frames, labels, agg = aggregate_time_bins(df, freq=args.freq, cell_deg=args.cell_deg)
+        print(f"  {len(labels)} kare ({labels[0]} .. {labels[-1]}), {len(agg)} dolu kutu, "
+              f"{seconds:.2f} sn, sayfa {os.path.getsize(path) / 1024:.0f} KB ({path})")
+        return
+    for r in compare_heatmap_modes(df, args.output_dir, show_markers=args.markers):
+        print(f"  {r['mode']:<7} {r['seconds']:.2f} sn, sayfa {r['page_kb']:.0f} KB ({r['path']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import argparse
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+from sklearn.model_selection import TimeSeriesSplit
+
+from features import to_epoch_seconds
+
+try:
+    from catboost import CatBoostClassifier
+except ImportError:
+    CatBoostClassifier = None
+
+# Kısa vadeli model için varsayılan CatBoost ayarları.
+# iterations üst sınırdır; gerçek ağaç sayısı katlardaki erken durdurma ile seçilir.
+# border_count=64: --tune taramasında 254 ile aynı kalite, ~2.5 kat hızlı eğitim.
+DEFAULT_PARAMS = {
+    "iterations": 800,
+    "depth": 8,
+    "learning_rate": 0.03,
+    "loss_function": "Logloss",
+    "random_seed": 42,
+    "border_count": 64,
+    "verbose": False,
+}
+EARLY_STOPPING_ROUNDS = 50
+# label_30d'nin ileri baktığı süre (build_label_30d horizon_days): katlar arasında arındırma payı
+LABEL_HORIZON_DAYS = 30
+# Tutulan dilimin erken durdurmaya ayrılan ilk kısmı; metrikler yalnızca kalan (sonraki) kısımdan
+STOP_FRACTION = 0.5
+# Önyükleme topluluğu: üye sayısı ve zaman bloğu sayısı (blok ~ n / BOOTSTRAP_BLOCKS satır)
+ENSEMBLE_MEMBERS = 8
+BOOTSTRAP_BLOCKS = 20
+
+
+def _purge(rows, secs, before, horizon_s):
+    # Etiket ufku before satırının zamanına uzanan satırlar atılır: etiketleri sonraki dilimden gelir
+    return rows[secs[rows] + horizon_s < secs[before]]
+
+
+def walk_forward_folds(times, n_splits=5, horizon_days=LABEL_HORIZON_DAYS, stop_fraction=STOP_FRACTION):
+    """
+    Zamana göre sıralı veride ileri yürüyen (train, stop, test) indeks üçlüleri.
+    Tutulan dilimin ilk stop_fraction kısmı (stop) erken durdurmaya, sonrası (test) yalnızca
+    ölçüme ayrılır. Etiket ufku (horizon_days) sonraki dilime uzanan train ve stop satırları
+    atılır; aksi halde etiketleri ölçülen dilimdeki olaylardan sızar.
+    """
+    secs = to_epoch_seconds(times)
+    horizon_s = horizon_days * 86400
+    folds = []
+    for train, held in TimeSeriesSplit(n_splits=n_splits).split(secs):
+        k = min(len(held) - 1, max(1, int(len(held) * stop_fraction)))
+        stop, test = held[:k], held[k:]
+        folds.append((_purge(train, secs, stop[0], horizon_s), _purge(stop, secs, test[0], horizon_s), test))
+    return folds
+
+
+def fold_metrics(y_true, proba):
+    """AUC / Brier / log-loss. Test katında tek sınıf varsa AUC NaN döner."""
+    y_true = np.asarray(y_true)
+    proba = np.clip(np.asarray(proba, dtype=float), 1e-7, 1 - 1e-7)
+    auc = roc_auc_score(y_true, proba) if len(np.unique(y_true)) > 1 else float("nan")
+    return {
+        "auc": float(auc),
+        "brier": float(brier_score_loss(y_true, proba)),
+        "log_loss": float(log_loss(y_true, proba, labels=[0, 1])),
+        "positive_rate": float(y_true.mean()),
+    }
+
+
+def _fit_fold(task):
+    # İşçi süreçte çalışır: tek katı eğitir, durdurma diliminde erken durdurur, sonraki dilimde ölçer
+    fold, x_train, y_train, x_stop, y_stop, x_test, y_test, params, early_stopping_rounds = task
+    t0 = time.perf_counter()
+    model = CatBoostClassifier(**params)
+    if len(np.unique(y_train)) < 2:
+        return {"fold": fold, "skipped": "eğitim katında tek sınıf var"}
+    if len(y_stop) == 0:
+        return {"fold": fold, "skipped": "arındırma sonrası durdurma dilimi boş"}
+    model.fit(
+        x_train, y_train,
+        eval_set=(x_stop, y_stop),
+        early_stopping_rounds=early_stopping_rounds,
+        use_best_model=True,
+    )
+    proba = model.predict_proba(x_test)[:, 1]
+    best_iteration = model.get_best_iteration()
+    if best_iteration is None:
+        best_iteration = model.tree_count_ - 1
+    result = {
+        "fold": fold,
+        "train_rows": int(len(y_train)),
+        "stop_rows": int(len(y_stop)),
+        "test_rows": int(len(y_test)),
+        "best_iteration": int(best_iteration),
+        "fit_seconds": time.perf_counter() - t0,
+    }
+    result.update(fold_metrics(y_test, proba))
+    return result
+
+
+def _pool_context():
+    # GUI thread'lerinden güvenli: forkserver/spawn, çok iş parçacıklı süreci fork etmez
+    methods = mp.get_all_start_methods()
+    return mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _fold_task(k, fold, x, y, params, early_stopping_rounds):
+    tr, st, te = fold
+    return (k, x[tr], y[tr], x[st], y[st], x[te], y[te], params, early_stopping_rounds)
+
+
+def evaluate_folds(x, y, times, params=None, n_splits=5, workers=None, early_stopping_rounds=EARLY_STOPPING_ROUNDS):
+    """
+    Her ileri yürüyen katı paralel süreçlerde eğitip değerlendirir (times: satırların
+    olay zamanları, arındırma için). Kat sonuçlarının listesini döner.
+    """
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+    folds = walk_forward_folds(times, n_splits=n_splits)
+
+    cpus = os.cpu_count() or 1
+    workers = workers or min(n_splits, cpus)
+    # Çekirdekleri katlar arasında paylaştır (aşırı abonelik olmasın)
+    params.setdefault("thread_count", max(1, cpus // workers))
+
+    tasks = [_fold_task(k, fold, x, y, params, early_stopping_rounds) for k, fold in enumerate(folds)]
+    if workers <= 1:
+        return [_fit_fold(t) for t in tasks]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        return list(pool.map(_fit_fold, tasks))
+
+
+def train_with_validation(
+    x, y, times, params=None, n_splits=5, workers=None,
+    early_stopping_rounds=EARLY_STOPPING_ROUNDS, feature_names=None,
+):
+    """
+    Katları paralel değerlendirir, erken durdurmanın seçtiği iterasyonların
+    medyanıyla son modeli tüm veride eğitir. (model, rapor) döner. Rapordaki metrikler
+    erken durdurmanın görmediği test dilimlerinden gelir.
+    """
+    if CatBoostClassifier is None:
+        raise RuntimeError("catboost paketi yüklü olmalı.")
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    t0 = time.perf_counter()
+    folds = evaluate_folds(x, y, times, params, n_splits=n_splits, workers=workers,
+                           early_stopping_rounds=early_stopping_rounds)
+    cv_seconds = time.perf_counter() - t0
+
+    best = [f["best_iteration"] + 1 for f in folds if "best_iteration" in f]
+    iterations = int(np.median(best)) if best else params["iterations"]
+    iterations = max(10, min(iterations, params["iterations"]))
+
+    final_params = dict(params, iterations=iterations)
+    final_params.setdefault("thread_count", -1)
+    model = CatBoostClassifier(**final_params)
+    t1 = time.perf_counter()
+    model.fit(x, y)
+    final_seconds = time.perf_counter() - t1
+
+    scored = [f for f in folds if "auc" in f]
+    report = {
+        "folds": folds,
+        "iterations": iterations,
+        "mean_auc": float(np.nanmean([f["auc"] for f in scored])) if scored else float("nan"),
+        "mean_brier": float(np.mean([f["brier"] for f in scored])) if scored else float("nan"),
+        "mean_log_loss": float(np.mean([f["log_loss"] for f in scored])) if scored else float("nan"),
+        "cv_seconds": cv_seconds,
+        "final_fit_seconds": final_seconds,
+        "params": {k: v for k, v in final_params.items() if k != "verbose"},
+        "feature_names": list(feature_names) if feature_names is not None else None,
+    }
+    return model, report
+
+
+def block_bootstrap_indices(n_rows, rng, n_blocks=BOOTSTRAP_BLOCKS):
+    """
+    Dairesel blok önyüklemesi: zamana göre sıralı satırlardan n_blocks adet bitişik blok
+    (her biri ~n_rows / n_blocks satır) yerine koyarak çekilir. Blok içindeki zamansal
+    bağımlılık (aynı artçı dizisindeki etiketler) korunur; bloklar sondan başa sarar, böylece
+    sorguların dayandığı en yeni satırlar da diğerleriyle aynı olasılıkla seçilir.
+    Sıralı indeks dizisi döner.
+    """
+    length = max(1, -(-n_rows // n_blocks))
+    starts = rng.integers(0, n_rows, size=n_blocks)
+    idx = (starts[:, None] + np.arange(length)[None, :]).ravel() % n_rows
+    return np.sort(idx[:n_rows])
+
+
+def _fit_member(task):
+    # İşçi süreçte çalışır: tek önyükleme örneğinde sabit iterasyonlu model eğitir
+    member, x, y, params, n_blocks, seed = task
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    for _ in range(20):
+        idx = block_bootstrap_indices(len(y), rng, n_blocks)
+        if len(np.unique(y[idx])) > 1:
+            break
+    else:
+        return {"member": member, "skipped": "önyükleme örneğinde tek sınıf var"}
+    model = CatBoostClassifier(**dict(params, random_seed=params.get("random_seed", 0) + member))
+    model.fit(x[idx], y[idx])
+    return {
+        "member": member,
+        "model": model,
+        "rows": int(len(idx)),
+        "unique_rows": int(len(np.unique(idx))),
+        "positive_rate": float(y[idx].mean()),
+        "fit_seconds": time.perf_counter() - t0,
+    }
+
+
+def train_bootstrap_ensemble(x, y, n_members=ENSEMBLE_MEMBERS, params=None, workers=None,
+                             n_blocks=BOOTSTRAP_BLOCKS, seed=0):
+    """
+    Zaman blokları önyüklemesiyle n_members modeli paralel süreçlerde eğitir (belirsizlik
+    bandı için). params["iterations"] olduğu gibi kullanılır; erken durdurma yapılmaz.
+    (modeller, rapor) döner; tek sınıflı örnek üreten üye atlanır.
+    """
+    if CatBoostClassifier is None:
+        raise RuntimeError("catboost paketi yüklü olmalı.")
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+
+    cpus = os.cpu_count() or 1
+    workers = workers or min(n_members, cpus)
+    params.setdefault("thread_count", max(1, cpus // workers))
+    seeds = np.random.SeedSequence(seed).spawn(n_members)
+    tasks = [(k, x, y, params, n_blocks, seeds[k]) for k in range(n_members)]
+
+    t0 = time.perf_counter()
+    if workers <= 1:
+        results = [_fit_member(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+            results = list(pool.map(_fit_member, tasks))
+    models = [r.pop("model") for r in results if "model" in r]
+    report = {
+        "members": results,
+        "trained": len(models),
+        "iterations": params["iterations"],
+        "n_blocks": n_blocks,
+        "workers": workers,
+        "seconds": time.perf_counter() - t0,
+    }
+    return models, report
+
+
+def tune_training(x, y, times, thread_counts=(1, 2, 4), border_counts=(32, 64, 128, 254), params=None):
+    """
+    Son (en büyük) kat üzerinde thread_count ve border_count kombinasyonlarını dener;
+    eğitim süresi ve kat metriklerini listeler.
+    """
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.int64)
+    fold = walk_forward_folds(times)[-1]
+    rows = []
+    for border_count in border_counts:
+        for thread_count in thread_counts:
+            p = dict(params, border_count=border_count, thread_count=thread_count)
+            res = _fit_fold(_fold_task(0, fold, x, y, p, EARLY_STOPPING_ROUNDS))
+            if "skipped" in res:
+                # Atlama nedeni yalnızca kata bağlı: diğer ayarlar da aynı katta atlanır
+                print(f"Son kat atlandı: {res['skipped']}")
+                return rows
+            res.update({"border_count": border_count, "thread_count": thread_count})
+            rows.append(res)
+            print(
+                f"border={border_count:<4} threads={thread_count:<2} "
+                f"{res['fit_seconds']:.2f} sn, iter={res['best_iteration'] + 1}, "
+                f"AUC={res['auc']:.3f}, Brier={res['brier']:.4f}, logloss={res['log_loss']:.4f}"
+            )
+    return rows
+
+
+def print_report(report):
+    print("Kat  Eğitim  Durdur Test   Iter   AUC     Brier   LogLoss  Süre")
+    for f in report["folds"]:
+        if "auc" not in f:
+            print(f"{f['fold']:<4} atlandı: {f.get('skipped')}")
+            continue
+        print(
+            f"{f['fold']:<4} {f['train_rows']:<7} {f['stop_rows']:<6} {f['test_rows']:<6} {f['best_iteration'] + 1:<6} "
+            f"{f['auc']:.3f}   {f['brier']:.4f}  {f['log_loss']:.4f}   {f['fit_seconds']:.2f} sn"
+        )
+    print(
+        f"Ortalama AUC={report['mean_auc']:.3f} Brier={report['mean_brier']:.4f} "
+        f"LogLoss={report['mean_log_loss']:.4f}; seçilen iterasyon={report['iterations']}; "
+        f"CV {report['cv_seconds']:.2f} sn + son eğitim {report['final_fit_seconds']:.2f} sn"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kısa vadeli modelin ileri yürüyen doğrulaması")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--splits", type=int, default=5)
+    parser.add_argument("--tune", action="store_true", help="thread_count / border_count taraması yap")
+    args = parser.parse_args()
+
+    from risk_engine import EarthquakeRiskEngine, RISK_FEATURE_COLUMNS
+
+    engine = EarthquakeRiskEngine(csv_path=args.csv, cache_dir=None)
+    engine._prepare_frames()
+    # Tek görüntü: arada yeni katalog yayınlansa da x, y ve zamanlar aynı satırlardan
+    df_main = engine.full_frames()[1]
+    x = df_main[RISK_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df_main["label_30d"].astype(int).to_numpy()
+    times = df_main["time"]
+
+    if args.tune:
+        tune_training(x, y, times)
+        return
+    _, report = train_with_validation(x, y, times, n_splits=args.splits, workers=args.workers,
+                                      feature_names=RISK_FEATURE_COLUMNS)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,22 @@
+import collections
+import json
 import math
 import os
+import shutil
+import tempfile
+import threading
+import weakref
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import TimeSeriesSplit
+from tracing import span, traced
+from model_training import BOOTSTRAP_BLOCKS, train_bootstrap_ensemble, train_with_validation
+from features import EventIndex, FEATURE_WINDOWS_DAYS, add_window_features, compute_window_features
+from catalog_io import load_catalog, load_catalog_since
+from declustering import AFTERSHOCK, MAIN, aftershock_flags, candidate_pairs, event_times_ns, resolve_statuses
+from catalog_tiers import ColdTier, concat_frames
+from compact_scorer import TRANSFER_POINTS, CompactEnsemble, CompactScorer, summarize_members
+from hazard_simulation import HazardModel, simulate_hazard
+from engine_snapshot import frame_from_arrays, frame_to_arrays, open_snapshot, write_snapshot
 
 try:
     from catboost import CatBoostClassifier
@@ -40,6 +54,7 @@ FAULT_LINES = [
 
 # Risk hesaplaması için tüm noktaları tek bir listede topla
 FAULT_POINTS = [point for line in FAULT_LINES for point in line]
+_FAULT_ARRAY = np.array(FAULT_POINTS, dtype=float)
 
 RISK_FEATURE_COLUMNS = [
     "latitude",
@@ -49,6 +64,10 @@ RISK_FEATURE_COLUMNS = [
     "rolling_std_7d",
     "rolling_max_7d",
     "event_count_7d",
+    "rolling_mean_30d",
+    "rolling_std_30d",
+    "rolling_max_30d",
+    "event_count_30d",
     "year",
     "month",
     "day",
@@ -61,6 +80,16 @@ RISK_FEATURE_COLUMNS = [
     "cos_hour",
     "distance_to_fault",
 ]
+_FEATURE_INDEX = {name: i for i, name in enumerate(RISK_FEATURE_COLUMNS)}
+# Kısa vadeli skorlayıcılar (EarthquakeRiskEngine.scorer)
+SCORERS = ("full", "compact")
+# Önyükleme topluluğu bandı: alt, orta, üst nicelik
+ENSEMBLE_QUANTILES = (0.05, 0.5, 0.95)
+
+# Katmanlı saklama: pencere özellikleri ve etiketlerin baktığı 30 gün (+1) her zaman sıcak
+# katmanda kalır; soğuk katmana taşıma sıcak katman bu kadar gün aşınca toplu yapılır
+HOT_MIN_DAYS = 31
+EVICT_SLACK_DAYS = 30
 
 # --- HELPER FUNCTIONS ---
 
@@ -73,6 +102,7 @@ def haversine(lat1, lon1, lat2, lon2):
     return 2 * r * np.arcsin(np.sqrt(a))
 
 
+@traced("risk.decluster")
 def simple_declustering(
     df,
     time_col="time",
@@ -81,39 +111,28 @@ def simple_declustering(
     mag_col="mag",
     time_window_days=1.0,
     space_window_km=50.0,
+    workers=1,
 ):
-    df = df.sort_values(time_col).reset_index(drop=True)
-    is_aftershock = np.zeros(len(df), dtype=bool)
-
-    times = df[time_col].values
-    lats = df[lat_col].values
-    lons = df[lon_col].values
-    mags = df[mag_col].values
-
-    for i in range(len(df)):
-        if is_aftershock[i]:
-            continue
-        t_main = times[i]
-        lat_main = lats[i]
-        lon_main = lons[i]
-        mag_main = mags[i]
-
-        j = i + 1
-        while j < len(df):
-            dt_days = (
-                (times[j] - t_main).astype("timedelta64[s]").astype(float) / 86400.0
-            )
-            if dt_days > time_window_days:
-                break
-            dist = haversine(lat_main, lon_main, lats[j], lons[j])
-            if dist <= space_window_km and mags[j] <= mag_main:
-                is_aftershock[j] = True
-            j += 1
-
-    df["is_aftershock"] = is_aftershock
+    if not df[time_col].is_monotonic_increasing:
+        df = df.sort_values(time_col)
+    df = df.reset_index(drop=True)
+
+    # Her olay, zaman sırasında kendisinden önce gelen, pencere içindeki bir ana şoktan
+    # büyük değilse artçıdır. Öncül çiftleri ızgara indeksiyle bulunur; workers > 1 ise
+    # hale paylı karolar süreç havuzunda işlenir (sonuç seri ile aynıdır).
+    df["is_aftershock"] = aftershock_flags(
+        df[time_col],
+        df[lat_col].to_numpy(dtype=float),
+        df[lon_col].to_numpy(dtype=float),
+        df[mag_col].to_numpy(dtype=float),
+        time_window_days=time_window_days,
+        space_window_km=space_window_km,
+        workers=workers,
+    )
     return df
 
 
+@traced("risk.label_30d")
 def build_label_30d(
     df,
     time_col="time",
@@ -124,13 +143,15 @@ def build_label_30d(
     horizon_days=30,
     radius_km=100.0,
 ):
-    df = df.sort_values(time_col).reset_index(drop=True)
+    if not df[time_col].is_monotonic_increasing:
+        df = df.sort_values(time_col)
+    df = df.reset_index(drop=True)
     n = len(df)
     label = np.zeros(n, dtype=int)
 
     times = df[time_col].values
-    lats = df[lat_col].values
-    lons = df[lon_col].values
+    lats = df[lat_col].to_numpy(dtype=float)
+    lons = df[lon_col].to_numpy(dtype=float)
     mags = df[mag_col].values
 
     big_idx = np.where(mags >= thr_mag)[0]
@@ -160,12 +181,32 @@ def build_label_30d(
     return df
 
 
+def add_time_features(df, t_start, time_col="time"):
+    """Takvim özellikleri ve t_start'tan bu yana geçen gün (eğitim ve kademeli yenileme ortak)."""
+    times = df[time_col]
+    df["year"] = times.dt.year
+    df["month"] = times.dt.month
+    df["day"] = times.dt.day
+    df["hour"] = times.dt.hour
+    df["day_of_year"] = times.dt.dayofyear
+    df["days_since_start"] = (times - t_start).dt.days
+
+    df["sin_month"] = np.sin(2 * np.pi * df["month"] / 12)
+    df["cos_month"] = np.cos(2 * np.pi * df["month"] / 12)
+    df["sin_hour"] = np.sin(2 * np.pi * df["hour"] / 24)
+    df["cos_hour"] = np.cos(2 * np.pi * df["hour"] / 24)
+    return df
+
+
+@traced("risk.fault_distance")
 def add_fault_distance(df, lat_col="latitude", lon_col="longitude"):
-    d_list = []
-    for la, lo in zip(df[lat_col].values, df[lon_col].values):
-        d = min([haversine(la, lo, f[0], f[1]) for f in FAULT_POINTS])
-        d_list.append(d)
-    df["distance_to_fault"] = d_list
+    lats = df[lat_col].to_numpy(dtype=float)
+    lons = df[lon_col].to_numpy(dtype=float)
+    # Satır başına liste yerine fay noktaları üzerinde dizi halinde en küçük mesafe
+    dist = np.full(len(df), np.inf)
+    for f in FAULT_POINTS:
+        np.minimum(dist, haversine(lats, lons, f[0], f[1]), out=dist)
+    df["distance_to_fault"] = dist
     return df
 
 
@@ -185,13 +226,78 @@ def nearest_fault_distance(lat, lon):
 
 # --- ENGINE CLASS ---
 
+class CatalogSnapshot:
+    """
+    Bir katalog sürümünün değişmez görünümü: çerçeveler ve onlardan türetilen sorgu dizileri.
+    Yeni sürüm yeni nesne olarak yayınlanır; sorgular başta aldıkları görüntüyle kilitsiz
+    çalışır, bu sırada yayınlanan sürümü bir sonraki sorguda görür.
+    Katmanlı modda çerçeveler yalnızca sıcak katmandır; daha eskisi cold (ColdTier) içindedir.
+    """
+
+    __slots__ = ("version", "df_full", "df_main", "arrays", "cold")
+
+    def __init__(self, version, df_full, df_main, arrays=None, cold=None):
+        self.version = version
+        self.df_full = df_full
+        self.df_main = df_main
+        self.arrays = arrays
+        self.cold = cold
+
+
 class EarthquakeRiskEngine:
-    def __init__(self, csv_path="assets/query.csv"):
+    def __init__(self, csv_path="assets/query.csv", cache_dir="cache", result_cache_size=512):
         self.csv_path = csv_path
-        self.df_full = None
-        self.df_main = None
+        self.cache_dir = cache_dir
+        self._catalog = None
         self.model = None
         self.geolocator = None
+        self._warm_lock = threading.RLock()
+        # predict_proba iş parçacığı sayısı (-1: tüm çekirdekler; süreç havuzunda 1 olmalı)
+        self.predict_thread_count = -1
+        # Kısa vadeli skorlayıcı: "full" (CatBoost predict_proba) veya "compact" (NumPy ile
+        # değerlendirilen ağaçlar). compact_params: method (exact/distill/prune)
+        # ve öğrenci ayarları (compact_scorer.DISTILL_PARAMS üzerine yazılır)
+        self.scorer = "full"
+        self.compact_params = {}
+        self._compact = None
+        # Belirsizlik bandı: ensemble_size > 1 ise zaman blokları önyüklemesiyle eğitilen üyeler
+        # kısa vadeli skora yayılım ve nicelik ekler (ensemble_params CatBoost ayarları ve
+        # n_blocks zaman bloğu sayısı; ensemble_workers eğitim süreci sayısı, None: tüm çekirdekler)
+        self.ensemble_size = 0
+        self.ensemble_params = {}
+        self.ensemble_workers = None
+        self.ensemble_report = None
+        self._ensemble = None
+        # CatBoost ayarları (model_training.DEFAULT_PARAMS üzerine yazılır) ve kat işçi sayısı
+        self.training_params = {}
+        self.training_workers = None
+        self.training_report = None
+        # Ayıklama için süreç sayısı (1: seri)
+        self.decluster_workers = 1
+        # Monte Carlo tehlike simülasyonu için süreç sayısı (None: tüm çekirdekler)
+        self.simulation_workers = None
+        # Sıcak katman süresi (gün). None: tüm katalog bellekte. Verilirse daha eski olaylar
+        # özet + disk arşivine (cold_dir altında geçici dizin; None: sistem geçici dizini) taşınır
+        self.hot_days = None
+        self.cold_dir = None
+
+        # Sonuç önbelleği: (yuvarlanmış konum, katalog sürümü, model sürümü) -> skorlar
+        self.catalog_version = 0
+        # Dosya değişince arka planda yeniden hazırlama (istek / başlatılan istek sayaçları)
+        self._refresh_requested = 0
+        self._refresh_started = 0
+        # Yeni katalog sürümü yayınlandığında çağrılacak fonksiyonlar (ör. izleme listesi)
+        self._catalog_listeners = []
+        self.model_version = 0
+        # Model sürümü arttığında (yeniden eğitim, skorlayıcı yeniden kurulumu) çağrılacak fonksiyonlar
+        self._model_listeners = []
+        self.result_cache_size = result_cache_size
+        self.cache_precision = 3  # ~100 m
+        self._result_cache = collections.OrderedDict()
+        self._geocode_cache = {}
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def _check_dependencies(self):
         missing = []
@@ -205,193 +311,934 @@ class EarthquakeRiskEngine:
                 "pip install catboost geopy komutunu çalıştır."
             )
 
+    @property
+    def df_full(self):
+        catalog = self._catalog
+        return catalog.df_full if catalog is not None else None
+
+    @property
+    def df_main(self):
+        catalog = self._catalog
+        return catalog.df_main if catalog is not None else None
+
+    def full_frames(self, catalog=None):
+        """
+        Tüm katalog (df_full, df_main). Katmanlı modda soğuk arşiv diskten okunup sıcak
+        katmanla birleştirilir; geçici bellek katalog boyutundadır (yeniden eğitim, tehlike modeli).
+        """
+        catalog = catalog or self._catalog
+        if catalog.cold is None or not catalog.cold.rows:
+            return catalog.df_full, catalog.df_main
+        cold_full, cold_main = catalog.cold.frames()
+        return concat_frames([cold_full, catalog.df_full]), concat_frames([cold_main, catalog.df_main])
+
     def _prepare_frames(self):
-        if self.df_full is not None and self.df_main is not None:
+        if self._catalog is not None:
             return
-        if not os.path.exists(self.csv_path):
-            raise FileNotFoundError(
-                f"Veri dosyası bulunamadı: {self.csv_path}. "
-                "CSV'yi assets klasörüne query.csv adıyla ekle."
+        df_full, df_main = self._build_frames()
+        self.publish_catalog(df_full, df_main)
+
+    def _build_frames(self):
+        """CSV'den (df_full, df_main) çiftini hazırlar; motorun yayınlanmış durumuna dokunmaz."""
+        with span("risk.prepare_frames"):
+            if not os.path.exists(self.csv_path):
+                raise FileNotFoundError(
+                    f"Veri dosyası bulunamadı: {self.csv_path}. "
+                    "CSV'yi assets klasörüne query.csv adıyla ekle."
+                )
+
+            with span("risk.load_csv"):
+                # Yalnızca gerekli sütunlar, float32/kategorik tipler, zaman sıralı
+                df = load_catalog(self.csv_path)
+
+            df = simple_declustering(
+                df,
+                time_col="time",
+                lat_col="latitude",
+                lon_col="longitude",
+                mag_col="mag",
+                time_window_days=1.0,
+                space_window_km=50.0,
+                workers=self.decluster_workers,
             )
 
-        df = pd.read_csv(self.csv_path)
-        df["time"] = pd.to_datetime(df["time"])
-        df = df.sort_values("time").reset_index(drop=True)
-
-        df = simple_declustering(
-            df,
-            time_col="time",
-            lat_col="latitude",
-            lon_col="longitude",
-            mag_col="mag",
-            time_window_days=1.0,
-            space_window_km=50.0,
-        )
-
-        df_main = df[~df["is_aftershock"]].copy().reset_index(drop=True)
-        df_main = build_label_30d(
-            df_main,
-            time_col="time",
-            lat_col="latitude",
-            lon_col="longitude",
-            mag_col="mag",
-            thr_mag=4.0,
-            horizon_days=30,
-            radius_km=100.0,
-        )
-
-        df_main = df_main.sort_values("time").reset_index(drop=True)
-        df_main["rolling_mean_7d"] = df_main["mag"].rolling(window=7).mean()
-        df_main["rolling_std_7d"] = df_main["mag"].rolling(window=7).std()
-        df_main["rolling_max_7d"] = df_main["mag"].rolling(window=7).max()
-        df_main["event_count_7d"] = df_main["mag"].rolling(window=7).count()
-
-        df_main["year"] = df_main["time"].dt.year
-        df_main["month"] = df_main["time"].dt.month
-        df_main["day"] = df_main["time"].dt.day
-        df_main["hour"] = df_main["time"].dt.hour
-        df_main["day_of_year"] = df_main["time"].dt.dayofyear
-        df_main["days_since_start"] = (df_main["time"] - df_main["time"].min()).dt.days
-
-        df_main["sin_month"] = np.sin(2 * np.pi * df_main["month"] / 12)
-        df_main["cos_month"] = np.cos(2 * np.pi * df_main["month"] / 12)
-        df_main["sin_hour"] = np.sin(2 * np.pi * df_main["hour"] / 24)
-        df_main["cos_hour"] = np.cos(2 * np.pi * df_main["hour"] / 24)
+            df_main = df[~df["is_aftershock"]].reset_index(drop=True)
+            df_main = build_label_30d(
+                df_main,
+                time_col="time",
+                lat_col="latitude",
+                lon_col="longitude",
+                mag_col="mag",
+                thr_mag=4.0,
+                horizon_days=30,
+                radius_km=100.0,
+            )
 
-        df_main = add_fault_distance(df_main, lat_col="latitude", lon_col="longitude")
-        df_main = df_main.dropna().reset_index(drop=True)
+            with span("risk.features"):
+                # Olaydan önceki 7/30 günde, 100 km içindeki ana şokların istatistikleri
+                # (çıkarımda da aynı EventIndex yolu kullanılır)
+                df_main = add_window_features(df_main)
+                df_main = add_time_features(df_main, df_main["time"].min())
 
-        self.df_full = df
-        self.df_main = df_main
+            df_main = add_fault_distance(df_main, lat_col="latitude", lon_col="longitude")
+            # Yalnızca model sütunlarında eksik olan satırlar atılır (net/magType boş olabilir)
+            df_main = df_main.dropna(subset=RISK_FEATURE_COLUMNS).reset_index(drop=True)
+        return df, df_main
 
+    @traced("risk.train_short_model")
     def _train_short_model(self):
         if self.model is not None:
             return
         self._prepare_frames()
-        if len(self.df_main) < 20:
+        df_main = self.full_frames()[1]
+        if len(df_main) < 20:
             raise RuntimeError("Model eğitimine yetecek kadar kayıt yok.")
         if CatBoostClassifier is None:
             raise RuntimeError("catboost paketi yüklü olmalı.")
 
-        x = self.df_main[RISK_FEATURE_COLUMNS]
-        y = self.df_main["label_30d"].astype(int)
-
-        tscv = TimeSeriesSplit(n_splits=5)
-        model = CatBoostClassifier(
-            iterations=800,
-            depth=8,
-            learning_rate=0.03,
-            loss_function="Logloss",
-            random_seed=42,
-            verbose=False,
-        )
-
-        # Son katmanda eğit
-        for train_idx, test_idx in tscv.split(x):
-            x_train_final, _ = x.iloc[train_idx], x.iloc[test_idx]
-            y_train_final, _ = y.iloc[train_idx], y.iloc[test_idx]
-
-        model.fit(x_train_final, y_train_final)
+        x = df_main[RISK_FEATURE_COLUMNS]
+        y = df_main["label_30d"].astype(int)
+
+        # İleri yürüyen katlar paralel değerlendirilir, erken durdurma ağaç sayısını seçer,
+        # son model tüm veride eğitilir
+        with span("risk.train_catboost", rows=len(x)):
+            model, report = train_with_validation(
+                x,
+                y,
+                df_main["time"],
+                params=self.training_params,
+                n_splits=5,
+                workers=self.training_workers,
+                feature_names=RISK_FEATURE_COLUMNS,
+            )
         self.model = model
+        self.training_report = report
+        self._bump_model_version()
 
     def _compute_long_term_hazard(
-        self, city_lat, city_lon, radius_km=200.0, mag_threshold=6.0, years_window=None
+        self, city_lat, city_lon, radius_km=200.0, mag_threshold=6.0, years_window=None, catalog=None
     ):
-        df_full = self.df_full.copy().sort_values("time")
-        dists = haversine(
-            city_lat,
-            city_lon,
-            df_full["latitude"].values,
-            df_full["longitude"].values,
-        )
-        sub = df_full[dists <= radius_km].copy()
-        if sub.empty:
+        catalog = catalog or self._catalog
+        arrays = self._query_arrays(catalog)
+        dists = haversine(city_lat, city_lon, arrays["full_lat"], arrays["full_lon"])
+        mask = dists <= radius_km
+        n_big = int((arrays["full_mag"][mask] >= mag_threshold).sum())
+        sub_times = arrays["full_time"][mask]
+        if catalog.cold is not None:
+            # Soğuk katman: histogram + sınır hücreleri için arşiv (tam katalogla aynı sonuç)
+            cold_big, first_ms, last_ms = catalog.cold.hazard_terms(city_lat, city_lon, radius_km, mag_threshold)
+            n_big += cold_big
+            if first_ms is not None:
+                cold_times = np.array([first_ms, last_ms], dtype="datetime64[ms]")
+                sub_times = np.concatenate([cold_times, sub_times.astype("datetime64[ms]")])
+        if not len(sub_times):
             return 0.0
 
         if years_window is None:
-            years = (sub["time"].max() - sub["time"].min()).days / 365.25
+            span_days = (sub_times.max() - sub_times.min()) // np.timedelta64(1, "D")
+            years = int(span_days) / 365.25
         else:
             years = years_window
 
         if years <= 0:
             return 0.0
 
-        n_big = (sub["mag"] >= mag_threshold).sum()
         lam = n_big / years if n_big > 0 else 0.01 / years
         t = 10.0
         p10 = 1 - math.exp(-lam * t)
         return max(0.0, min(1.0, p10))
 
-    def _compute_short_term_ml_risk(self, city_lat, city_lon):
-        df_main = self.df_main
-        model = self.model
+    def hazard_model(self):
+        """Ayıklanmış katalogdan uydurulan stokastik katalog modeli (katalog sürümü başına bir kez)."""
+        self.warm_up()
+        catalog = self._catalog
+        cached = getattr(self, "_hazard_model_cache", None)
+        if cached is not None and cached[0] == catalog.version:
+            return cached[1]
+        with span("risk.hazard_fit"):
+            model = HazardModel.fit(self.full_frames(catalog)[0])
+        self._hazard_model_cache = (catalog.version, model)
+        return model
+
+    def simulate_long_term_hazard(self, points, n_sims=10_000, years=10.0, mag_threshold=6.0,
+                                  radius_km=200.0, etas=False, seed=42):
+        """
+        _compute_long_term_hazard'ın Monte Carlo karşılığı: konumlar için aşılma olasılıkları,
+        güven aralıkları ve parametre belirsizliği yayılımı (DataFrame).
+        points: (enlem, boylam) veya (ad, enlem, boylam) listesi.
+        """
+        sites = [p if len(p) == 3 else (f"{p[0]:.3f},{p[1]:.3f}", p[0], p[1]) for p in points]
+        with span("risk.hazard_simulation", sites=len(sites), sims=n_sims):
+            return simulate_hazard(
+                self.hazard_model(), sites, n_sims=n_sims, horizon_years=years,
+                mag_threshold=mag_threshold, radius_km=radius_km, etas=etas,
+                workers=self.simulation_workers, seed=seed,
+            )
 
+    def _query_arrays(self, catalog=None):
+        """
+        Sorgu yolunda kullanılan sütunları NumPy dizisi olarak katalog görüntüsü başına bir kez
+        hazırlar; her sorguda DataFrame kopyalanmaz.
+        """
+        catalog = catalog or self._catalog
+        if catalog.arrays is None:
+            catalog.arrays = self._build_query_arrays(catalog.df_full, catalog.df_main, catalog.cold)
+        return catalog.arrays
+
+    def _build_query_arrays(self, df_full, df_main, cold=None):
+        if not df_full["time"].is_monotonic_increasing:
+            df_full = df_full.sort_values("time")
+        if not df_main["time"].is_monotonic_increasing:
+            df_main = df_main.sort_values("time")
         latest_time = df_main["time"].max()
-        one_year_ago = latest_time - pd.Timedelta(days=365)
-        recent = df_main[df_main["time"] >= one_year_ago].copy()
-
-        dists = haversine(
-            city_lat,
-            city_lon,
-            recent["latitude"].values,
-            recent["longitude"].values,
-        )
-        recent["dist_to_city"] = dists
-        local = recent[recent["dist_to_city"] <= 150.0].copy()
-
-        if len(local) >= 7:
-            last_events = local.sort_values("time").tail(7)
-        else:
-            last_events = df_main.sort_values("time").tail(7)
+        arrays = {
+            "full_lat": df_full["latitude"].to_numpy(dtype=float),
+            "full_lon": df_full["longitude"].to_numpy(dtype=float),
+            "full_mag": df_full["mag"].to_numpy(dtype=float),
+            "full_time": df_full["time"].dt.tz_convert(None).to_numpy(),
+            "window_index": EventIndex(
+                df_main["time"].to_numpy(),
+                df_main["latitude"].to_numpy(dtype=float),
+                df_main["longitude"].to_numpy(dtype=float),
+                df_main["mag"].to_numpy(dtype=float),
+            ),
+            "t_ref": latest_time,
+            "days_since_start": (latest_time - df_main["time"].min()).days,
+            "depth_mean": df_main["depth"].mean(),
+        }
+        if cold is not None and cold.summary.totals["main_events"]:
+            # Başlangıç anı ve ortalama derinlik soğuk katman toplamlarıyla tamamlanır
+            totals = cold.summary.totals
+            first_main = pd.Timestamp(totals["first_main_ms"], unit="ms", tz="UTC")
+            depth_sum = totals["main_depth_sum"] + float(df_main["depth"].to_numpy(dtype=np.float64).sum())
+            arrays["days_since_start"] = (latest_time - first_main).days
+            arrays["depth_mean"] = np.float32(depth_sum / (totals["main_events"] + len(df_main)))
+        return arrays
 
-        rolling_mean_7d = last_events["mag"].mean()
-        rolling_std_7d = last_events["mag"].std()
-        rolling_max_7d = last_events["mag"].max()
-        event_count_7d = len(last_events)
+    def _compute_short_term_ml_risk(self, city_lat, city_lon):
+        proba = self._short_term_probas([(city_lat, city_lon)])[0]
+        return max(0.0, min(1.0, proba))
 
-        t_ref = df_main["time"].max()
-        year = t_ref.year
+    def _short_term_features(self, city_lat, city_lon):
+        """Kısa vadeli model için tek konumun özellik sözlüğünü hazırlar."""
+        return self._short_term_feature_rows([(city_lat, city_lon)]).iloc[0].to_dict()
+
+    def _short_term_probas(self, points, catalog=None):
+        """Konumların kısa vadeli olasılıkları; self.scorer hangi skorlayıcının kullanılacağını seçer."""
+        return self._short_term_scores(points, catalog)[0]
+
+    def _short_term_scores(self, points, catalog=None, ensemble=None):
+        """
+        (olasılıklar, üye olasılıkları) çifti. ensemble (CompactEnsemble) verilirse üyeler aynı
+        özellik matrisi üzerinde tek geçişte (nokta, üye) olasılık üretir; verilmezse ikinci öğe None.
+        """
+        if self.scorer == "compact":
+            scorer = self.compact_scorer()
+            x = self._short_term_feature_matrix(points, catalog, out=scorer.buffer(len(points)))
+            probas = scorer.predict_proba(x)
+        else:
+            x = self._short_term_feature_matrix(points, catalog)
+            probas = self.model.predict_proba(self._feature_frame(x), thread_count=self.predict_thread_count)[:, 1]
+        return probas, (ensemble.member_proba(x) if ensemble is not None else None)
+
+    @staticmethod
+    def _feature_frame(x):
+        return pd.DataFrame(x, columns=RISK_FEATURE_COLUMNS)
+
+    def _short_term_feature_rows(self, points, catalog=None):
+        """Konumların özellik tablosu (DataFrame; sütunlar RISK_FEATURE_COLUMNS)."""
+        return self._feature_frame(self._short_term_feature_matrix(points, catalog))
+
+    def _short_term_feature_matrix(self, points, catalog=None, out=None):
+        """
+        Konumların (nokta, RISK_FEATURE_COLUMNS) özellik matrisi; out verilirse oraya yazılır.
+        Yerel pencere özellikleri eğitimdekiyle aynı EventIndex üzerinden, son olay anına
+        kadar (dahil) tek geçişte hesaplanır.
+        """
+        arrays = self._query_arrays(catalog)
+        n = len(points)
+        x = out if out is not None else np.empty((n, len(RISK_FEATURE_COLUMNS)))
+        pts = np.asarray(points, dtype=float).reshape(n, 2)
+        lats = pts[:, 0]
+        lons = pts[:, 1]
+
+        t_ref = arrays["t_ref"]
+        q_times = np.full(n, t_ref.to_datetime64())
+        stats = arrays["window_index"].window_stats(q_times, lats, lons, include_self=True)
+
+        col = _FEATURE_INDEX
         month = t_ref.month
-        day = t_ref.day
         hour = t_ref.hour
-        day_of_year = t_ref.timetuple().tm_yday
-        days_since_start = (t_ref - df_main["time"].min()).days
-
-        sin_month = np.sin(2 * np.pi * month / 12)
-        cos_month = np.cos(2 * np.pi * month / 12)
-        sin_hour = np.sin(2 * np.pi * hour / 24)
-        cos_hour = np.cos(2 * np.pi * hour / 24)
-
-        dist_fault = nearest_fault_distance(city_lat, city_lon)
-        depth_mean = df_main["depth"].mean()
-
-        row = pd.DataFrame(
-            [
-                {
-                    "latitude": city_lat,
-                    "longitude": city_lon,
-                    "depth": depth_mean,
-                    "rolling_mean_7d": rolling_mean_7d,
-                    "rolling_std_7d": rolling_std_7d,
-                    "rolling_max_7d": rolling_max_7d,
-                    "event_count_7d": event_count_7d,
-                    "year": year,
-                    "month": month,
-                    "day": day,
-                    "hour": hour,
-                    "day_of_year": day_of_year,
-                    "days_since_start": days_since_start,
-                    "sin_month": sin_month,
-                    "cos_month": cos_month,
-                    "sin_hour": sin_hour,
-                    "cos_hour": cos_hour,
-                    "distance_to_fault": dist_fault,
-                }
-            ]
+        x[:, col["latitude"]] = lats
+        x[:, col["longitude"]] = lons
+        x[:, col["depth"]] = arrays["depth_mean"]
+        for w, (mean, std, mx, cnt) in stats.items():
+            x[:, col[f"rolling_mean_{w}d"]] = mean
+            x[:, col[f"rolling_std_{w}d"]] = std
+            x[:, col[f"rolling_max_{w}d"]] = mx
+            x[:, col[f"event_count_{w}d"]] = cnt
+        x[:, col["year"]] = t_ref.year
+        x[:, col["month"]] = month
+        x[:, col["day"]] = t_ref.day
+        x[:, col["hour"]] = hour
+        x[:, col["day_of_year"]] = t_ref.timetuple().tm_yday
+        x[:, col["days_since_start"]] = arrays["days_since_start"]
+        x[:, col["sin_month"]] = np.sin(2 * np.pi * month / 12)
+        x[:, col["cos_month"]] = np.cos(2 * np.pi * month / 12)
+        x[:, col["sin_hour"]] = np.sin(2 * np.pi * hour / 24)
+        x[:, col["cos_hour"]] = np.cos(2 * np.pi * hour / 24)
+        # Nokta x fay noktası mesafeleri tek dizi işleminde
+        x[:, col["distance_to_fault"]] = haversine(
+            lats[:, None], lons[:, None], _FAULT_ARRAY[:, 0], _FAULT_ARRAY[:, 1]
+        ).min(axis=1)
+        return x
+
+    # --- SIKIŞTIRILMIŞ SKORLAYICI ---
+
+    def compact_scorer(self):
+        """
+        Güncel modelden türetilmiş CompactScorer (gerekirse kurulur). Model (yeniden eğitim,
+        backtest'te atama) veya compact_params değişince yeniden kurulur ve model sürümü artar.
+        """
+        if self._compact_current():
+            return self._compact[2]
+        with self._warm_lock:
+            if self._compact_current():
+                return self._compact[2]
+            with span("risk.build_compact_scorer"):
+                scorer = self._build_compact_scorer(self.model)
+            self._compact = (self.model, dict(self.compact_params), scorer)
+            self._bump_model_version()
+            return scorer
+
+    def _compact_current(self):
+        compact = self._compact
+        return compact is not None and compact[0] is self.model and compact[1] == self.compact_params
+
+    def _build_compact_scorer(self, model):
+        params = dict(self.compact_params)
+        method = params.pop("method", "exact")
+        transfer_points = params.pop("transfer_points", TRANSFER_POINTS)
+        x = None
+        if method == "distill":
+            from synthetic_catalog import synthetic_locations
+
+            # Aktarım kümesi: eğitim satırları + son katalog anında rastgele sorgu noktaları
+            # (sorgu özellik dağılımı eğitim olaylarınınkinden farklıdır)
+            x_train = self.full_frames()[1][RISK_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+            locs = synthetic_locations(transfer_points, seed=1)
+            x_query = self._short_term_feature_matrix(list(zip(locs["latitude"], locs["longitude"])))
+            x = np.vstack([x_train, x_query])
+        return CompactScorer.build(model, x, method=method, params=params)
+
+    def _compact_meta(self):
+        return {"key": self._disk_cache_key(), "params": self.compact_params}
+
+    def _save_compact(self):
+        if self.cache_dir and self._compact_current():
+            self._save_scorer("compact", self._compact[2], self._compact_meta())
+
+    def _load_compact(self):
+        return self._load_scorer("compact", CompactScorer, self._compact_meta())[0]
+
+    # --- ÖNYÜKLEME TOPLULUĞU (BELİRSİZLİK) ---
+
+    def ensemble_scorer(self):
+        """
+        Kısa vadeli model için önyükleme topluluğu (CompactEnsemble; gerekirse eğitilir).
+        Model veya ensemble_size / ensemble_params değişince yeniden eğitilir ve model sürümü artar.
+        """
+        if self._ensemble_current():
+            return self._ensemble[2]
+        with self._warm_lock:
+            if self._ensemble_current():
+                return self._ensemble[2]
+            with span("risk.train_ensemble", members=self.ensemble_size):
+                ensemble, report = self._train_ensemble()
+            self._ensemble = (self.model, self._ensemble_config(), ensemble)
+            self.ensemble_report = report
+            self._bump_model_version()
+            return ensemble
+
+    def _ensemble_config(self):
+        return {"size": self.ensemble_size, "params": dict(self.ensemble_params)}
+
+    def _ensemble_current(self):
+        ensemble = self._ensemble
+        return ensemble is not None and ensemble[0] is self.model and ensemble[1] == self._ensemble_config()
+
+    def _train_ensemble(self):
+        self._prepare_frames()
+        df_main = self.full_frames()[1]
+        x = df_main[RISK_FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+        y = df_main["label_30d"].astype(int).to_numpy()
+        # Üyeler ana modelin erken durdurmayla seçilen ağaç sayısıyla eğitilir (kat değerlendirmesi yok)
+        params = dict(self.training_params)
+        if self.training_report:
+            params["iterations"] = self.training_report["iterations"]
+        params.update(self.ensemble_params)
+        n_blocks = params.pop("n_blocks", BOOTSTRAP_BLOCKS)
+        models, report = train_bootstrap_ensemble(
+            x, y, n_members=self.ensemble_size, params=params, workers=self.ensemble_workers, n_blocks=n_blocks,
+        )
+        if not models:
+            raise RuntimeError("Önyükleme topluluğu eğitilemedi (tüm örneklerde tek sınıf).")
+        return CompactEnsemble.from_members([CompactScorer.from_catboost(m) for m in models]), report
+
+    def _ensemble_meta(self):
+        return {"key": self._disk_cache_key(), "config": self._ensemble_config()}
+
+    def _save_ensemble(self):
+        if self.cache_dir and self._ensemble_current():
+            self._save_scorer("ensemble", self._ensemble[2], dict(self._ensemble_meta(), report=self.ensemble_report))
+
+    def _load_ensemble(self):
+        ensemble, meta = self._load_scorer("ensemble", CompactEnsemble, self._ensemble_meta())
+        if ensemble is not None:
+            self.ensemble_report = meta.get("report")
+        return ensemble
+
+    def _ensemble_band(self, members, short_risk, final_score):
+        """Tek konumun üye olasılıklarından kısa vadeli ve nihai skor bandı."""
+        p = np.clip(members, 0.0, 1.0)
+        band = {k: float(v[0]) for k, v in summarize_members(p[None, :], ENSEMBLE_QUANTILES).items()}
+        # Uzun vade ve fay bileşeni üyelerde ortak: üye nihai skoru yalnızca kısa vade kadar kayar
+        finals = final_score + 0.4 * (p - short_risk)
+        lo, hi = np.quantile(finals, (ENSEMBLE_QUANTILES[0], ENSEMBLE_QUANTILES[-1]))
+        category = self._risk_category(final_score)
+        band.update({
+            "final_low": float(lo),
+            "final_high": float(hi),
+            "category_agreement": float(np.mean([self._risk_category(f) == category for f in finals])),
+            "members": int(len(p)),
+        })
+        return band
+
+    # --- SKORLAYICI DİSK ÖNBELLEĞİ ---
+
+    def _save_scorer(self, name, scorer, meta):
+        npz_path, meta_path = self._scorer_paths(name)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            scorer.save(npz_path)
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        except Exception as e:
+            print(f"Skorlayıcı yazılamadı ({name}): {e}")
+
+    def _load_scorer(self, name, cls, expected):
+        """(skorlayıcı, kayıtlı meta); expected'daki alanlardan biri uymuyorsa (None, {})."""
+        npz_path, meta_path = self._scorer_paths(name)
+        if not (os.path.exists(npz_path) and os.path.exists(meta_path)):
+            return None, {}
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if any(meta.get(k) != v for k, v in json.loads(json.dumps(expected)).items()):
+                return None, {}
+            return cls.load(npz_path), meta
+        except Exception as e:
+            print(f"Skorlayıcı okunamadı ({name}): {e}")
+            return None, {}
+
+    def _scorer_paths(self, name):
+        return os.path.join(self.cache_dir, f"{name}.npz"), os.path.join(self.cache_dir, f"{name}.json")
+
+    # --- ÖNBELLEK VE ISINMA ---
+
+    def _disk_cache_key(self):
+        # CSV (boyut veya zaman damgası) ya da özellik listesi değiştiğinde önbellek geçersiz olur
+        st = os.stat(self.csv_path)
+        return {
+            "csv": os.path.abspath(self.csv_path),
+            "size": st.st_size,
+            "mtime": int(st.st_mtime),
+            "features": RISK_FEATURE_COLUMNS,
+        }
+
+    def _cache_paths(self):
+        return (
+            os.path.join(self.cache_dir, "engine.snap"),
+            os.path.join(self.cache_dir, "model.cbm"),
+            os.path.join(self.cache_dir, "meta.json"),
         )
 
-        proba = model.predict_proba(row[RISK_FEATURE_COLUMNS])[0][1]
-        return max(0.0, min(1.0, proba))
+    def load_cache(self):
+        """Hazırlanmış çerçeveleri ve modeli diskten yükler. Başarılıysa True döner."""
+        if not self.cache_dir or not os.path.exists(self.csv_path):
+            return False
+        snapshot_path, model_path, meta_path = self._cache_paths()
+        if not all(os.path.exists(p) for p in (snapshot_path, model_path, meta_path)):
+            return False
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("key") != self._disk_cache_key():
+                return False
+            with span("risk.load_cache"):
+                # Bellek eşlemeli açılış: diziler diskten okunmaz, dokunuldukça sayfalanır
+                arrays, snap_meta = open_snapshot(snapshot_path)
+                self.training_report = meta.get("training_report")
+                model = None
+                if CatBoostClassifier is not None:
+                    model = CatBoostClassifier()
+                    model.load_model(model_path)
+        except Exception as e:
+            print(f"Önbellek okunamadı, yeniden hesaplanacak: {e}")
+            return False
+        self._restore_snapshot(arrays, snap_meta)
+        if model is not None:
+            self.model = model
+            if self.scorer == "compact":
+                scorer = self._load_compact()
+                if scorer is not None:
+                    self._compact = (model, dict(self.compact_params), scorer)
+            if self.ensemble_size > 1:
+                ensemble = self._load_ensemble()
+                if ensemble is not None:
+                    self._ensemble = (model, self._ensemble_config(), ensemble)
+            self._bump_model_version()
+        return True
+
+    def save_cache(self):
+        catalog = self._catalog
+        if not self.cache_dir or catalog is None or self.model is None:
+            return
+        snapshot_path, model_path, meta_path = self._cache_paths()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with span("risk.save_cache"):
+                if catalog.cold is not None:
+                    # Görüntü tüm katalogu taşır; açılışta katmanlara yeniden ayrılır
+                    catalog = CatalogSnapshot(catalog.version, *self.full_frames(catalog))
+                arrays, snap_meta = self._snapshot_payload(catalog)
+                write_snapshot(snapshot_path, arrays, snap_meta)
+                self.model.save_model(model_path)
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"key": self._disk_cache_key(), "training_report": self.training_report}, f)
+        except Exception as e:
+            print(f"Önbellek yazılamadı: {e}")
+            return
+        self._save_compact()
+        self._save_ensemble()
+
+    def _snapshot_payload(self, catalog):
+        """
+        Çerçeveler, sorgu dizileri ve uzamsal indeks: tek dosyada hizalı diziler.
+        Açılışta _query_arrays yeniden hesaplanmaz, EventIndex yeniden kurulmaz.
+        """
+        query = self._query_arrays(catalog)
+        arrays = {}
+        frames = {}
+        for name in ("df_full", "df_main"):
+            frame_arrays, frames[name] = frame_to_arrays(getattr(catalog, name), name)
+            arrays.update(frame_arrays)
+        for name in ("full_lat", "full_lon", "full_mag", "full_time"):
+            arrays[f"query/{name}"] = query[name]
+        index_scalars, index_arrays = query["window_index"].state()
+        arrays.update({f"index/{k}": v for k, v in index_arrays.items()})
+        meta = {
+            "frames": frames,
+            "index": index_scalars,
+            "t_ref": query["t_ref"].isoformat(),
+            "days_since_start": int(query["days_since_start"]),
+            "depth_mean": float(query["depth_mean"]),
+        }
+        return arrays, meta
+
+    def _restore_snapshot(self, arrays, meta):
+        df_full = frame_from_arrays(arrays, meta["frames"]["df_full"], "df_full")
+        df_main = frame_from_arrays(arrays, meta["frames"]["df_main"], "df_main")
+        query = {name: arrays[f"query/{name}"] for name in ("full_lat", "full_lon", "full_mag", "full_time")}
+        index_arrays = {k.split("/", 1)[1]: v for k, v in arrays.items() if k.startswith("index/")}
+        query.update({
+            "window_index": EventIndex.from_state(meta["index"], index_arrays),
+            "t_ref": pd.Timestamp(meta["t_ref"]),
+            "days_since_start": meta["days_since_start"],
+            "depth_mean": meta["depth_mean"],
+        })
+        self.publish_catalog(df_full, df_main, arrays=query)
+
+    @traced("risk.warm_up")
+    def warm_up(self, progress=None):
+        """
+        Çerçeveleri ve modeli hazırlar (önce diskteki önbelleği dener).
+        progress(mesaj, oran) ile ilerleme bildirilir. Önbellekten yüklendiyse True döner.
+        """
+        def report(msg, frac):
+            if progress:
+                progress(msg, frac)
+
+        # Hazırsa kilit alınmaz: arka planda katalog yenilenirken sorgular beklemez
+        if self._catalog is not None and self.model is not None:
+            report("Hazır", 1.0)
+            return True
+        with self._warm_lock:
+            if self._catalog is not None and self.model is not None:
+                report("Hazır", 1.0)
+                return True
+            report("Önbellek kontrol ediliyor", 0.05)
+            if self.load_cache() and self.model is not None:
+                if self.scorer == "compact" and not self._compact_current():
+                    report("Sıkıştırılmış skorlayıcı hazırlanıyor", 0.8)
+                    self.compact_scorer()
+                    self._save_compact()
+                if self.ensemble_size > 1 and not self._ensemble_current():
+                    report("Önyükleme topluluğu eğitiliyor", 0.85)
+                    self.ensemble_scorer()
+                    self._save_ensemble()
+                self._apply_retention()
+                report("Hazır (önbellek)", 1.0)
+                return True
+            report("Katalog hazırlanıyor", 0.1)
+            self._prepare_frames()
+            report("Model eğitiliyor", 0.6)
+            self._train_short_model()
+            if self.scorer == "compact":
+                report("Sıkıştırılmış skorlayıcı hazırlanıyor", 0.85)
+                self.compact_scorer()
+            if self.ensemble_size > 1:
+                report("Önyükleme topluluğu eğitiliyor", 0.9)
+                self.ensemble_scorer()
+            report("Önbellek yazılıyor", 0.95)
+            self.save_cache()
+            self._apply_retention()
+            report("Hazır", 1.0)
+            return False
+
+    # --- SICAK / SOĞUK KATMANLAR ---
+
+    def _apply_retention(self):
+        """hot_days verildiyse yayınlanmış tam katalogu sıcak katman + soğuk katman olarak yeniden yayınlar."""
+        catalog = self._catalog
+        if not self.hot_days or catalog is None or catalog.cold is not None:
+            return
+        with span("risk.retention"):
+            if self.cold_dir:
+                os.makedirs(self.cold_dir, exist_ok=True)
+            directory = tempfile.mkdtemp(prefix="eq_cold_", dir=self.cold_dir)
+            # Arşiv motorla birlikte silinir (her süreç kendi dizinini kullanır)
+            weakref.finalize(self, shutil.rmtree, directory, True)
+            df_full, df_main, cold = self._evict(
+                catalog.df_full, catalog.df_main, ColdTier.create(directory), force=True
+            )
+            arrays = self._build_query_arrays(df_full, df_main, cold)
+        self.publish_catalog(df_full, df_main, arrays=arrays, cold=cold)
+
+    def _evict(self, df_full, df_main, cold, force=False):
+        """
+        hot_days'ten eski olayları soğuk katmana taşır. Pencere özellikleri ve etiketlerin
+        geriye baktığı 30 gün her zaman sıcak kalır. force=False ise taşıma, en eski sıcak
+        olay sınırı EVICT_SLACK_DAYS kadar geçince toplu yapılır (her yenilemede değil).
+        """
+        latest = df_full["time"].iloc[-1]
+        t_ref = df_main["time"].iloc[-1] if len(df_main) else latest
+        cutoff = min(latest - pd.Timedelta(days=self.hot_days),
+                     t_ref - pd.Timedelta(days=HOT_MIN_DAYS))
+        if not force and df_full["time"].iloc[0] >= cutoff - pd.Timedelta(days=EVICT_SLACK_DAYS):
+            return df_full, df_main, cold
+        n_full = int(df_full["time"].searchsorted(cutoff))
+        n_main = int(df_main["time"].searchsorted(cutoff))
+        cold = cold.add(df_full.iloc[:n_full], df_main.iloc[:n_main])
+        # Kopya: büyük çerçevelerin belleği sıcak dilimlerle birlikte tutulmasın
+        return (df_full.iloc[n_full:].reset_index(drop=True).copy(),
+                df_main.iloc[n_main:].reset_index(drop=True).copy(), cold)
+
+    def _ingest_tiered(self, catalog):
+        """
+        Katmanlı modda yenileme: dosyadan yalnızca sıcak katmanın son olayından sonraki satırlar
+        okunur (katalog dosyasına yalnızca yeni olay eklendiği varsayılır). Ayıklamanın (1 gün),
+        pencere özelliklerinin ve etiketlerin (30 gün) baktığı geçmiş sıcak katmanda olduğundan
+        sonuç tam yeniden kurulumla aynıdır. Yeni olay yoksa None döner.
+        """
+        hot_full, hot_main, cold = catalog.df_full, catalog.df_main, catalog.cold
+        new = load_catalog_since(self.csv_path, hot_full["time"].iloc[-1])
+        if new.empty:
+            return None
+        first_new = new["time"].iloc[0]
+        cols = ["time", "latitude", "longitude", "mag"]
+
+        # 1. Ayıklama: son günlerin ana şokları sabit öncül, yeni olaylar zaman sırasıyla çözülür
+        carry = hot_full.iloc[hot_full["time"].searchsorted(first_new - pd.Timedelta(days=2)):]
+        carry = carry[~carry["is_aftershock"]]
+        events = pd.concat([carry[cols], new[cols]], ignore_index=True)
+        status = np.zeros(len(events), dtype=np.int8)
+        status[:len(carry)] = MAIN
+        pair_i, pair_j = candidate_pairs(
+            event_times_ns(events["time"]),
+            events["latitude"].to_numpy(dtype=float),
+            events["longitude"].to_numpy(dtype=float),
+            events["mag"].to_numpy(dtype=float),
+            np.arange(len(carry), len(events)),
+            time_window_days=1.0,
+            space_window_km=50.0,
+        )
+        new["is_aftershock"] = resolve_statuses(status, pair_i, pair_j)[len(carry):] == AFTERSHOCK
+        df_full = concat_frames([hot_full, new])
+        mains = df_full[~df_full["is_aftershock"]]
+
+        # 2. Yeni ana şokların özellikleri (pencere geçmişi sıcak katmandan)
+        new_main = new[~new["is_aftershock"]].reset_index(drop=True)
+        history = mains[mains["time"] >= first_new - pd.Timedelta(days=max(FEATURE_WINDOWS_DAYS) + 1)]
+        feats = compute_window_features(
+            history["time"], history["latitude"].to_numpy(), history["longitude"].to_numpy(),
+            history["mag"].to_numpy(),
+            new_main["time"], new_main["latitude"].to_numpy(), new_main["longitude"].to_numpy(),
+        )
+        for name, values in feats.items():
+            new_main[name] = values
+        first_ms = cold.summary.totals["first_ms"] if cold.rows else None
+        t_start = pd.Timestamp(first_ms, unit="ms", tz="UTC") if first_ms is not None else df_full["time"].iloc[0]
+        new_main = add_time_features(new_main, t_start)
+        new_main = add_fault_distance(new_main, lat_col="latitude", lon_col="longitude")
+
+        # 3. Etiketler: ufku yeni olaylara uzanan ana şoklar yeniden etiketlenir. Etiket,
+        # _build_frames'teki gibi dropna öncesi ana şoklar üzerinden hesaplanır
+        cut = first_new - pd.Timedelta(days=31)
+        tail = mains[mains["time"] >= cut].reset_index(drop=True)
+        labels = build_label_30d(tail[cols].copy())["label_30d"].to_numpy()
+        labels = labels[tail[["latitude", "longitude", "depth"]].notna().all(axis=1).to_numpy()]
+        new_main = new_main.dropna(subset=RISK_FEATURE_COLUMNS)
+        start = int(hot_main["time"].searchsorted(cut))
+        old_tail = hot_main.iloc[start:].copy()
+        old_tail["label_30d"] = labels[:len(old_tail)]
+        new_main["label_30d"] = labels[len(old_tail):]
+        df_main = concat_frames([hot_main.iloc[:start], old_tail, new_main[hot_main.columns]])
+
+        # 4. Süresi dolan olaylar soğuk katmana
+        return self._evict(df_full, df_main, cold)
+
+    def retention_info(self):
+        """Katmanların boyutu: sıcak olay sayıları ve (varsa) soğuk özet/arşiv bilgisi."""
+        catalog = self._catalog
+        if catalog is None:
+            return None
+        info = {"hot_events": len(catalog.df_full), "hot_main_events": len(catalog.df_main)}
+        if catalog.cold is not None:
+            info.update(catalog.cold.info())
+        return info
+
+    # --- SONUÇ ÖNBELLEĞİ ---
+
+    def publish_catalog(self, df_full, df_main, arrays=None, cold=None, notify=True):
+        """
+        Yeni katalog sürümünü yayınlar: görüntü referansı tek atamayla değişir, sonuç
+        önbelleği boşalır. Çerçeveler yayından sonra değiştirilmemelidir. notify=False ise
+        katalog dinleyicileri çağrılmaz (geri test gibi geçmişi yeniden oynatan kullanımlar).
+        """
+        with self._cache_lock:
+            old = self._catalog
+            self.catalog_version += 1
+            new = CatalogSnapshot(self.catalog_version, df_full, df_main, arrays, cold)
+            self._catalog = new
+            self._result_cache.clear()
+        if not notify:
+            return
+        for callback in list(self._catalog_listeners):
+            try:
+                callback(old, new)
+            except Exception as e:
+                print(f"Katalog dinleyicisi hatası: {e}")
+
+    def add_catalog_listener(self, callback):
+        """callback(eski_görüntü, yeni_görüntü) her yayından sonra, yayınlayan iş parçacığında çağrılır."""
+        if callback not in self._catalog_listeners:
+            self._catalog_listeners.append(callback)
+
+    def remove_catalog_listener(self, callback):
+        if callback in self._catalog_listeners:
+            self._catalog_listeners.remove(callback)
+
+    def _bump_catalog_version(self):
+        # Aynı çerçeveleri yeni sürümle yayınlar (sonuç önbelleğini geçersiz kılmak için)
+        catalog = self._catalog
+        if catalog is None:
+            with self._cache_lock:
+                self.catalog_version += 1
+                self._result_cache.clear()
+        else:
+            self.publish_catalog(catalog.df_full, catalog.df_main, catalog.arrays, catalog.cold)
+
+    def add_model_listener(self, callback):
+        """
+        callback(model_sürümü) model sürümü her arttığında çağrılır. Sürüm skorlama sırasında
+        da artabildiğinden (skorlayıcı yeniden kurulumu) dinleyici skorlamayı beklememelidir.
+        """
+        if callback not in self._model_listeners:
+            self._model_listeners.append(callback)
+
+    def remove_model_listener(self, callback):
+        if callback in self._model_listeners:
+            self._model_listeners.remove(callback)
+
+    def _bump_model_version(self):
+        with self._cache_lock:
+            self.model_version += 1
+            version = self.model_version
+            self._result_cache.clear()
+        for callback in list(self._model_listeners):
+            try:
+                callback(version)
+            except Exception as e:
+                print(f"Model dinleyicisi hatası: {e}")
+
+    def on_catalog_updated(self, new_count=None):
+        """
+        Katalog dosyasına yeni olay eklendiğinde çağrılır (data_manager dinleyicisi).
+        Yeni sürüm arka planda hazırlanıp yayınlanır; o ana kadar sorgular eski görüntüyle
+        beklemeden yanıtlanır.
+        """
+        return self.refresh_catalog(background=True)
+
+    def refresh_catalog(self, background=True):
+        """
+        Katalog dosyasını yeniden okuyup yeni sürümü yayınlar. background=True ise iş
+        parçacığı döner, değilse yayınlanıp yayınlanmadığı (bool).
+        """
+        with self._cache_lock:
+            self._refresh_requested += 1
+            ticket = self._refresh_requested
+        if not background:
+            return self._refresh(ticket)
+        thread = threading.Thread(target=self._refresh, args=(ticket,), name="catalog-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def _refresh(self, ticket):
+        # Isınma ile sıralanır (ikisi de dosyayı okur); sorgular bu kilidi almaz
+        with self._warm_lock:
+            # Henüz yayınlanmış sürüm yoksa ilk warm_up dosyanın son halini zaten okuyacak;
+            # bu istekten sonra başlamış bir yenileme de öyle
+            catalog = self._catalog
+            if catalog is None or self._refresh_started >= ticket:
+                return False
+            self._refresh_started = self._refresh_requested
+            with span("risk.refresh_catalog"):
+                if catalog.cold is not None:
+                    tiers = self._ingest_tiered(catalog)
+                    if tiers is None:
+                        return False
+                    df_full, df_main, cold = tiers
+                else:
+                    df_full, df_main = self._build_frames()
+                    cold = None
+                # Sorgu dizileri ve indeks de yayından önce kurulur: ilk sorgu beklemez
+                arrays = self._build_query_arrays(df_full, df_main, cold)
+            self.publish_catalog(df_full, df_main, arrays=arrays, cold=cold)
+            return True
+
+    def _cache_get(self, key):
+        with self._cache_lock:
+            value = self._result_cache.get(key)
+            if value is None:
+                self.cache_misses += 1
+                return None
+            self._result_cache.move_to_end(key)
+            self.cache_hits += 1
+            return value
+
+    def _cache_put(self, key, value):
+        with self._cache_lock:
+            # Hesaplama sırasında sürüm değiştiyse eski sonucu saklama
+            if key[-2:] != (self.catalog_version, self.model_version):
+                return
+            self._result_cache[key] = value
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > self.result_cache_size:
+                self._result_cache.popitem(last=False)
+
+    def _cache_key(self, kind, lat, lon, *extra, catalog=None):
+        p = self.cache_precision
+        version = catalog.version if catalog is not None else self.catalog_version
+        return (kind, round(lat, p), round(lon, p)) + extra + (version, self.model_version)
+
+    def cache_info(self):
+        with self._cache_lock:
+            total = self.cache_hits + self.cache_misses
+            return {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": self.cache_hits / total if total else 0.0,
+                "size": len(self._result_cache),
+                "maxsize": self.result_cache_size,
+                "catalog_version": self.catalog_version,
+                "model_version": self.model_version,
+            }
+
+    def score_location(self, city_lat, city_lon):
+        """Bir konum için risk bileşenlerini hesaplar (önbellekli)."""
+        return self.score_many([(city_lat, city_lon)])[0]
+
+    def score_many(self, points):
+        """
+        Birden çok konumu skorlar. Önbellekte olmayanların özellikleri tek bir
+        tabloda toplanır ve kısa vadeli model (self.scorer) tek çağrıyla çalışır.
+        """
+        self.warm_up()
+        if self.scorer == "compact":
+            # Skorlayıcı önbellek anahtarlarından önce: yeniden kurulursa model sürümü artar
+            self.compact_scorer()
+        ensemble = self.ensemble_scorer() if self.ensemble_size > 1 else None
+        # Tüm sorgu tek görüntüyle çalışır; bu arada yayınlanan sürüm sonraki sorguda görülür
+        catalog = self._catalog
+        results = [None] * len(points)
+        pending = []
+        for i, (lat, lon) in enumerate(points):
+            key = self._cache_key("score", lat, lon, self.scorer, self.ensemble_size, catalog=catalog)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, lat, lon, key))
+        if not pending:
+            return results
+
+        with span("risk.short_term", points=len(pending)):
+            probas, members = self._short_term_scores(
+                [(lat, lon) for _, lat, lon, _ in pending], catalog, ensemble=ensemble
+            )
+
+        for j, ((i, lat, lon, key), proba) in enumerate(zip(pending, probas)):
+            short_risk = max(0.0, min(1.0, float(proba)))
+            with span("risk.long_term"):
+                long_hazard = self._compute_long_term_hazard(
+                    lat, lon, radius_km=200.0, mag_threshold=6.0, catalog=catalog
+                )
+            dist_fault = nearest_fault_distance(lat, lon)
+            fault_score = fault_hazard_score(dist_fault)
+            final_score = 0.4 * short_risk + 0.3 * long_hazard + 0.3 * fault_score
+
+            scores = {
+                "short_risk": short_risk,
+                "long_hazard": long_hazard,
+                "dist_fault": dist_fault,
+                "fault_score": fault_score,
+                "final_score": final_score,
+            }
+            if members is not None:
+                scores["short_risk_ensemble"] = self._ensemble_band(members[j], short_risk, final_score)
+            self._cache_put(key, scores)
+            results[i] = scores
+        return results
+
+    def city_quakes(self, city_lat, city_lon, radius_km=150.0):
+        """Konumun radius_km yarıçapındaki depremleri döner (önbellekli, değiştirilmemeli)."""
+        self.warm_up()
+        catalog = self._catalog
+        key = self._cache_key("quakes", city_lat, city_lon, radius_km, catalog=catalog)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        full_df = catalog.df_full
+        dists = haversine(city_lat, city_lon, full_df["latitude"].values, full_df["longitude"].values)
+        sub = full_df[dists <= radius_km]
+        if catalog.cold is not None:
+            # Soğuk arşivden yalnızca yarıçapa değen hücrelerin satırları okunur
+            older = catalog.cold.quakes_near(city_lat, city_lon, radius_km)
+            if older:
+                sub = concat_frames(older + [sub])
+        self._cache_put(key, sub)
+        return sub
 
     def _risk_category(self, score):
         if score < 0.25:
@@ -402,40 +1249,47 @@ class EarthquakeRiskEngine:
             return "🟠 YÜKSEK"
         return "🔴 ÇOK YÜKSEK"
 
+    def locate_city(self, city_name, country_hint="Turkey", manual_coords=None):
+        """Şehir adını (veya verilen koordinatları) (lat, lon) çiftine çevirir."""
+        if manual_coords:
+            return manual_coords
+        geo_key = (city_name.strip().lower(), country_hint)
+        if geo_key in self._geocode_cache:
+            return self._geocode_cache[geo_key]
+        if self.geolocator is None and Nominatim is not None:
+            self.geolocator = Nominatim(user_agent="eq-risk-ui")
+        if self.geolocator is None:
+            raise RuntimeError("Geocode için geopy gerekli.")
+        with span("risk.geocode"):
+            loc = self.geolocator.geocode(f"{city_name}, {country_hint}")
+        if loc is None:
+            raise RuntimeError(f"Şehir bulunamadı: {city_name}")
+        self._geocode_cache[geo_key] = (loc.latitude, loc.longitude)
+        return self._geocode_cache[geo_key]
+
+    @traced("risk.predict_city_risk")
     def predict_city_risk(self, city_name, country_hint="Turkey", manual_coords=None):
         self._check_dependencies()
-        self._prepare_frames()
-        self._train_short_model()
+        self.warm_up()
 
-        if manual_coords:
-            city_lat, city_lon = manual_coords
-        else:
-            if self.geolocator is None and Nominatim is not None:
-                self.geolocator = Nominatim(user_agent="eq-risk-ui")
-            if self.geolocator is None:
-                raise RuntimeError("Geocode için geopy gerekli.")
-            loc = self.geolocator.geocode(f"{city_name}, {country_hint}")
-            if loc is None:
-                raise RuntimeError(f"Şehir bulunamadı: {city_name}")
-            city_lat, city_lon = loc.latitude, loc.longitude
+        city_lat, city_lon = self.locate_city(city_name, country_hint, manual_coords)
 
         # Koordinatları sakla (Harita için)
         self.last_lat = city_lat
         self.last_lon = city_lon
 
-        short_risk = self._compute_short_term_ml_risk(city_lat, city_lon)
-        long_hazard = self._compute_long_term_hazard(
-            city_lat, city_lon, radius_km=200.0, mag_threshold=6.0
-        )
-        dist_fault = nearest_fault_distance(city_lat, city_lon)
-        fault_score = fault_hazard_score(dist_fault)
-
-        final_score = 0.4 * short_risk + 0.3 * long_hazard + 0.3 * fault_score
+        scores = self.score_location(city_lat, city_lon)
+        short_risk = scores["short_risk"]
+        long_hazard = scores["long_hazard"]
+        dist_fault = scores["dist_fault"]
+        fault_score = scores["fault_score"]
+        final_score = scores["final_score"]
 
         short_cat = self._risk_category(short_risk)
         long_cat = self._risk_category(long_hazard)
         fault_cat = self._risk_category(fault_score)
         final_cat = self._risk_category(final_score)
+        band = scores.get("short_risk_ensemble")
 
         summary = [
             f"📍 Şehir: {city_name}",
@@ -445,4 +1299,11 @@ class EarthquakeRiskEngine:
             f"Fay Segment Riski (mesafe {dist_fault:.1f} km): {fault_cat}",
             f"Nihai Risk Skoru: {final_score*100:.2f}%  {final_cat}",
         ]
+        if band is not None:
+            summary.insert(3, f"  Belirsizlik ({band['members']} üye): %90 aralık {band['q05']*100:.2f}% - "
+                              f"{band['q95']*100:.2f}%, yayılım ±{band['std']*100:.2f}")
+            summary.append(
+                f"  Nihai skor aralığı: {band['final_low']*100:.2f}% - {band['final_high']*100:.2f}%, "
+                f"üyelerin %{band['category_agreement']*100:.0f}'i aynı kategoride"
+            )
         return "\n".join(summary)
@@ -0,0 +1,85 @@
+import argparse
+import os
+
+import numpy as np
+
+from compact_scorer import _time_calls
+from model_training import BOOTSTRAP_BLOCKS, ENSEMBLE_MEMBERS
+from risk_engine import SCORERS, EarthquakeRiskEngine
+from synthetic_catalog import synthetic_locations
+
+
+def member_agreement(member_probas):
+    """Üyeler arası uyum: ikili Spearman korelasyonlarının ortalaması ve en küçüğü, ortalama yayılım."""
+    from scipy.stats import rankdata
+
+    p = np.asarray(member_probas, dtype=np.float64)
+    k = p.shape[1]
+    if k < 2:
+        return {"spearman_mean": float("nan"), "spearman_min": float("nan"), "std_mean": 0.0}
+    # Sıra korelasyonu: üye sütunlarının sıralarının Pearson korelasyonu
+    pairs = np.corrcoef(rankdata(p, axis=0).T)[np.triu_indices(k, 1)]
+    return {
+        "spearman_mean": float(np.mean(pairs)),
+        "spearman_min": float(np.min(pairs)),
+        "std_mean": float(p.std(axis=1, ddof=1).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Kısa vadeli model için önyükleme topluluğu: eğitim süresi, üye uyumu ve gecikme")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--members", type=int, default=ENSEMBLE_MEMBERS)
+    parser.add_argument("--blocks", type=int, default=BOOTSTRAP_BLOCKS, help="Önyükleme zaman bloğu sayısı")
+    parser.add_argument("--workers", type=int, default=None, help="Eğitim süreci sayısı")
+    parser.add_argument("--scorer", choices=SCORERS, default="full")
+    parser.add_argument("--points", type=int, default=2000, help="Uyum için rastgele sorgu noktası")
+    parser.add_argument("--single", type=int, default=200, help="Tek satır gecikmesi için çağrı sayısı")
+    parser.add_argument("--batch", type=int, default=1000, help="Toplu gecikme için nokta sayısı")
+    args = parser.parse_args()
+
+    engine = EarthquakeRiskEngine(csv_path=args.csv, cache_dir=args.cache_dir or None)
+    engine.scorer = args.scorer
+    engine.ensemble_size = args.members
+    engine.ensemble_params = {"n_blocks": args.blocks} if args.blocks != BOOTSTRAP_BLOCKS else {}
+    engine.ensemble_workers = args.workers
+    engine.warm_up()
+    ensemble = engine.ensemble_scorer()
+    report = engine.ensemble_report or {}
+    fits = [m["fit_seconds"] for m in report.get("members", []) if "fit_seconds" in m]
+    print(f"Topluluk: {ensemble.info()}; tek model {engine.model.tree_count_} ağaç")
+    if fits:
+        print(f"  eğitim {report['seconds']:.2f} sn ({report['workers']} süreç; üye ort {np.mean(fits):.2f} sn, "
+              f"toplam {np.sum(fits):.2f} sn), {report['n_blocks']} blok, {report['iterations']} iterasyon")
+
+    locs = synthetic_locations(args.points, seed=12345)
+    points = list(zip(locs["latitude"], locs["longitude"]))
+    probas, members = engine._short_term_scores(points, ensemble=ensemble)
+    a = member_agreement(members)
+    mean = members.mean(axis=1)
+    gap = np.abs(mean - probas)
+    print(f"Üye uyumu ({len(points)} sorgu noktası): ikili Spearman ort {a['spearman_mean']:.4f} "
+          f"min {a['spearman_min']:.4f}, ortalama yayılım (std) {a['std_mean']:.4f}")
+    print(f"  topluluk ortalaması - tek model |fark| ort {gap.mean():.4f} max {gap.max():.4f}")
+
+    # Gecikme: özellik çıkarımı dahil kısa vadeli skor (sonuç önbelleği devre dışı)
+    single = [([p],) for p in points[:args.single]]
+    batch = points[:args.batch]
+    print(f"Gecikme ({args.scorer} skorlayıcı, özellikler dahil):")
+    base = {}
+    for name, ens in (("tek model", None), ("topluluk", ensemble)):
+        engine._short_term_scores(single[0][0], ensemble=ens)
+        one = _time_calls(lambda pts: engine._short_term_scores(pts, ensemble=ens), single)
+        many = _time_calls(lambda pts: engine._short_term_scores(pts, ensemble=ens), [(batch,)] * 5)
+        extra = ""
+        if base:
+            extra = f"  (+{(one / base['one'] - 1) * 100:.0f}% / +{(many / base['many'] - 1) * 100:.0f}%)"
+        else:
+            base = {"one": one, "many": many}
+        print(f"  {name:<10} tek satır {one * 1e3:.3f} ms, {len(batch)} nokta {many * 1e3:.1f} ms{extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from risk_engine import SCORERS, EarthquakeRiskEngine
+from watchlist import IMPACT_RADIUS_KM, Watchlist
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class MicroBatcher:
+    """
+    Eşzamanlı tekil istekleri toplayıp tek bir engine.score_many çağrısında skorlar.
+    İlk istek geldikten sonra en fazla max_wait_ms beklenir veya max_batch dolunca çalışılır.
+    """
+
+    def __init__(self, engine, max_batch=64, max_wait_ms=5.0):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.batched_points = 0
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, lat, lon):
+        future = Future()
+        self.requests.put((lat, lon, future))
+        return future
+
+    def _loop(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                scores = self.engine.score_many([(lat, lon) for lat, lon, _ in batch])
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.batched_points += len(batch)
+            for (_, _, future), result in zip(batch, scores):
+                future.set_result(result)
+
+
+def format_scores(engine, lat, lon, scores, name=None):
+    out = {
+        "latitude": lat,
+        "longitude": lon,
+        "short_risk": scores["short_risk"],
+        "long_hazard": scores["long_hazard"],
+        "distance_to_fault_km": float(scores["dist_fault"]),
+        "fault_score": scores["fault_score"],
+        "final_score": scores["final_score"],
+        "category": engine._risk_category(scores["final_score"]),
+    }
+    if "short_risk_ensemble" in scores:
+        out["short_risk_ensemble"] = scores["short_risk_ensemble"]
+    if name is not None:
+        out["name"] = name
+    return out
+
+
+class RiskRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive için HTTP/1.1 (her yanıtta Content-Length gönderiliyor)
+    protocol_version = "HTTP/1.1"
+    server_version = "EqRiskServer/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            return {}
+        payload = json.loads(self.rfile.read(length).decode("utf-8"))
+        if not isinstance(payload, dict):
+            raise ValueError("JSON gövdesi bir nesne olmalı.")
+        return payload
+
+    @staticmethod
+    def _items(payload, key):
+        items = payload.get(key, [])
+        if not isinstance(items, list):
+            raise ValueError(f"{key} bir liste olmalı.")
+        return items
+
+    def _resolve_point(self, item):
+        # {"lat": .., "lon": ..} veya {"city": "İzmir"} kabul edilir
+        if not isinstance(item, dict):
+            raise ValueError("Her nokta bir nesne olmalı.")
+        engine = self.server.engine
+        if "lat" in item and "lon" in item:
+            try:
+                return float(item["lat"]), float(item["lon"]), item.get("name")
+            except TypeError:
+                raise ValueError("lat/lon sayı olmalı.") from None
+        if item.get("city"):
+            lat, lon = engine.locate_city(item["city"], item.get("country", "Turkey"))
+            return lat, lon, item["city"]
+        raise ValueError("lat/lon veya city alanı gerekli.")
+
+    def _add_sites(self, items):
+        rows = []
+        for item in items:
+            lat, lon, name = self._resolve_point(item)
+            rows.append({"name": name or f"{lat:.4f},{lon:.4f}", "latitude": lat, "longitude": lon,
+                         "radius_km": float(item.get("radius_km", IMPACT_RADIUS_KM))})
+        if not rows:
+            raise ValueError("sites listesi boş.")
+        return self.server.watchlist.add_sites(pd.DataFrame(rows))
+
+    def _score_point(self, item):
+        lat, lon, name = self._resolve_point(item)
+        scores = self.server.batcher.submit(lat, lon).result(timeout=self.server.request_timeout)
+        return format_scores(self.server.engine, lat, lon, scores, name)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            if url.path == "/health":
+                engine = self.server.engine
+                self._send_json(200, {
+                    "status": "ok",
+                    "cache": engine.cache_info(),
+                    "batches": self.server.batcher.batches,
+                    "batched_points": self.server.batcher.batched_points,
+                })
+            elif url.path == "/risk":
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self._send_json(200, self._score_point(params))
+            elif url.path == "/watchlist":
+                watch = self.server.watchlist
+                self._send_json(200, {
+                    "sites": watch.snapshot().to_dict(orient="records"),
+                    "last_update": watch.last_update,
+                })
+            elif url.path == "/alerts":
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                self._send_json(200, {"alerts": self.server.watchlist.recent_alerts(int(params.get("limit", 100)))})
+            else:
+                self._send_json(404, {"error": "Bulunamadı"})
+        except ValueError as exc:
+            self._send_json(400, {"error": str(exc)})
+        except Exception as exc:
+            self._send_json(500, {"error": str(exc)})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            payload = self._read_json()
+            if url.path == "/risk":
+                self._send_json(200, self._score_point(payload))
+            elif url.path == "/risk/batch":
+                points = [self._resolve_point(item) for item in self._items(payload, "points")]
+                engine = self.server.engine
+                scores = engine.score_many([(lat, lon) for lat, lon, _ in points])
+                self._send_json(200, {"results": [
+                    format_scores(engine, lat, lon, s, name) for (lat, lon, name), s in zip(points, scores)
+                ]})
+            elif url.path == "/watchlist":
+                # İzlenecek siteler: {"sites": [{"name": .., "lat": .., "lon": .., "radius_km": ..}]}
+                self._send_json(200, {"added": self._add_sites(self._items(payload, "sites"))})
+            else:
+                self._send_json(404, {"error": "Bulunamadı"})
+        except (ValueError, KeyError, json.JSONDecodeError) as exc:
+            self._send_json(400, {"error": str(exc)})
+        except Exception as exc:
+            self._send_json(500, {"error": str(exc)})
+
+
+class RiskServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, engine, max_batch=64, max_wait_ms=5.0, request_timeout=30.0, verbose=False):
+        super().__init__(address, RiskRequestHandler)
+        self.engine = engine
+        self.batcher = MicroBatcher(engine, max_batch=max_batch, max_wait_ms=max_wait_ms)
+        # İzleme listesi: katalog yayınlarında etkilenen siteler, model güncellemesinde tümü yeniden skorlanır
+        self.watchlist = Watchlist(engine).attach()
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+
+
+def _ingest_loop(csv_path, interval, stop):
+    # Canlı veri alımı: yeni olaylar data_manager dinleyicisiyle motora, oradan izleme listesine ulaşır
+    from data_manager import fetch_and_update_data
+
+    while not stop.wait(interval):
+        try:
+            fetch_and_update_data(csv_path=csv_path)
+        except Exception as e:
+            print(f"Veri güncelleme hatası: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel HTTP risk skorlama servisi")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--csv", default="assets/query.csv")
+    parser.add_argument("--scorer", choices=SCORERS, default="full",
+                        help="Kısa vadeli skorlayıcı: full (CatBoost) veya compact (NumPy ağaçları)")
+    parser.add_argument("--ensemble", type=int, default=0,
+                        help="Belirsizlik bandı için önyükleme topluluğu üye sayısı (0: kapalı)")
+    parser.add_argument("--watch-sites", default=None,
+                        help="İzleme listesine eklenecek name,latitude,longitude[,radius_km] CSV'si")
+    parser.add_argument("--ingest-interval", type=float, default=0,
+                        help="Canlı veri çekme aralığı (sn, 0: kapalı); yeni olaylar izleme listesini günceller")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    engine = EarthquakeRiskEngine(csv_path=args.csv)
+    engine.scorer = args.scorer
+    engine.ensemble_size = args.ensemble
+    engine.warm_up()
+    print(f"Motor hazır: {time.perf_counter() - t0:.2f} sn")
+
+    server = RiskServer(
+        (args.host, args.port), engine,
+        max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, verbose=args.verbose,
+    )
+    if args.watch_sites:
+        t0 = time.perf_counter()
+        n = server.watchlist.add_sites(pd.read_csv(args.watch_sites))
+        print(f"İzleme listesi: {n} site ({time.perf_counter() - t0:.2f} sn)")
+    stop = threading.Event()
+    if args.ingest_interval > 0:
+        from data_manager import add_update_listener
+        add_update_listener(engine.on_catalog_updated)
+        threading.Thread(target=_ingest_loop, args=(args.csv, args.ingest_interval, stop), daemon=True).start()
+    print(f"Dinleniyor: http://{args.host}:{args.port}  (GET /health, GET|POST /risk, POST /risk/batch, "
+          f"GET|POST /watchlist, GET /alerts)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
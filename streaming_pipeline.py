@@ -0,0 +1,343 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from catalog_io import CATALOG_DTYPES, iter_catalog_chunks, peak_rss_mb
+from declustering import AFTERSHOCK, MAIN, event_times_ns, candidate_pairs, resolve_statuses
+from features import (
+    EventIndex, FEATURE_RADIUS_KM, FEATURE_WINDOWS_DAYS, compute_window_features, to_epoch_seconds,
+)
+from risk_engine import RISK_FEATURE_COLUMNS, add_fault_distance, add_time_features
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# _prepare_frames ile aynı ayarlar
+DECLUSTER_DAYS = 1.0
+DECLUSTER_KM = 50.0
+LABEL_MAG = 4.0
+LABEL_HORIZON_DAYS = 30
+LABEL_KM = 100.0
+DEFAULT_CHUNK_ROWS = 500_000
+EVENT_COLUMNS = ["time", "latitude", "longitude", "mag"]
+
+
+def _naive_times(series):
+    # tz'li UTC sütunu -> karşılaştırılabilir datetime64[ms] dizisi
+    return series.dt.tz_convert(None).to_numpy().astype("datetime64[ms]")
+
+
+class ParquetSink:
+    """
+    Parçaları tek bir Parquet dosyasına satır grupları olarak ekler. Kategorik sütunlar
+    parçadan parçaya farklı sözlükler taşıyabildiği için düz metin (string) yazılır;
+    read_prepared kategorik tipi geri yükler.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        if df.empty:
+            return
+        df = df.copy()
+        for col in CATALOG_DTYPES:
+            if col in df and CATALOG_DTYPES[col] == "category":
+                df[col] = df[col].astype("string")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = table.cast(self.writer.schema)
+        self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def read_prepared(path, columns=None):
+    """
+    StreamingPreparer çıktısını okur; metin olarak yazılan kategorik sütunlar (magType, net,
+    status) yeniden category tipine çevrilir, böylece tipler _build_frames ile aynıdır.
+    """
+    df = pq.read_table(path, columns=columns).to_pandas()
+    for col, dtype in CATALOG_DTYPES.items():
+        if dtype == "category" and col in df:
+            df[col] = df[col].astype(object).astype("category")
+    return df
+
+
+def external_sort(csv_path, work_dir, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Katalogu zamana göre sıralı parçalara (run) böler.
+    (yol, en erken zaman, en geç zaman) üçlülerinin listesini döner.
+    """
+    runs = []
+    for k, chunk in enumerate(iter_catalog_chunks(csv_path, chunk_rows=chunk_rows)):
+        chunk = chunk.dropna(subset=["time"]).sort_values("time", kind="stable")
+        if chunk.empty:
+            continue
+        path = os.path.join(work_dir, f"run-{k:05d}.parquet")
+        sink = ParquetSink(path)
+        sink.write(chunk)
+        sink.close()
+        times = _naive_times(chunk["time"])
+        runs.append((path, times[0], times[-1]))
+    return runs
+
+
+def _read_run(path):
+    return pq.read_table(path).to_pandas()
+
+
+def iter_sorted_chunks(runs, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Sıralı run dosyalarını zaman sırasıyla ~chunk_rows satırlık parçalar halinde üretir.
+    Zaman aralıkları çakışmıyorsa (dosya zaten artan/azalan sıralıysa) run'lar sırayla okunur;
+    aksi halde k-yollu birleştirme yapılır ve her run'dan en fazla chunk_rows / run_sayısı satır tutulur.
+    """
+    ordered = sorted(runs, key=lambda r: r[1])
+    if all(a[2] <= b[1] for a, b in zip(ordered, ordered[1:])):
+        for path, _, _ in ordered:
+            yield _read_run(path)
+        return
+
+    batch_rows = max(1, chunk_rows // max(1, len(runs)))
+    iters = [pq.ParquetFile(path).iter_batches(batch_size=batch_rows) for path, _, _ in runs]
+    buffers = [None] * len(iters)
+    times = [None] * len(iters)
+
+    def refill(i):
+        while buffers[i] is None or buffers[i].empty:
+            try:
+                buffers[i] = pa.Table.from_batches([next(iters[i])]).to_pandas()
+            except StopIteration:
+                buffers[i] = times[i] = None
+                return
+        times[i] = _naive_times(buffers[i]["time"])
+
+    for i in range(len(iters)):
+        refill(i)
+
+    pending = []
+    pending_rows = 0
+    while any(b is not None for b in buffers):
+        # Tampon sonlarının en küçüğüne kadar olan satırların sırası kesinleşmiştir
+        boundary = min(t[-1] for t in times if t is not None)
+        parts = []
+        for i, buf in enumerate(buffers):
+            if buf is None or times[i][0] > boundary:
+                continue
+            n = int(np.searchsorted(times[i], boundary, side="right"))
+            parts.append(buf.iloc[:n])
+            buffers[i] = buf.iloc[n:]
+            times[i] = times[i][n:]
+            if buffers[i].empty:
+                refill(i)
+        merged = pd.concat(parts, ignore_index=True).sort_values("time", kind="stable")
+        pending.append(merged)
+        pending_rows += len(merged)
+        if pending_rows >= chunk_rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending = []
+            pending_rows = 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+class StreamingPreparer:
+    """
+    _prepare_frames'in parça parça çalışan karşılığı.
+
+    Parçalar arasında taşınan durum, katalog boyutundan bağımsız olarak zaman pencereleriyle sınırlıdır:
+      - ayıklama: son DECLUSTER_DAYS gündeki ana şoklar,
+      - yerel pencere özellikleri: son max(FEATURE_WINDOWS_DAYS) gündeki ana şoklar,
+      - etiket: ufku (LABEL_HORIZON_DAYS) henüz kapanmamış ana şoklar.
+    Sonuçlar parça işlendikçe out_dir altındaki Parquet dosyalarına yazılır.
+    """
+
+    def __init__(self, out_dir, chunk_rows=DEFAULT_CHUNK_ROWS, work_dir=None):
+        if pa is None:
+            raise RuntimeError("pyarrow paketi yüklü olmalı.")
+        self.out_dir = out_dir
+        self.chunk_rows = chunk_rows
+        self.work_dir = work_dir
+        self.full_path = os.path.join(out_dir, "catalog_full.parquet")
+        self.main_path = os.path.join(out_dir, "training_main.parquet")
+
+        self.seq = 0
+        self.t_start = None
+        self.last_sec = None
+        self.decluster_state = None
+        self.feature_state = None
+        self.pending = None
+        self.chunks = 0
+
+    # --- AŞAMALAR ---
+
+    def _decluster(self, chunk):
+        """Parçadaki olaylar için is_aftershock; önceki parçanın son ana şokları da dikkate alınır."""
+        carry = self.decluster_state
+        n_carry = 0 if carry is None else len(carry)
+        events = chunk[EVENT_COLUMNS]
+        if carry is not None:
+            events = pd.concat([carry, events], ignore_index=True)
+        pair_i, pair_j = candidate_pairs(
+            event_times_ns(events["time"]),
+            events["latitude"].to_numpy(dtype=float),
+            events["longitude"].to_numpy(dtype=float),
+            events["mag"].to_numpy(dtype=float),
+            np.arange(n_carry, len(events)),
+            time_window_days=DECLUSTER_DAYS,
+            space_window_km=DECLUSTER_KM,
+        )
+        # Taşınan olaylar ana şoktur; parçadakiler öncüllerine göre zaman sırasıyla çözülür
+        status = np.zeros(len(events), dtype=np.int8)
+        status[:n_carry] = MAIN
+        status = resolve_statuses(status, pair_i, pair_j)
+
+        is_aftershock = status[n_carry:] == AFTERSHOCK
+        mains = events[status == MAIN]
+        cut = self.last_sec - int(DECLUSTER_DAYS * 86400)
+        self.decluster_state = mains[to_epoch_seconds(mains["time"]) >= cut].reset_index(drop=True)
+        return is_aftershock
+
+    def _add_features(self, main):
+        """Yerel pencere, zaman ve fay özellikleri; geçmiş pencere önceki parçalardan taşınır."""
+        history = self.feature_state
+        events = main[EVENT_COLUMNS]
+        if history is not None:
+            events = pd.concat([history, events], ignore_index=True)
+        feats = compute_window_features(
+            events["time"], events["latitude"].to_numpy(), events["longitude"].to_numpy(),
+            events["mag"].to_numpy(),
+            main["time"], main["latitude"].to_numpy(), main["longitude"].to_numpy(),
+            radius_km=FEATURE_RADIUS_KM,
+        )
+        for name, values in feats.items():
+            main[name] = values
+        cut = self.last_sec - int(max(FEATURE_WINDOWS_DAYS) * 86400)
+        self.feature_state = events[to_epoch_seconds(events["time"]) >= cut].reset_index(drop=True)
+
+        main = add_time_features(main, self.t_start)
+        return add_fault_distance(main, lat_col="latitude", lon_col="longitude")
+
+    def _release_labelled(self, final=False):
+        """Ufku kapanmış ana şokları etiketleyip döner; kalanlar sonraki parçayı bekler."""
+        pending = self.pending
+        if pending is None or pending.empty:
+            return None
+        big = pending[pending["mag"] >= LABEL_MAG]
+        label = np.zeros(len(pending), dtype=int)
+        if len(big):
+            index = EventIndex(big["time"], big["latitude"].to_numpy(),
+                               big["longitude"].to_numpy(), big["mag"].to_numpy(), radius_km=LABEL_KM)
+            horizon_end = pending["time"] + pd.Timedelta(days=LABEL_HORIZON_DAYS)
+            seq = pending["_seq"].to_numpy()
+            big_seq = big["_seq"].to_numpy()
+            for q, e, _ in index.pairs(horizon_end, pending["latitude"].to_numpy(),
+                                       pending["longitude"].to_numpy(), LABEL_HORIZON_DAYS,
+                                       include_self=True):
+                hit = q[big_seq[e] > seq[q]]
+                label[hit] = 1
+        pending = pending.assign(label_30d=label)
+
+        if final:
+            done = np.ones(len(pending), dtype=bool)
+        else:
+            # Son görülen olay zamanı ufku geçmediyse daha sonraki parçada aynı anda olay gelebilir
+            done = to_epoch_seconds(pending["time"]) + LABEL_HORIZON_DAYS * 86400 < self.last_sec
+        self.pending = pending[~done].drop(columns="label_30d").reset_index(drop=True)
+        return pending[done]
+
+    # --- ÇALIŞTIRMA ---
+
+    def process_chunk(self, chunk, full_sink, main_sink):
+        chunk = chunk.reset_index(drop=True)
+        chunk["_seq"] = np.arange(self.seq, self.seq + len(chunk))
+        self.seq += len(chunk)
+        if self.t_start is None:
+            self.t_start = chunk["time"].iloc[0]
+        self.last_sec = int(to_epoch_seconds(chunk["time"])[-1])
+
+        chunk["is_aftershock"] = self._decluster(chunk)
+        full_sink.write(chunk.drop(columns="_seq"))
+
+        main = chunk[~chunk["is_aftershock"]].reset_index(drop=True)
+        main = self._add_features(main)
+        self.pending = main if self.pending is None else pd.concat([self.pending, main], ignore_index=True)
+        self._write_main(self._release_labelled(), main_sink)
+        self.chunks += 1
+
+    def _write_main(self, done, main_sink):
+        if done is None or done.empty:
+            return
+        done = done.dropna(subset=RISK_FEATURE_COLUMNS).drop(columns="_seq")
+        main_sink.write(done)
+
+    def run(self, csv_path, progress=True):
+        """CSV'yi sıralayıp parça parça işler; özet sözlüğü döner."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        t0 = time.perf_counter()
+        work_dir = tempfile.mkdtemp(prefix="eq_sort_", dir=self.work_dir)
+        full_sink = ParquetSink(self.full_path)
+        main_sink = ParquetSink(self.main_path)
+        try:
+            runs = external_sort(csv_path, work_dir, chunk_rows=self.chunk_rows)
+            sort_seconds = time.perf_counter() - t0
+            for chunk in iter_sorted_chunks(runs, chunk_rows=self.chunk_rows):
+                self.process_chunk(chunk, full_sink, main_sink)
+                if progress:
+                    print(f"  parça {self.chunks}: {self.seq} olay, {main_sink.rows} etiketli ana şok, "
+                          f"{time.perf_counter() - t0:.1f} sn")
+            self._write_main(self._release_labelled(final=True), main_sink)
+        finally:
+            full_sink.close()
+            main_sink.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return {
+            "events": self.seq,
+            "main_events": main_sink.rows,
+            "chunks": self.chunks,
+            "runs": len(runs),
+            "sort_seconds": sort_seconds,
+            "seconds": time.perf_counter() - t0,
+            "peak_rss_mb": peak_rss_mb(),
+            "full_path": self.full_path,
+            "main_path": self.main_path,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Büyük kataloglar için parça parça (out-of-core) hazırlık")
+    parser.add_argument("csv", nargs="?", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--out-dir", default="prepared")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Bellekte aynı anda tutulacak en fazla olay sayısı (parça boyu)")
+    parser.add_argument("--work-dir", default=None, help="Geçici sıralama dosyaları için dizin")
+    args = parser.parse_args()
+
+    summary = StreamingPreparer(args.out_dir, chunk_rows=args.chunk_rows, work_dir=args.work_dir).run(args.csv)
+    print(
+        f"{summary['events']} olay, {summary['main_events']} ana şok, {summary['chunks']} parça "
+        f"({summary['runs']} sıralama dosyası, {summary['sort_seconds']:.1f} sn): "
+        f"{summary['seconds']:.1f} sn, tepe RSS {summary['peak_rss_mb'] or float('nan'):.0f} MB"
+    )
+    print(f"  -> {summary['full_path']}\n  -> {summary['main_path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import FAULT_POINTS
+
+# Türkiye ve çevresini kapsayan kutu (lat_min, lat_max, lon_min, lon_max)
+TURKEY_BOUNDS = (35.5, 42.5, 25.5, 45.0)
+
+
+def gutenberg_richter(rng, n, b_value=1.0, m_min=1.5, m_max=8.0):
+    """Gutenberg-Richter dağılımından (kesilmiş üstel) büyüklük örnekler."""
+    beta = b_value * np.log(10)
+    # Üst sınırlı üstel dağılımın ters CDF'i
+    u = rng.random(n)
+    c = 1 - np.exp(-beta * (m_max - m_min))
+    return m_min - np.log(1 - u * c) / beta
+
+
+def generate_catalog(
+    n_events,
+    seed=42,
+    start="1990-01-01",
+    years=30.0,
+    bounds=TURKEY_BOUNDS,
+    b_value=1.0,
+    m_min=2.0,
+    aftershock_fraction=0.4,
+    omori_c_days=0.05,
+    omori_p=1.2,
+):
+    """
+    Yaklaşık n_events olaylık sentetik bir katalog üretir.
+    - Arka plan depremleri fay noktaları çevresinde kümelenir (bir kısmı bölgeye düzgün dağılır)
+    - Büyüklükler Gutenberg-Richter dağılımından gelir
+    - Artçı dizileri Omori-Utsu zaman dağılımı ve büyüklüğe bağlı üretkenlikle eklenir
+    Çıktı query.csv ile aynı temel sütunlara sahip, zamana göre sıralı bir DataFrame'dir.
+    """
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = bounds
+    total_days = years * 365.25
+
+    n_after = int(n_events * aftershock_fraction)
+    n_bg = max(n_events - n_after, 1)
+
+    # 1. Arka plan (ana) depremler
+    bg_t = rng.random(n_bg) * total_days
+    bg_m = gutenberg_richter(rng, n_bg, b_value=b_value, m_min=m_min)
+    faults = np.array(FAULT_POINTS)
+    on_fault = rng.random(n_bg) < 0.7
+    anchor = faults[rng.integers(0, len(faults), n_bg)]
+    bg_lat = np.where(on_fault, anchor[:, 0] + rng.normal(0, 0.3, n_bg), rng.uniform(lat_min, lat_max, n_bg))
+    bg_lon = np.where(on_fault, anchor[:, 1] + rng.normal(0, 0.3, n_bg), rng.uniform(lon_min, lon_max, n_bg))
+
+    # 2. Artçılar: üretkenlik ~ 10^(alpha * (M - m_min)), alpha=0.8
+    productivity = 10 ** (0.8 * (bg_m - m_min))
+    if n_after > 0:
+        parents = rng.choice(n_bg, size=n_after, p=productivity / productivity.sum())
+        u = rng.random(n_after)
+        # Omori-Utsu ters CDF (sonsuz ufuk için p>1)
+        dt = omori_c_days * ((1 - u) ** (-1.0 / (omori_p - 1)) - 1)
+        dt = np.minimum(dt, 365.0)
+        parent_m = bg_m[parents]
+        # Artçı büyüklükleri ana şokun altında kalsın (Båth yasası ~1.2 fark)
+        af_m = gutenberg_richter(rng, n_after, b_value=b_value, m_min=m_min)
+        af_m = np.minimum(af_m, np.maximum(parent_m - 1.2, m_min))
+        # Kırılma uzunluğu ölçeğinde saçılma (km)
+        sigma_km = np.clip(10 ** (0.5 * parent_m - 1.8), 1.0, 100.0)
+        af_lat = bg_lat[parents] + rng.normal(0, 1, n_after) * sigma_km / 111.2
+        af_lon = bg_lon[parents] + rng.normal(0, 1, n_after) * sigma_km / (
+            111.2 * np.cos(np.radians(bg_lat[parents]))
+        )
+        af_t = bg_t[parents] + dt
+    else:
+        af_lat = af_lon = af_t = af_m = np.zeros(0)
+
+    t_days = np.concatenate([bg_t, af_t])
+    lat = np.clip(np.concatenate([bg_lat, af_lat]), lat_min, lat_max)
+    lon = np.clip(np.concatenate([bg_lon, af_lon]), lon_min, lon_max)
+    mag = np.round(np.concatenate([bg_m, af_m]), 1)
+    depth = np.round(np.clip(rng.gamma(2.0, 5.0, len(mag)), 0.0, 60.0), 1)
+
+    order = np.argsort(t_days, kind="stable")
+    times = pd.Timestamp(start, tz="UTC") + pd.to_timedelta(t_days[order], unit="D")
+    df = pd.DataFrame(
+        {
+            "time": times.floor("s"),
+            "latitude": np.round(lat[order], 4),
+            "longitude": np.round(lon[order], 4),
+            "depth": depth[order],
+            "mag": mag[order],
+            "magType": "ml",
+            "place": "SENTETIK",
+            "type": "earthquake",
+            "status": "automatic",
+        }
+    )
+    return df
+
+
+def synthetic_locations(n, seed=0, bounds=TURKEY_BOUNDS):
+    """Sorgu yükü için kutu içinde (kenarlardan biraz içeride) n adet rastgele nokta."""
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = bounds
+    return pd.DataFrame({
+        "name": [f"nokta_{i}" for i in range(n)],
+        "latitude": rng.uniform(lat_min + 0.5, lat_max - 1.0, n),
+        "longitude": rng.uniform(lon_min + 0.5, lon_max - 0.5, n),
+    })
+
+
+def write_catalog_csv(df, path):
+    """Katalogu query.csv ile aynı zaman formatında yazar."""
+    out = df.copy()
+    out["time"] = out["time"].dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    out.to_csv(path, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentetik deprem katalogu üret")
+    parser.add_argument("n_events", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--years", type=float, default=30.0)
+    args = parser.parse_args()
+    catalog = generate_catalog(args.n_events, seed=args.seed, years=args.years)
+    write_catalog_csv(catalog, args.output)
+    print(f"{len(catalog)} olay yazıldı: {args.output}")
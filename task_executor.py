@@ -0,0 +1,150 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """Görev kullanıcı tarafından iptal edildiğinde fırlatılır."""
+
+
+class Task:
+    """
+    Havuzda çalışan tek bir işin tanıtıcısı.
+    İş fonksiyonu ilk argüman olarak bu nesneyi alır; task.progress(...) ile ilerleme
+    bildirir, task.check_cancelled() ile aşama aralarında iptal olup olmadığını kontrol eder.
+    """
+
+    def __init__(self, task_id, name, events):
+        self.id = task_id
+        self.name = name
+        self.future = None
+        self.message = "Sırada"
+        self.fraction = 0.0
+        self._cancel_event = threading.Event()
+        self._events = events
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        # Henüz başlamadıysa havuzdan hiç çalışmadan düşer
+        if self.future is not None and self.future.cancel():
+            self._events.put(("cancelled", self, None))
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise TaskCancelled(self.name)
+
+    def progress(self, message, fraction=None):
+        self.check_cancelled()
+        self._events.put(("progress", self, (message, fraction)))
+
+
+class TaskExecutor:
+    """
+    Tk arayüzü için iş yürütücü.
+    İşler bir thread havuzunda paralel çalışır; sonuç, hata ve ilerleme olayları
+    bir kuyruğa yazılır ve root.after ile ana döngüde boşaltılır. Böylece tüm
+    arayüz geri çağrıları (log, messagebox, buton durumları) ana thread'de çalışır.
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-task")
+        self.events = queue.Queue()
+        self.tasks = {}
+        self._callbacks = {}
+        self._ids = itertools.count(1)
+        self._closed = False
+        self.root.after(self.poll_ms, self._drain)
+
+    def submit(self, fn, *args, name=None, on_done=None, on_error=None, on_progress=None, on_finish=None, **kwargs):
+        """
+        fn(task, *args, **kwargs) işini havuza gönderir ve Task döner.
+        on_done(sonuç), on_error(hata), on_progress(task) ve on_finish(task) ana thread'de çağrılır.
+        """
+        task = Task(next(self._ids), name or getattr(fn, "__name__", "görev"), self.events)
+        self.tasks[task.id] = task
+        self._callbacks[task.id] = (on_done, on_error, on_progress, on_finish)
+
+        def run():
+            if task.cancelled:
+                self.events.put(("cancelled", task, None))
+                return
+            self.events.put(("progress", task, ("Çalışıyor", 0.0)))
+            try:
+                result = fn(task, *args, **kwargs)
+            except TaskCancelled:
+                self.events.put(("cancelled", task, None))
+            except Exception as exc:
+                self.events.put(("error", task, exc))
+            else:
+                kind = "cancelled" if task.cancelled else "done"
+                self.events.put((kind, task, result))
+
+        task.future = self.pool.submit(run)
+        if on_progress:
+            on_progress(task)
+        return task
+
+    def cancel(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is not None:
+            task.cancel()
+
+    def cancel_all(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    def active_count(self):
+        return len(self.tasks)
+
+    def _drain(self):
+        try:
+            while True:
+                kind, task, payload = self.events.get_nowait()
+                self._dispatch(kind, task, payload)
+        except queue.Empty:
+            pass
+        if not self._closed:
+            self.root.after(self.poll_ms, self._drain)
+
+    def _dispatch(self, kind, task, payload):
+        callbacks = self._callbacks.get(task.id)
+        if callbacks is None:
+            # İptal edilip sonlandırılmış görevin geç gelen olayı
+            return
+        on_done, on_error, on_progress, on_finish = callbacks
+
+        if kind == "progress":
+            message, fraction = payload
+            task.message = message
+            if fraction is not None:
+                task.fraction = fraction
+            if on_progress:
+                on_progress(task)
+            return
+
+        self.tasks.pop(task.id, None)
+        self._callbacks.pop(task.id, None)
+        if kind == "done":
+            task.message = "Tamamlandı"
+            if on_done:
+                on_done(payload)
+        elif kind == "error":
+            task.message = "Hata"
+            if on_error:
+                on_error(payload)
+        else:
+            task.message = "İptal edildi"
+        if on_finish:
+            on_finish(task)
+
+    def shutdown(self):
+        self._closed = True
+        self.cancel_all()
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import DEFAULT_LOCATIONS, WalkForwardBacktest
+from synthetic_catalog import generate_catalog, write_catalog_csv
+
+
+@pytest.fixture(scope="module")
+def backtest(tmp_path_factory):
+    path = tmp_path_factory.mktemp("catalog") / "query.csv"
+    write_catalog_csv(generate_catalog(3000, seed=3, start="2015-01-01", years=4.0), path)
+    return WalkForwardBacktest(csv_path=str(path), params={"iterations": 30, "allow_writing_files": False})
+
+
+def test_cutoff_arrays_match_full_rebuild(backtest):
+    # Kesim başına hazırlanan diziler, öneki baştan yayınlamakla aynı skorları vermeli
+    engine = backtest.engine
+    engine.model, _ = backtest._train(pd.Timestamp("2017-06-01", tz="UTC"))
+    assert engine.model is not None
+    points = [(lat, lon) for _, lat, lon in DEFAULT_LOCATIONS]
+    for cutoff in pd.date_range("2017-01-01", "2018-12-01", freq="5MS", tz="UTC"):
+        n_full = np.searchsorted(backtest.full_times, backtest._to_np(cutoff), side="right")
+        n_main = np.searchsorted(backtest.main_times, backtest._to_np(cutoff), side="right")
+        prefix = (backtest.df_full.iloc[:n_full], backtest.df_main.iloc[:n_main])
+        engine.publish_catalog(*prefix)
+        expected = engine.score_many(points)
+        engine.publish_catalog(*prefix, arrays=backtest._cutoff_arrays(n_full, n_main), notify=False)
+        got = engine.score_many(points)
+        for e, g in zip(expected, got):
+            for key in ("short_risk", "long_hazard", "final_score"):
+                assert g[key] == pytest.approx(e[key], abs=1e-9)
+
+
+def test_cutoffs_do_not_notify_listeners(backtest):
+    calls = []
+
+    def listener(old, new):
+        calls.append(new.version)
+
+    backtest.engine.add_catalog_listener(listener)
+    try:
+        backtest.run(DEFAULT_LOCATIONS[:2], "2017-01-01", "2017-06-01", progress=False)
+    finally:
+        backtest.engine.remove_catalog_listener(listener)
+    assert calls == []
+
+
+def test_realized_matches_label(backtest):
+    # Gerçekleşen sonuç, modelin eğitildiği label_30d ile aynı hedefi ölçmeli (artçılar sayılmaz)
+    assert backtest.df_full["is_aftershock"].any()
+    # Aynı saniyedeki ana şoklar hariç: etiket sıradaki olayı sayar, kesim ise yalnızca sonrasını
+    mains = backtest.df_full[~backtest.df_full["is_aftershock"]]
+    main = backtest.df_main[~backtest.df_main["time"].isin(mains["time"][mains["time"].duplicated()])]
+    got = [backtest.realized(r.latitude, r.longitude, r.time) for r in main.itertuples()]
+    np.testing.assert_array_equal(got, main["label_30d"].astype(int).to_numpy())
+
+
+def test_realized_ignores_aftershocks(tmp_path):
+    # Yalnız bir dizi: M4.8 ana şok ve iki saat sonra 5 km ötede M4.3 artçı
+    df = generate_catalog(1500, seed=4, start="2015-01-01", years=2.0, bounds=(36.0, 38.0, 40.0, 44.0))
+    t0 = pd.Timestamp("2016-06-01 12:00", tz="UTC")
+    seq = pd.DataFrame({
+        "time": [t0, t0 + pd.Timedelta(hours=2)],
+        "latitude": [41.0, 41.04],
+        "longitude": [30.0, 30.02],
+        "depth": [10.0, 10.0],
+        "mag": [4.8, 4.3],
+    })
+    df = pd.concat([df, seq], ignore_index=True).sort_values("time", kind="stable")
+    write_catalog_csv(df, tmp_path / "query.csv")
+    bt = WalkForwardBacktest(csv_path=str(tmp_path / "query.csv"))
+    shock = bt.df_full[bt.df_full["time"] == seq["time"].iloc[1]].iloc[0]
+    assert shock["is_aftershock"]
+    # Artçının hemen öncesinde, tam üstünde: etiket gibi artçı sayılmaz
+    assert bt.realized(shock["latitude"], shock["longitude"], t0 + pd.Timedelta(hours=1)) == 0
+    assert bt.realized(shock["latitude"], shock["longitude"], t0 - pd.Timedelta(hours=1)) == 1
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from batch_score import score_locations
+from risk_engine import EarthquakeRiskEngine
+from synthetic_catalog import generate_catalog, synthetic_locations, write_catalog_csv
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    root = tmp_path_factory.mktemp("batch")
+    write_catalog_csv(generate_catalog(3000, seed=13, years=4.0), root / "query.csv")
+    engine = EarthquakeRiskEngine(csv_path=str(root / "query.csv"), cache_dir=str(root / "cache"))
+    engine.training_params = {"iterations": 40, "allow_writing_files": False}
+    engine.training_workers = 1
+    # Varsayılan olmayan skorlayıcı: işçiler bu ayarları almazsa skorlar ayrışır
+    engine.scorer = "compact"
+    engine.compact_params = {"method": "prune", "trees": 10}
+    engine.ensemble_size = 3
+    engine.ensemble_workers = 1
+    engine.warm_up()
+    return engine
+
+
+def test_workers_match_serial(engine):
+    locations = synthetic_locations(40, seed=3)
+    serial = score_locations(engine, locations, workers=1)
+    engine._bump_catalog_version()
+    parallel = score_locations(engine, locations, workers=2)
+    assert len(serial) == len(locations)
+    pd.testing.assert_frame_equal(parallel, serial)
@@ -0,0 +1,102 @@
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("ultralytics")
+
+import camera_scheduler
+from camera_scheduler import MultiCameraScheduler, StreamGrabber
+
+
+class _Boxes:
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.zeros((0, 6), dtype=np.float32)
+
+
+class _StubModel:
+    """Ağırlık dosyası gerektirmeyen YOLO yerine: her kare için boş tespit döner."""
+
+    names = {0: "catlak"}
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, source, conf, verbose=False):
+        self.batches.append(len(source))
+        return [SimpleNamespace(boxes=SimpleNamespace(data=_Boxes())) for _ in source]
+
+
+@pytest.fixture
+def stub_models(monkeypatch):
+    model = _StubModel()
+    monkeypatch.setattr(camera_scheduler, "load_model", lambda path: model)
+    return model
+
+
+def _write_clip(path, frames=15, fps=30.0, size=(64, 48)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV video yazıcısı yok")
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 10 % 256, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def _wait(predicate, timeout=5.0):
+    t_end = time.perf_counter() + timeout
+    while not predicate():
+        if time.perf_counter() > t_end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_round_robin_order(tmp_path, stub_models):
+    clips = [_write_clip(tmp_path / f"cam{i}.avi") for i in range(3)]
+    scheduler = MultiCameraScheduler(clips, models={"catlak": ("stub.pt", 0.5)}, max_batch=2)
+    scheduler.start()
+    try:
+        assert _wait(lambda: all(g.latest()[1] > 0 for g in scheduler.grabbers))
+        picks = []
+        for _ in range(4):
+            # Her turda tüm kaynaklarda yeni kare varmış gibi: seçim yalnızca sıraya bağlı
+            scheduler.last_seq = [0] * len(clips)
+            picks.append([i for i, _, _ in scheduler._select_batch()])
+    finally:
+        scheduler.stop()
+    assert picks == [[0, 1], [1, 2], [2, 0], [0, 1]]
+
+
+def test_fps_caps(tmp_path, stub_models):
+    clips = [_write_clip(tmp_path / f"cam{i}.avi") for i in range(2)]
+    scheduler = MultiCameraScheduler(
+        clips, models={"catlak": ("stub.pt", 0.5)}, fps_caps={clips[0]: 5.0},
+    )
+    duration = 1.5
+    scheduler.run(duration=duration)
+    capped, free = (s["frames"] for s in scheduler.report().values())
+    # Sınırlı kaynak en fazla 5 fps; sınırsız kaynak dosyanın 30 fps'ine yakın (başa sararak)
+    assert 1 <= capped <= 5 * duration + 1
+    assert free > 2 * capped
+    assert not any(g.finished for g in scheduler.grabbers)
+    assert all(not g.thread.is_alive() for g in scheduler.grabbers)
+
+
+def test_unreadable_file_finishes(tmp_path):
+    path = tmp_path / "bad.avi"
+    path.write_bytes(b"not a video")
+    grabber = StreamGrabber(str(path), loop=True)
+    grabber.start()
+    try:
+        # Başa sarma sonsuz döngüye girmez: kaynak bitmiş sayılır
+        assert _wait(lambda: grabber.finished, timeout=2.0)
+    finally:
+        grabber.stop()
+    assert not grabber.thread.is_alive()
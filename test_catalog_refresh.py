@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+import pytest
+
+from risk_engine import EarthquakeRiskEngine
+from synthetic_catalog import generate_catalog, write_catalog_csv
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp("catalog") / "query.csv"
+    write_catalog_csv(generate_catalog(3000, seed=7, years=5.0), path)
+    engine = EarthquakeRiskEngine(csv_path=str(path), cache_dir=None)
+    engine.training_params = {"iterations": 40, "allow_writing_files": False}
+    engine.training_workers = 1
+    engine.warm_up()
+    return engine
+
+
+def test_queries_during_refresh(engine):
+    # Yenileme yeni görüntüyü yayınlarken süren sorgular eski görüntüyle tamamlanmalı
+    points = [(38.0 + 0.1 * i, 30.0 + 0.2 * i) for i in range(20)]
+    errors = []
+    stop = threading.Event()
+
+    def query():
+        while not stop.is_set():
+            try:
+                for scores in engine.score_many(points):
+                    assert np.isfinite(scores["final_score"])
+                engine.city_quakes(*points[0])
+            except Exception as e:  # noqa: BLE001 - iş parçacığındaki hata teste taşınır
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=query) for _ in range(3)]
+    for t in threads:
+        t.start()
+    start_version = engine.catalog_version
+    try:
+        for _ in range(3):
+            assert engine.refresh_catalog(background=False)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert not errors, errors
+    assert engine.catalog_version == start_version + 3
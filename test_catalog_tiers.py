@@ -0,0 +1,59 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from data_manager import _prepend_rows
+from risk_engine import EarthquakeRiskEngine
+from synthetic_catalog import generate_catalog, write_catalog_csv
+
+POINTS = [(38.0 + 0.4 * i, 28.0 + 1.2 * i) for i in range(10)]
+
+
+@pytest.fixture(scope="module")
+def engines(tmp_path_factory):
+    root = tmp_path_factory.mktemp("tiers")
+    write_catalog_csv(generate_catalog(4000, seed=9, start="2016-01-01", years=5.0), root / "query.csv")
+    result = {}
+    for mode in ("full", "tiered"):
+        path = root / f"{mode}.csv"
+        shutil.copy(root / "query.csv", path)
+        engine = EarthquakeRiskEngine(csv_path=str(path), cache_dir=None)
+        engine.training_params = {"iterations": 40, "allow_writing_files": False}
+        engine.training_workers = 1
+        engine.predict_thread_count = 1
+        if mode == "tiered":
+            engine.hot_days = 365
+            engine.cold_dir = str(root / "cold")
+        engine.warm_up()
+        result[mode] = engine
+    return result
+
+
+def _assert_same(full, tiered):
+    for e, g in zip(full.score_many(POINTS), tiered.score_many(POINTS)):
+        for key in ("short_risk", "long_hazard", "final_score"):
+            assert g[key] == pytest.approx(e[key], abs=1e-9)
+    for lat, lon in POINTS[:4]:
+        assert len(tiered.city_quakes(lat, lon)) == len(full.city_quakes(lat, lon))
+
+
+def test_tiered_matches_full(engines):
+    full, tiered = engines["full"], engines["tiered"]
+    assert tiered.retention_info()["cold_events"] > 0
+    _assert_same(full, tiered)
+
+
+def test_tiered_refresh_matches_full(engines):
+    # Canlı akış: yeni olaylar dosyanın başına eklenir, katmanlı motor yalnızca onları okur
+    full, tiered = engines["full"], engines["tiered"]
+    start = full._catalog.df_full["time"].iloc[-1] + pd.Timedelta(hours=1)
+    for k in range(2):
+        df = generate_catalog(300, seed=20 + k, start=start.tz_convert(None).isoformat(), years=0.25)
+        df = df[df["time"] < start + pd.Timedelta(days=92)]
+        df["time"] = df["time"].dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        for engine in (full, tiered):
+            _prepend_rows(df.iloc[::-1], engine.csv_path)
+            assert engine.refresh_catalog(background=False)
+        start += pd.Timedelta(days=92)
+        _assert_same(full, tiered)
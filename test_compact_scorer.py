@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+catboost = pytest.importorskip("catboost")
+
+from compact_scorer import _SMALL_BATCH, CompactEnsemble, CompactScorer
+
+
+def _data(n, seed):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=(n, 6))
+    # Tekrarlanan değerler eşiklere denk gelir; NaN'ler CatBoost'ta en küçük değer (nan_mode=Min)
+    x[:, 1] = np.round(x[:, 1], 1)
+    x[:, 4] = rng.integers(0, 5, n)
+    x[rng.random((n, 6)) < 0.1] = np.nan
+    logit = np.nan_to_num(x[:, 0] - 0.7 * x[:, 1] + 0.4 * x[:, 4] * np.nan_to_num(x[:, 2]))
+    y = (rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return x, y
+
+
+def _fit(x, y, seed=0, depth=6):
+    model = catboost.CatBoostClassifier(iterations=80, depth=depth, random_seed=seed, verbose=False,
+                                        allow_writing_files=False, thread_count=1)
+    return model.fit(x, y)
+
+
+def _queries(scorer, seed=1):
+    x, _ = _data(500, seed)
+    # Eşiğin tam üstü ve float64'te hemen üstü (float32'ye yuvarlanınca eşiğe eşit): CatBoost
+    # gibi "büyük değil" sayılmalı
+    finite = np.isfinite(scorer.borders)
+    cols = scorer.features[finite][:200]
+    borders = scorer.borders[finite][:200].astype(np.float64)
+    rows = []
+    for values in (borders, np.nextafter(borders, np.inf)):
+        edge = np.repeat(x[:1], len(cols), axis=0)
+        edge[np.arange(len(cols)), cols] = values
+        rows.append(edge)
+    return np.vstack([x] + rows)
+
+
+@pytest.fixture(scope="module")
+def trained():
+    x, y = _data(3000, 0)
+    return x, y, _fit(x, y)
+
+
+def test_exact_matches_catboost(trained):
+    _, _, model = trained
+    scorer = CompactScorer.from_catboost(model)
+    x = _queries(scorer)
+    expected = model.predict_proba(x)[:, 1]
+    # Toplu yol ve az satırlı (tek adımlı) yol
+    np.testing.assert_allclose(scorer.predict_proba(x), expected, rtol=1e-12, atol=1e-15)
+    for row in range(0, len(x), 97):
+        chunk = x[row:row + _SMALL_BATCH]
+        np.testing.assert_allclose(scorer.predict_proba(chunk), expected[row:row + len(chunk)],
+                                   rtol=1e-12, atol=1e-15)
+
+
+def test_ensemble_members_match_catboost(trained):
+    x, y, _ = trained
+    rng = np.random.default_rng(3)
+    # Farklı derinlikte üyeler: sığ ağaçlar +inf eşikle tamamlanır
+    members = [_fit(x[idx], y[idx], seed=k, depth=depth)
+               for k, (idx, depth) in enumerate(
+                   (rng.integers(0, len(x), len(x)), d) for d in (4, 6, 5))]
+    ensemble = CompactEnsemble.from_members([CompactScorer.from_catboost(m) for m in members])
+    q = _queries(CompactScorer.from_catboost(members[1]))
+    for rows in (q, q[:_SMALL_BATCH]):
+        got = ensemble.member_proba(rows)
+        assert got.shape == (len(rows), len(members))
+        for k, member in enumerate(members):
+            np.testing.assert_allclose(got[:, k], member.predict_proba(rows)[:, 1], rtol=1e-12, atol=1e-15)
+        np.testing.assert_allclose(ensemble.predict_proba(rows), got.mean(axis=1))
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from declustering import aftershock_flags, event_times_ns, reference_flags
+from synthetic_catalog import generate_catalog
+
+
+@pytest.fixture(scope="module")
+def swarm():
+    df = generate_catalog(6000, seed=5, years=2.0, aftershock_fraction=0.6)
+    # Karo sınırlarını kesen yoğun bir sürü: 0.5 derecelik alanda bir günde 300 olay
+    rng = np.random.default_rng(5)
+    t0 = df["time"].iloc[len(df) // 2]
+    burst = pd.DataFrame({
+        "time": t0 + pd.to_timedelta(np.sort(rng.uniform(0, 86400, 300)), unit="s"),
+        "latitude": 39.0 + rng.uniform(-0.25, 0.25, 300),
+        "longitude": 35.0 + rng.uniform(-0.25, 0.25, 300),
+        "mag": rng.uniform(2.0, 5.5, 300),
+    })
+    df = pd.concat([df[burst.columns], burst], ignore_index=True)
+    return df.sort_values("time", kind="stable", ignore_index=True)
+
+
+def _args(df):
+    return df["time"], df["latitude"].to_numpy(), df["longitude"].to_numpy(), df["mag"].to_numpy()
+
+
+def test_vectorized_matches_reference(swarm):
+    ref = reference_flags(event_times_ns(swarm["time"]), swarm["latitude"].to_numpy(float),
+                          swarm["longitude"].to_numpy(float), swarm["mag"].to_numpy(float))
+    assert ref.any()
+    np.testing.assert_array_equal(aftershock_flags(*_args(swarm), workers=1), ref)
+
+
+@pytest.mark.parametrize("workers,tiles_per_worker", [(2, 4), (4, 4), (4, 16)])
+def test_parallel_matches_serial(swarm, workers, tiles_per_worker):
+    serial = aftershock_flags(*_args(swarm), workers=1)
+    parallel = aftershock_flags(*_args(swarm), workers=workers, tiles_per_worker=tiles_per_worker)
+    np.testing.assert_array_equal(parallel, serial)
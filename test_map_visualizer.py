@@ -0,0 +1,22 @@
+import pandas as pd
+
+from map_visualizer import aggregate_time_bins, generate_time_map
+from synthetic_catalog import generate_catalog
+
+
+def test_time_bins_cover_all_events():
+    df = generate_catalog(2000, seed=1, years=2.0)
+    frames, labels, agg = aggregate_time_bins(df, freq="M")
+    months = pd.period_range(df["time"].min().tz_convert(None), df["time"].max().tz_convert(None), freq="M")
+    assert labels == months.strftime("%Y-%m").tolist()
+    assert len(frames) == len(labels)
+    assert agg["count"].sum() == len(df)
+
+
+def test_empty_catalog(tmp_path):
+    df = generate_catalog(200, seed=1, years=1.0).iloc[:0]
+    frames, labels, agg = aggregate_time_bins(df)
+    assert frames == [] and labels == [] and agg.empty
+    path = tmp_path / "bos.html"
+    assert generate_time_map(df, output_file=str(path), open_browser=False) is None
+    assert not path.exists()
@@ -0,0 +1,37 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from risk_engine import EarthquakeRiskEngine
+from risk_server import RiskServer
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    # Geçersiz istekler skorlamaya ulaşmaz: motorun ısıtılmasına gerek yok
+    server = RiskServer(("127.0.0.1", 0), EarthquakeRiskEngine(cache_dir=None))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("path, body", [
+    ("/risk", []),
+    ("/risk", "İzmir"),
+    ("/risk", {"lat": None, "lon": 27.0}),
+    ("/risk/batch", {"points": {"lat": 38.0, "lon": 27.0}}),
+    ("/risk/batch", {"points": [[38.0, 27.0]]}),
+    ("/watchlist", {"sites": ["İzmir"]}),
+])
+def test_invalid_body_is_rejected(server_url, path, body):
+    request = Request(server_url + path, data=json.dumps(body).encode("utf-8"),
+                      headers={"Content-Type": "application/json"})
+    with pytest.raises(HTTPError) as exc:
+        urlopen(request, timeout=10)
+    assert exc.value.code == 400
+    assert "error" in json.loads(exc.value.read())
@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from risk_engine import EarthquakeRiskEngine
+from streaming_pipeline import StreamingPreparer, read_prepared
+from synthetic_catalog import generate_catalog, write_catalog_csv
+
+
+@pytest.fixture(scope="module")
+def catalog_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("catalog") / "query.csv"
+    df = generate_catalog(4000, seed=11, years=3.0)
+    # Dosya sırası karışık: parçalar k-yollu birleştirmeden geçer
+    write_catalog_csv(df.sample(frac=1.0, random_state=0), path)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_rows", [700, 100_000])
+def test_streaming_matches_in_memory(catalog_csv, tmp_path, chunk_rows):
+    df_full, df_main = EarthquakeRiskEngine(csv_path=catalog_csv, cache_dir=None)._build_frames()
+    summary = StreamingPreparer(str(tmp_path), chunk_rows=chunk_rows).run(catalog_csv, progress=False)
+    if chunk_rows < len(df_full):
+        assert summary["chunks"] > 1
+
+    stream_full = read_prepared(summary["full_path"])
+    stream_main = read_prepared(summary["main_path"])
+    assert set(stream_full.columns) == set(df_full.columns)
+    assert set(stream_main.columns) == set(df_main.columns)
+    pd.testing.assert_frame_equal(stream_full, df_full[stream_full.columns], check_categorical=False)
+    pd.testing.assert_frame_equal(stream_main, df_main[stream_main.columns], check_categorical=False)
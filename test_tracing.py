@@ -0,0 +1,27 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+SCRIPT = """
+from tracing import span
+with span("kok"):
+    with span("alt", n=3):
+        pass
+"""
+
+
+@pytest.mark.parametrize("name", ["trace.json", "trace.jsonl"])
+def test_trace_file_written_at_exit(tmp_path, name):
+    path = tmp_path / name
+    env = dict(os.environ, EQ_TRACE_FILE=str(path))
+    env.pop("EQ_TRACE", None)
+    subprocess.run([sys.executable, "-c", SCRIPT], env=env, check=True,
+                   cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL)
+    if name.endswith(".jsonl"):
+        names = [json.loads(line)["name"] for line in path.read_text(encoding="utf-8").splitlines()]
+    else:
+        names = [e["name"] for e in json.loads(path.read_text(encoding="utf-8"))["traceEvents"]]
+    assert sorted(names) == ["alt", "kok"]
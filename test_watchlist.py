@@ -0,0 +1,105 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import _haversine
+from risk_engine import EarthquakeRiskEngine
+from watchlist import SiteIndex, Watchlist
+
+
+class _Engine:
+    """Watchlist'in kullandığı motor arayüzü: skorlanan noktaları kaydeder."""
+
+    def __init__(self):
+        self.catalog_version = 0
+        self.model_version = 0
+        self.scored = []
+        self.catalog_listeners = []
+        self.model_listeners = []
+
+    def score_many(self, points):
+        self.scored.extend(points)
+        return [{"final_score": 0.1} for _ in points]
+
+    def _risk_category(self, score):
+        return "DÜŞÜK" if score < 0.25 else "ORTA"
+
+    def add_catalog_listener(self, callback):
+        self.catalog_listeners.append(callback)
+
+    def remove_catalog_listener(self, callback):
+        self.catalog_listeners.remove(callback)
+
+    def add_model_listener(self, callback):
+        self.model_listeners.append(callback)
+
+    def remove_model_listener(self, callback):
+        self.model_listeners.remove(callback)
+
+
+def _sites(**named):
+    return pd.DataFrame({
+        "name": list(named),
+        "latitude": [lat for lat, _ in named.values()],
+        "longitude": [lon for _, lon in named.values()],
+    })
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_sites_near_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n_sites, n_events = 400, 300
+    # Farklı yarıçaplar ve yüksek enlem: boylam hücresi en kuzeydeki siteye göre daralır
+    lat = np.concatenate([rng.uniform(35.0, 43.0, n_sites - 20), rng.uniform(55.0, 70.0, 20)])
+    lon = rng.uniform(25.0, 46.0, n_sites)
+    radius = rng.uniform(5.0, 200.0, n_sites)
+    ev_lat = np.concatenate([rng.uniform(34.0, 44.0, n_events - 30), rng.uniform(54.0, 71.0, 30)])
+    ev_lon = rng.uniform(24.0, 47.0, n_events)
+
+    got = SiteIndex(lat, lon, radius).sites_near(ev_lat, ev_lon)
+    d = _haversine(ev_lat[:, None], ev_lon[:, None], lat[None, :], lon[None, :])
+    expected = np.nonzero((d <= radius[None, :]).any(axis=0))[0]
+    assert len(expected)
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_new_event_in_same_second_is_rescored():
+    engine = _Engine()
+    watch = Watchlist(engine).attach()
+    watch.add_sites(_sites(uzak=(37.0, 27.0), yakin=(40.0, 40.0)))
+    engine.scored.clear()
+    t = pd.Timestamp("2024-05-01 12:00:00", tz="UTC")
+    old_full = pd.DataFrame({"time": [t - pd.Timedelta(hours=1), t],
+                             "latitude": [37.0, 37.0], "longitude": [27.0, 27.0]})
+    # Yeni olay eski son olayla aynı saniyede, yalnızca "yakin" sitesinin yakınında
+    new_full = pd.concat([old_full, pd.DataFrame({"time": [t], "latitude": [40.05], "longitude": [40.05]})],
+                         ignore_index=True)
+    for callback in engine.catalog_listeners:
+        callback(SimpleNamespace(version=1, df_full=old_full), SimpleNamespace(version=2, df_full=new_full))
+    assert (40.0, 40.0) in engine.scored
+    assert watch.last_update["new_events"] >= 1
+
+
+def test_model_update_rescores_all_sites():
+    engine = _Engine()
+    watch = Watchlist(engine).attach()
+    watch.add_sites(_sites(a=(37.0, 27.0), b=(40.0, 40.0), c=(39.0, 33.0)))
+    engine.scored.clear()
+    engine.model_version += 1
+    for callback in engine.model_listeners:
+        callback(engine.model_version)
+    watch._model_rescore.join(timeout=5.0)
+    assert sorted(engine.scored) == [(37.0, 27.0), (39.0, 33.0), (40.0, 40.0)]
+    assert watch.last_update["model_version"] == 1
+
+
+def test_engine_notifies_model_listeners():
+    engine = EarthquakeRiskEngine(cache_dir=None)
+    versions = []
+    engine.add_model_listener(versions.append)
+    engine._bump_model_version()
+    engine.remove_model_listener(versions.append)
+    engine._bump_model_version()
+    assert versions == [1]
@@ -0,0 +1,200 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+# Varsayılan döşeme (tile) ayarları - catlak.pt 640x640 girişle eğitildi
+DEFAULT_TILE_SIZE = 640
+DEFAULT_OVERLAP = 0.2
+DEFAULT_BATCH_SIZE = 8
+
+
+def make_tiles(height, width, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """
+    Görüntüyü üst üste binen karelere böler.
+    (x1, y1, x2, y2) listesi döner; son karo kenara yaslanır ki hiçbir piksel dışarıda kalmasın.
+    """
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError("overlap 0 ile 1 arasında olmalı.")
+    stride = max(1, int(round(tile_size * (1.0 - overlap))))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        pos = list(range(0, length - tile_size + 1, stride))
+        if pos[-1] + tile_size < length:
+            pos.append(length - tile_size)
+        return pos
+
+    tiles = []
+    for y in starts(height):
+        for x in starts(width):
+            tiles.append((x, y, min(x + tile_size, width), min(y + tile_size, height)))
+    return tiles
+
+
+def box_overlap(box, boxes, metric="iou"):
+    """Bir kutu ile kutu dizisi arasındaki örtüşme (iou veya ios: küçük kutuya göre kesişim)."""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if metric == "ios":
+        denom = np.minimum(area, areas)
+    else:
+        denom = area + areas - inter
+    return inter / np.maximum(denom, 1e-9)
+
+
+def nms(detections, iou_threshold=0.5, metric="iou"):
+    """
+    Sınıf bazlı NMS. detections: Nx6 [x1, y1, x2, y2, conf, cls].
+    Karo sınırında ikiye bölünen çatlaklar için metric="ios" daha iyi birleştirir.
+    """
+    if len(detections) == 0:
+        return detections.reshape(0, 6)
+
+    keep = []
+    for cls in np.unique(detections[:, 5]):
+        idx = np.where(detections[:, 5] == cls)[0]
+        idx = idx[np.argsort(-detections[idx, 4])]
+        while len(idx) > 0:
+            best = idx[0]
+            keep.append(best)
+            if len(idx) == 1:
+                break
+            overlaps = box_overlap(detections[best, :4], detections[idx[1:], :4], metric)
+            idx = idx[1:][overlaps <= iou_threshold]
+
+    keep = np.array(sorted(keep, key=lambda i: -detections[i, 4]), dtype=int)
+    return detections[keep]
+
+
+def tiled_predict(
+    model,
+    frame,
+    tile_size=DEFAULT_TILE_SIZE,
+    overlap=DEFAULT_OVERLAP,
+    batch_size=DEFAULT_BATCH_SIZE,
+    conf=0.6,
+    iou_threshold=0.5,
+    metric="ios",
+):
+    """
+    Yüksek çözünürlüklü kareyi karolara bölüp YOLO modeline toplu (batch) halde verir.
+    Tespitler tam kare koordinatlarına taşınır ve karo sınırlarında NMS ile birleştirilir.
+    Nx6 numpy dizisi döner: [x1, y1, x2, y2, conf, cls].
+    """
+    height, width = frame.shape[:2]
+    tiles = make_tiles(height, width, tile_size=tile_size, overlap=overlap)
+
+    all_dets = []
+    for start in range(0, len(tiles), batch_size):
+        batch = tiles[start:start + batch_size]
+        crops = [frame[y1:y2, x1:x2] for (x1, y1, x2, y2) in batch]
+        results = model.predict(source=crops, conf=conf, imgsz=tile_size, verbose=False)
+
+        for (x1, y1, _, _), res in zip(batch, results):
+            data = res.boxes.data.cpu().numpy()
+            if len(data) == 0:
+                continue
+            data = data[:, :6].astype(np.float32, copy=True)
+            data[:, [0, 2]] += x1
+            data[:, [1, 3]] += y1
+            all_dets.append(data)
+
+    if not all_dets:
+        return np.zeros((0, 6), dtype=np.float32)
+    return nms(np.concatenate(all_dets), iou_threshold=iou_threshold, metric=metric)
+
+
+def benchmark_tiling(model, frame, tile_sizes=(512, 640, 960), overlaps=(0.1, 0.2), batch_sizes=(1, 4, 8), repeats=3, conf=0.6):
+    """
+    Farklı karo/örtüşme/batch ayarları için verimi ölçer (sadece CPU makinelerde ayar seçmek için).
+    Her ayar için sözlük listesi döner.
+    """
+    height, width = frame.shape[:2]
+    rows = []
+    for tile_size in tile_sizes:
+        for overlap in overlaps:
+            n_tiles = len(make_tiles(height, width, tile_size=tile_size, overlap=overlap))
+            for batch_size in batch_sizes:
+                # Isınma turu (model ilk çağrıda graf/ağırlık hazırlığı yapar)
+                tiled_predict(model, frame, tile_size, overlap, batch_size, conf=conf)
+                t0 = time.perf_counter()
+                n_dets = 0
+                for _ in range(repeats):
+                    n_dets = len(tiled_predict(model, frame, tile_size, overlap, batch_size, conf=conf))
+                elapsed = (time.perf_counter() - t0) / repeats
+                row = {
+                    "tile_size": tile_size,
+                    "overlap": overlap,
+                    "batch_size": batch_size,
+                    "tiles": n_tiles,
+                    "sec_per_frame": elapsed,
+                    "fps": 1.0 / elapsed if elapsed > 0 else float("inf"),
+                    "tiles_per_sec": n_tiles / elapsed if elapsed > 0 else float("inf"),
+                    "detections": n_dets,
+                }
+                rows.append(row)
+                print(
+                    f"tile={tile_size} overlap={overlap:.2f} batch={batch_size} "
+                    f"karo={n_tiles} -> {elapsed*1000:.1f} ms/kare, "
+                    f"{row['tiles_per_sec']:.1f} karo/sn, {n_dets} tespit"
+                )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yüksek çözünürlüklü görüntülerde karolu çatlak tespiti")
+    parser.add_argument("image", help="Girdi görüntüsü (ör. 4K cephe fotoğrafı)")
+    parser.add_argument("--model", default=os.path.join("models", "catlak.pt"))
+    # --bench ile verilen değerler taranacak listelerdir (verilmezse benchmark_tiling varsayılanları)
+    parser.add_argument("--tile", type=int, nargs="+", default=None, help=f"Karo boyu (varsayılan {DEFAULT_TILE_SIZE})")
+    parser.add_argument("--overlap", type=float, nargs="+", default=None,
+                        help=f"Örtüşme oranı (varsayılan {DEFAULT_OVERLAP})")
+    parser.add_argument("--batch", type=int, nargs="+", default=None,
+                        help=f"Batch boyutu (varsayılan {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--conf", type=float, default=0.6)
+    parser.add_argument("--bench", action="store_true", help="Farklı ayarlarla verim ölçümü yap")
+    parser.add_argument("--output", default=None, help="Kutuların çizildiği çıktı görüntüsü")
+    args = parser.parse_args()
+    sweep = {"tile_sizes": args.tile, "overlaps": args.overlap, "batch_sizes": args.batch}
+    if not args.bench:
+        for flag, values in (("--tile", args.tile), ("--overlap", args.overlap), ("--batch", args.batch)):
+            if values is not None and len(values) > 1:
+                parser.error(f"{flag} birden fazla değer yalnızca --bench ile verilebilir")
+
+    import cv2
+    from ultralytics import YOLO
+
+    frame = cv2.imread(args.image)
+    if frame is None:
+        raise FileNotFoundError(f"Görüntü okunamadı: {args.image}")
+    model = YOLO(args.model)
+
+    if args.bench:
+        benchmark_tiling(model, frame, conf=args.conf, **{k: v for k, v in sweep.items() if v is not None})
+        return
+
+    tile_size = args.tile[0] if args.tile else DEFAULT_TILE_SIZE
+    overlap = args.overlap[0] if args.overlap else DEFAULT_OVERLAP
+    batch_size = args.batch[0] if args.batch else DEFAULT_BATCH_SIZE
+    t0 = time.perf_counter()
+    dets = tiled_predict(model, frame, tile_size, overlap, batch_size, conf=args.conf)
+    print(f"{len(dets)} tespit, {(time.perf_counter() - t0)*1000:.1f} ms")
+
+    if args.output:
+        from camera_manager import draw_detections
+        draw_detections(frame, dets, model.names)
+        cv2.imwrite(args.output, frame)
+        print(f"Çıktı kaydedildi: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
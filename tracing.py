@@ -0,0 +1,243 @@
+import atexit
+import collections
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# İzleme varsayılan olarak kapalıdır; EQ_TRACE=1 (bellek için EQ_TRACE=mem) ile açılır.
+# EQ_TRACE_FILE=yol verilirse izleme açılır ve span'ler süreç çıkışında dosyaya yazılır
+# (.jsonl: satır başına span, diğer uzantılar: Chrome Trace Event JSON).
+_ENABLED = False
+_TRACE_MEMORY = False
+_MAX_SPANS = 100_000
+
+_spans = collections.deque(maxlen=_MAX_SPANS)
+_spans_lock = threading.Lock()
+_local = threading.local()
+_ids = itertools.count(1)
+_EPOCH = time.perf_counter()
+
+
+class _NullSpan:
+    """İzleme kapalıyken kullanılan, hiçbir şey yapmayan paylaşımlı span."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "depth", "tid",
+                 "start", "cpu_start", "mem_start", "record")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.record = None
+
+    def set(self, **attrs):
+        """Span'e sonradan öznitelik ekler (ör. satır sayısı)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.span_id = next(_ids)
+        self.parent_id = stack[-1].span_id if stack else None
+        self.depth = len(stack)
+        self.tid = threading.get_ident()
+        stack.append(self)
+        self.mem_start = tracemalloc.get_traced_memory()[0] if _TRACE_MEMORY else None
+        self.cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        cpu = time.thread_time() - self.cpu_start
+        rec = {
+            "name": self.name,
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "depth": self.depth,
+            "tid": self.tid,
+            "start_ms": (self.start - _EPOCH) * 1000.0,
+            "wall_ms": (end - self.start) * 1000.0,
+            "cpu_ms": cpu * 1000.0,
+        }
+        if self.mem_start is not None and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            rec["alloc_kb"] = (current - self.mem_start) / 1024.0
+        if exc_type is not None:
+            rec["error"] = exc_type.__name__
+        if self.attrs:
+            rec["attrs"] = self.attrs
+        self.record = rec
+
+        stack = _local.stack
+        if stack and stack[-1] is self:
+            stack.pop()
+        with _spans_lock:
+            _spans.append(rec)
+        return False
+
+
+def enable(memory=False):
+    """İzlemeyi açar. memory=True ise tracemalloc ile ayırma farkları da kaydedilir."""
+    global _ENABLED, _TRACE_MEMORY
+    _ENABLED = True
+    _TRACE_MEMORY = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _ENABLED, _TRACE_MEMORY
+    _ENABLED = False
+    if _TRACE_MEMORY and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _TRACE_MEMORY = False
+
+
+def is_enabled():
+    return _ENABLED
+
+
+def span(name, **attrs):
+    """
+    İç içe geçebilen zamanlama bloğu:
+        with span("risk.decluster", rows=len(df)):
+            ...
+    İzleme kapalıyken paylaşımlı boş nesne döner (neredeyse sıfır maliyet).
+    """
+    if not _ENABLED:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+def traced(name=None):
+    """Fonksiyonu tek bir span ile saran dekoratör."""
+
+    def decorator(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_spans():
+    with _spans_lock:
+        return list(_spans)
+
+
+def clear():
+    with _spans_lock:
+        _spans.clear()
+
+
+def export_jsonl(path):
+    """Tamamlanan span'leri satır başına bir JSON nesnesi olarak yazar."""
+    spans = get_spans()
+    with open(path, "w", encoding="utf-8") as f:
+        for rec in spans:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return len(spans)
+
+
+def export_chrome_trace(path):
+    """chrome://tracing veya Perfetto ile açılabilen Trace Event formatında yazar."""
+    pid = os.getpid()
+    events = []
+    for rec in get_spans():
+        args = {"cpu_ms": round(rec["cpu_ms"], 3)}
+        if "alloc_kb" in rec:
+            args["alloc_kb"] = round(rec["alloc_kb"], 1)
+        args.update(rec.get("attrs", {}))
+        events.append({
+            "name": rec["name"],
+            "ph": "X",
+            "ts": rec["start_ms"] * 1000.0,
+            "dur": rec["wall_ms"] * 1000.0,
+            "pid": pid,
+            "tid": rec["tid"],
+            "args": args,
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+    return len(events)
+
+
+def export(path):
+    """Uzantıya göre yazar: .jsonl ise export_jsonl, değilse export_chrome_trace."""
+    if path.lower().endswith(".jsonl"):
+        return export_jsonl(path)
+    return export_chrome_trace(path)
+
+
+def _export_at_exit(path):
+    import multiprocessing
+
+    # Süreç havuzu işçileri ana sürecin dosyasının üzerine yazmasın
+    if multiprocessing.parent_process() is not None:
+        return
+    try:
+        n = export(path)
+        print(f"İzleme: {n} span yazıldı: {path}")
+    except OSError as e:
+        print(f"İzleme dosyası yazılamadı ({path}): {e}")
+
+
+def summarize(root_name=None, top=4):
+    """
+    Son kök span'in (veya adı root_name olan son span'in) alt aşamalarını
+    durum çubuğuna sığacak tek satırlık özet olarak döner.
+    """
+    spans = get_spans()
+    root = None
+    for rec in reversed(spans):
+        if (root_name is None and rec["parent"] is None) or rec["name"] == root_name:
+            root = rec
+            break
+    if root is None:
+        return ""
+
+    # Kök altındaki tüm span'leri topla, sadece doğrudan çocukları özetle
+    children = collections.defaultdict(float)
+    for rec in spans:
+        if rec["parent"] == root["id"]:
+            children[rec["name"]] += rec["wall_ms"]
+    parts = sorted(children.items(), key=lambda kv: -kv[1])[:top]
+    detail = ", ".join(f"{name.split('.')[-1]} {ms/1000:.2f}s" for name, ms in parts)
+    text = f"{root['name']}: {root['wall_ms']/1000:.2f}s"
+    return f"{text} ({detail})" if detail else text
+
+
+_env = os.environ.get("EQ_TRACE", "").strip().lower()
+_trace_file = os.environ.get("EQ_TRACE_FILE", "").strip()
+if _env in ("1", "true", "yes", "mem") or _trace_file:
+    enable(memory=_env == "mem")
+if _trace_file:
+    atexit.register(_export_at_exit, _trace_file)
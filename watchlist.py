@@ -0,0 +1,322 @@
+import argparse
+import collections
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from features import KM_PER_DEG, _haversine
+
+# Skor bileşenlerinin baktığı en geniş yarıçap (uzun vadeli tehlike 200 km, pencere
+# özellikleri 100 km): bu mesafenin dışındaki yeni olay bir sitenin skorunu değiştirmez.
+IMPACT_RADIUS_KM = 200.0
+
+
+class SiteIndex:
+    """
+    Olaydan siteye ters uzamsal indeks. Hücre boyu en büyük site yarıçapından küçük
+    olmadığı için bir olayı kapsayan her site olayın komşu 3x3 hücresindedir.
+    """
+
+    def __init__(self, lats, lons, radii_km):
+        self.lat = np.asarray(lats, dtype=float)
+        self.lon = np.asarray(lons, dtype=float)
+        self.radius = np.asarray(radii_km, dtype=float)
+        radius = float(self.radius.max()) if len(self.radius) else IMPACT_RADIUS_KM
+        self.cell_lat = radius / KM_PER_DEG
+        max_abs_lat = min(float(np.abs(self.lat).max()) if len(self.lat) else 0.0, 89.0)
+        self.cell_lon = radius / (KM_PER_DEG * np.cos(np.radians(min(max_abs_lat + self.cell_lat, 89.0))))
+
+        keys = self._cell_keys(self.lat, self.lon)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys, self.starts = np.unique(keys[self.order], return_index=True)
+        self.ends = np.append(self.starts[1:], len(keys))
+
+    def _cell_keys(self, lats, lons):
+        ci = np.floor(lats / self.cell_lat).astype(np.int64)
+        cj = np.floor(lons / self.cell_lon).astype(np.int64)
+        return ci * 1_000_003 + cj
+
+    def sites_near(self, lats, lons):
+        """Yarıçapı verilen olaylardan en az birini kapsayan sitelerin indeksleri (sıralı)."""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        if not len(lats) or not len(self.keys):
+            return np.zeros(0, dtype=np.int64)
+        ci = np.floor(lats / self.cell_lat).astype(np.int64)
+        cj = np.floor(lons / self.cell_lon).astype(np.int64)
+        hits = []
+        for di in (-1, 0, 1):
+            for dj in (-1, 0, 1):
+                nkey = (ci + di) * 1_000_003 + (cj + dj)
+                pos = np.minimum(np.searchsorted(self.keys, nkey), len(self.keys) - 1)
+                found = np.nonzero(self.keys[pos] == nkey)[0]
+                if not len(found):
+                    continue
+                lo = self.starts[pos[found]]
+                lengths = self.ends[pos[found]] - lo
+                ev = np.repeat(found, lengths)
+                offsets = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+                site = self.order[np.repeat(lo, lengths) + offsets]
+                d = _haversine(lats[ev], lons[ev], self.lat[site], self.lon[site])
+                hits.append(site[d <= self.radius[site]])
+        if not hits:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits))
+
+
+class Watchlist:
+    """
+    İzlenen konumlar (şehirler, kritik tesisler). Motor yeni katalog sürümü yayınladığında
+    yalnızca yeni olaylardan etkilenen siteler yeniden skorlanır; nihai skor _risk_category
+    sınırını geçtiğinde uyarı üretilir.
+
+    Model sürümü artınca (yeniden eğitim) tüm siteler arka plan iş parçacığında yeniden skorlanır.
+
+    Not: Kısa vadeli modelin zaman özellikleri kataloğun son olay anına bağlıdır; uzaktaki
+    sitelerde bu kayma olay kaynaklı değildir ve rescore_all() ile (ör. günlük) yakalanır.
+    """
+
+    def __init__(self, engine, max_alerts=1000):
+        self.engine = engine
+        self.sites = pd.DataFrame(columns=["name", "latitude", "longitude", "radius_km"])
+        self.scores = np.zeros(0)
+        self.categories = []
+        self.alerts = collections.deque(maxlen=max_alerts)
+        self.last_update = None
+        self._index = SiteIndex([], [], [])
+        self._alert_listeners = []
+        self._lock = threading.Lock()
+        # Model güncellemesi için bekleyen yeniden skorlama (art arda sürümler tek turda toplanır)
+        self._model_rescore = None
+        self._model_pending = False
+        self._pending_lock = threading.Lock()
+
+    # --- Site yönetimi ---
+
+    def add_sites(self, sites, radius_km=IMPACT_RADIUS_KM):
+        """sites: name,latitude,longitude (isteğe bağlı radius_km) sütunlu DataFrame. Yeni siteler hemen skorlanır."""
+        new = sites[["name", "latitude", "longitude"]].copy()
+        new["radius_km"] = sites["radius_km"] if "radius_km" in sites else radius_km
+        with self._lock:
+            scores = self._score(new)
+            self.sites = pd.concat([self.sites, new], ignore_index=True) if len(self.sites) else new.reset_index(drop=True)
+            self.scores = np.concatenate([self.scores, scores])
+            self.categories += [self.engine._risk_category(s) for s in scores]
+            self._index = SiteIndex(self.sites["latitude"], self.sites["longitude"], self.sites["radius_km"])
+        return len(new)
+
+    def add_site(self, name, lat, lon, radius_km=IMPACT_RADIUS_KM):
+        return self.add_sites(pd.DataFrame({"name": [name], "latitude": [lat], "longitude": [lon],
+                                            "radius_km": [radius_km]}))
+
+    def _score(self, sites):
+        points = list(zip(sites["latitude"].astype(float), sites["longitude"].astype(float)))
+        if not points:
+            return np.zeros(0)
+        return np.array([s["final_score"] for s in self.engine.score_many(points)])
+
+    # --- Uyarılar ---
+
+    def add_alert_listener(self, callback):
+        """callback(uyarı_sözlüğü) her kategori geçişinde çağrılır."""
+        if callback not in self._alert_listeners:
+            self._alert_listeners.append(callback)
+
+    def remove_alert_listener(self, callback):
+        if callback in self._alert_listeners:
+            self._alert_listeners.remove(callback)
+
+    def _rescore(self, idx, version):
+        # Kilit altında çağrılır: etkilenen siteleri skorlar, kategori geçişlerini döner
+        if not len(idx):
+            return []
+        new_scores = self._score(self.sites.iloc[idx])
+        fired = []
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for i, score in zip(idx, new_scores):
+            old_cat = self.categories[i]
+            new_cat = self.engine._risk_category(score)
+            if new_cat != old_cat:
+                fired.append({
+                    "time": now,
+                    "name": self.sites.at[i, "name"],
+                    "latitude": float(self.sites.at[i, "latitude"]),
+                    "longitude": float(self.sites.at[i, "longitude"]),
+                    "old_score": float(self.scores[i]),
+                    "new_score": float(score),
+                    "old_category": old_cat,
+                    "new_category": new_cat,
+                    "direction": "up" if score > self.scores[i] else "down",
+                    "catalog_version": version,
+                })
+            self.scores[i] = score
+            self.categories[i] = new_cat
+        self.alerts.extend(fired)
+        return fired
+
+    def _emit(self, fired):
+        for alert in fired:
+            for callback in list(self._alert_listeners):
+                try:
+                    callback(alert)
+                except Exception as e:
+                    print(f"Uyarı dinleyicisi hatası: {e}")
+
+    # --- Katalog olayları ---
+
+    def attach(self):
+        """Motorun katalog yayınlarına ve model güncellemelerine abone olur."""
+        self.engine.add_catalog_listener(self.on_catalog_published)
+        self.engine.add_model_listener(self.on_model_updated)
+        return self
+
+    def detach(self):
+        self.engine.remove_catalog_listener(self.on_catalog_published)
+        self.engine.remove_model_listener(self.on_model_updated)
+
+    def on_catalog_published(self, old, new):
+        """
+        Motor dinleyicisi: eski sürümden sonra eklenen olayları bulur, ters indeksle yalnızca
+        onları kapsayan siteleri yeniden skorlar. Maliyet etkilenen site sayısıyla orantılıdır.
+        """
+        if old is None or old.df_full is None or new.df_full is None:
+            return
+        t0 = time.perf_counter()
+        new_times = new.df_full["time"]
+        start = len(new_times)
+        if len(old.df_full):
+            # Eski son olayla aynı saniyedeki yeni olaylar da dahil (o saniyenin eski olayları
+            # yeniden kapsanır; yeniden skorlama zararsızdır)
+            start = int(new_times.searchsorted(old.df_full["time"].iloc[-1], side="left"))
+        events = new.df_full.iloc[start:]
+        with self._lock:
+            idx = self._index.sites_near(events["latitude"].to_numpy(), events["longitude"].to_numpy())
+            fired = self._rescore(idx, new.version)
+            self.last_update = {
+                "catalog_version": new.version,
+                "model_version": self.engine.model_version,
+                "new_events": len(events),
+                "affected_sites": len(idx),
+                "alerts": len(fired),
+                "seconds": time.perf_counter() - t0,
+            }
+        self._emit(fired)
+
+    def on_model_updated(self, version):
+        """
+        Motor model dinleyicisi: tüm siteler arka planda yeniden skorlanır. Sürüm skorlama
+        sırasında da artabildiğinden (bu listenin kendi skorlaması dahil) burada beklenmez.
+        """
+        with self._pending_lock:
+            if self._model_pending:
+                return
+            self._model_pending = True
+            self._model_rescore = threading.Thread(target=self._rescore_for_model, daemon=True)
+            self._model_rescore.start()
+
+    def _rescore_for_model(self):
+        with self._pending_lock:
+            self._model_pending = False
+        self.rescore_all()
+
+    def rescore_all(self):
+        """Tüm siteleri yeniden skorlar (model güncellemesi, zaman özelliklerindeki kayma)."""
+        t0 = time.perf_counter()
+        with self._lock:
+            fired = self._rescore(np.arange(len(self.sites)), self.engine.catalog_version)
+            self.last_update = {
+                "catalog_version": self.engine.catalog_version,
+                "model_version": self.engine.model_version,
+                "new_events": 0,
+                "affected_sites": len(self.sites),
+                "alerts": len(fired),
+                "seconds": time.perf_counter() - t0,
+            }
+        self._emit(fired)
+        return fired
+
+    def recent_alerts(self, limit=100):
+        """En yeni limit uyarı (eskiden yeniye)."""
+        with self._lock:
+            return list(self.alerts)[-limit:] if limit > 0 else []
+
+    def snapshot(self):
+        """Sitelerin güncel skor ve kategorileri (DataFrame)."""
+        with self._lock:
+            out = self.sites.copy()
+            out["final_score"] = self.scores
+            out["category"] = self.categories
+        return out
+
+
+def _demo_events(lat, lon, mag, n, seed=0):
+    # Aynı bölgede, son kayıttan sonraki günlerde n olay (ilki ana şok)
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp.now(tz="UTC").floor("s")
+    rows = []
+    for k in range(n):
+        rows.append({
+            "time": (start + pd.Timedelta(minutes=10 * k)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "latitude": lat + rng.normal(0, 0.1),
+            "longitude": lon + rng.normal(0, 0.1),
+            "depth": 10.0,
+            "mag": mag if k == 0 else round(mag - 1.5 - rng.random(), 1),
+            "magType": "ml",
+            "place": "demo",
+            "type": "earthquake",
+            "status": "automatic",
+        })
+    return pd.DataFrame(rows[::-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İzleme listesi: olay tabanlı yeniden skorlama ve uyarılar")
+    parser.add_argument("--csv", default=os.path.join("assets", "query.csv"))
+    parser.add_argument("--sites", default=os.path.join("assets", "provinces.csv"))
+    parser.add_argument("--synthetic-sites", type=int, default=5000,
+                        help="İllere ek olarak rastgele tesis sayısı")
+    parser.add_argument("--lat", type=float, default=38.35, help="Örnek olay enlemi (Malatya)")
+    parser.add_argument("--lon", type=float, default=38.31)
+    parser.add_argument("--mag", type=float, default=6.4)
+    parser.add_argument("--events", type=int, default=5)
+    args = parser.parse_args()
+
+    from synthetic_catalog import synthetic_locations
+    from data_manager import _prepend_rows
+    from risk_engine import EarthquakeRiskEngine
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Gerçek katalog değişmesin: geçici kopya üzerinde alım benzetimi
+        csv_path = os.path.join(tmp, "query.csv")
+        shutil.copy(args.csv, csv_path)
+        engine = EarthquakeRiskEngine(csv_path=csv_path, cache_dir=None)
+        engine.warm_up()
+
+        sites = pd.read_csv(args.sites)[["name", "latitude", "longitude"]]
+        if args.synthetic_sites:
+            sites = pd.concat([sites, synthetic_locations(args.synthetic_sites)], ignore_index=True)
+        watch = Watchlist(engine).attach()
+        t0 = time.perf_counter()
+        watch.add_sites(sites)
+        print(f"{len(sites)} site ilk skorlama: {time.perf_counter() - t0:.2f} sn")
+        watch.add_alert_listener(lambda a: print(
+            f"  UYARI {a['name']}: {a['old_category']} -> {a['new_category']} "
+            f"({a['old_score']:.3f} -> {a['new_score']:.3f})"))
+
+        _prepend_rows(_demo_events(args.lat, args.lon, args.mag, args.events), csv_path)
+        t0 = time.perf_counter()
+        engine.refresh_catalog(background=False)
+        total = time.perf_counter() - t0
+        u = watch.last_update
+        print(f"Alım: {u['new_events']} yeni olay, {u['affected_sites']}/{len(sites)} site yeniden skorlandı "
+              f"({u['seconds'] * 1000:.0f} ms; katalog yenileme dahil {total:.2f} sn), {u['alerts']} uyarı")
+
+
+if __name__ == "__main__":
+    main()